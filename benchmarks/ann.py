@@ -0,0 +1,387 @@
+"""
+ANN benchmark: recall vs QPS vs tail latency vs build time vs memory across vector index configurations.
+
+The same `SyntheticCorpus` is built under every index configuration, and
+each search setting answers the corpus' paired queries twice:
+
+- base: language filter only, as the Chat tab's standard RAG
+- hierarchical: language, doc type and hierarchy path prefix, as
+  `retrieval._filter_expr` builds it
+
+Milvus index types (FLAT, IVF_FLAT, IVF_SQ8, IVF_PQ, HNSW, SCANN, DISKANN,
+AUTOINDEX) get one collection each, with the inverted scalar indexes
+ingestion uses. Milvus Lite (the default, in a temporary file) accepts only
+FLAT, IVF_FLAT and AUTOINDEX, and searches all of them exhaustively; pass
+`--uri` of a Milvus server for real ANN numbers. Index types the server
+rejects are reported as unsupported.
+
+In-process configurations run on the numpy backend's store: NUMPY is its
+exact search, FLOAT16/INT8/BINARY are `QuantizedVectors` candidate searches
+under the same filter masks, rescored from the store's memory-mapped rows.
+
+Milvus FLAT is always built first and its results are the ground truth:
+Recall@k is the share of FLAT's top-k a configuration returns for the same
+query and filter. Each setting also reports sequential QPS, p50/p99
+latency, insert and build (index + load) time, the index size (estimated
+for Milvus) and the resident memory growth of the process that built it
+(the Milvus Lite server, or this one). CSV, JSON and markdown reports are
+written to `--output-dir`.
+
+    uv run python -m benchmarks.ann --size 100000
+    uv run python -m benchmarks.ann --uri http://localhost:19530 --index-types FLAT,IVF_FLAT,IVF_SQ8,HNSW,DISKANN
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import numpy as np
+from pymilvus import MilvusClient, DataType
+
+from src.core.index import HIERARCHY_LEVELS, HIERARCHY_PATH_FIELD
+from src.core.numpy_store import NumpyClient, open_collection
+from src.core.quantize import QuantizedVectors
+from src.core.synthetic_corpus import SyntheticCorpus
+
+MODES = ("base", "hierarchical")
+IN_PROCESS = ("NUMPY", "FLOAT16", "INT8", "BINARY")
+SCALAR_FIELDS = ("language", "doc_type") + HIERARCHY_LEVELS + (HIERARCHY_PATH_FIELD,)
+WARMUP_QUERIES = 10
+
+
+def index_configs(rows: int, k: int, nlist: Optional[int]) -> Dict[str, tuple]:
+    """Index type -> (build params, search param grid) sized for `rows` vectors"""
+    nlist = nlist or int(np.clip(2 ** round(np.log2(4 * np.sqrt(rows))), 16, 65536))
+    nprobes = [{"nprobe": p} for p in (1, 4, 16, 64) if p <= nlist]
+    return {
+        "FLAT": ({}, [{}]),
+        "IVF_FLAT": ({"nlist": nlist}, nprobes),
+        "IVF_SQ8": ({"nlist": nlist}, nprobes),
+        "IVF_PQ": ({"nlist": nlist, "m": 16, "nbits": 8}, nprobes),
+        "HNSW": ({"M": 16, "efConstruction": 200}, [{"ef": max(ef, k)} for ef in (16, 64, 256)]),
+        "SCANN": ({"nlist": nlist, "with_raw_data": True}, [{**p, "reorder_k": 4 * k} for p in nprobes]),
+        "DISKANN": ({}, [{"search_list": max(s, k)} for s in (16, 64, 256)]),
+        "AUTOINDEX": ({}, [{}]),
+        # in process, on the numpy backend's store
+        "NUMPY": ({}, [{}]),
+        **{
+            precision.upper(): ({"precision": precision}, [{"rescore": r} for r in (0, 2, 4, 16)])
+            for precision in ("float16", "int8", "binary")
+        },
+    }
+
+
+def estimated_bytes(index_type: str, params: dict, rows: int, dim: int) -> Optional[int]:
+    """Rough in-memory size of the vector index (vectors, codes, graph links, centroids)"""
+    raw = rows * dim * 4
+    centroids = params.get("nlist", 0) * dim * 4
+    ids = rows * 8
+    if index_type == "FLAT":
+        return raw
+    if index_type == "IVF_FLAT":
+        return raw + centroids + ids
+    if index_type == "IVF_SQ8":
+        return rows * dim + centroids + ids
+    if index_type == "IVF_PQ":
+        codebooks = 2 ** params["nbits"] * dim * 4
+        return rows * params["m"] * params["nbits"] // 8 + centroids + codebooks + ids
+    if index_type in ("HNSW", "AUTOINDEX") and "M" in params:
+        # base layer links dominate: 2 * M neighbours per vector
+        return raw + rows * 2 * int(params["M"]) * 4
+    if index_type == "SCANN":
+        return rows * dim // 2 + centroids + ids + (raw if params.get("with_raw_data") else 0)
+    return None  # DISKANN keeps the graph on disk; AUTOINDEX depends on the server
+
+
+def process_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Resident bytes of a process (default this one); Linux only"""
+    try:
+        status = Path(f"/proc/{pid or 'self'}/status").read_text()
+    except OSError:
+        return None
+    line = next((line for line in status.splitlines() if line.startswith("VmRSS:")), None)
+    return int(line.split()[1]) * 1024 if line else None
+
+
+def lite_server_pid() -> Optional[int]:
+    """The Milvus Lite server process started by this one"""
+    me = str(os.getpid())
+    for pid in filter(str.isdigit, os.listdir("/proc") if os.path.isdir("/proc") else []):
+        try:
+            status = Path(f"/proc/{pid}/status").read_text()
+            ppid = next(line.split()[1] for line in status.splitlines() if line.startswith("PPid:"))
+            if ppid == me and "milvus" in Path(f"/proc/{pid}/cmdline").read_text():
+                return int(pid)
+        except (OSError, StopIteration):
+            continue
+    return None
+
+
+def corpus_rows(corpus: SyntheticCorpus) -> Iterator[List[dict]]:
+    """Batches of insert rows: pk, vector and the filtered scalar fields"""
+    for number in range(corpus.batches_count):
+        batch = corpus.batch(number, with_text=False)
+        rows = batch.metadatas(corpus)
+        for row, chunk_id, vector in zip(rows, batch.ids, batch.vectors):
+            row["pk"], row["vector"] = chunk_id, vector
+            del row["doc_id"], row["chunk_id"]
+        yield rows
+
+
+def build_milvus(client: MilvusClient, name: str, corpus: SyntheticCorpus, index_type: str, params: dict, k: int):
+    """Insert the corpus, then build the vector index and load; returns (search, build info)"""
+    if client.has_collection(name):
+        client.drop_collection(name)
+    schema = client.create_schema(auto_id=False)
+    schema.add_field("pk", DataType.VARCHAR, is_primary=True, max_length=64)
+    schema.add_field("vector", DataType.FLOAT_VECTOR, dim=corpus.dim)
+    for field in SCALAR_FIELDS:
+        schema.add_field(field, DataType.VARCHAR, max_length=512)
+    client.create_collection(name, schema=schema)
+
+    start = time.perf_counter()
+    for rows in corpus_rows(corpus):
+        for row in rows:
+            row["vector"] = row["vector"].tolist()
+        for i in range(0, len(rows), 5000):
+            client.insert(name, rows[i:i + 5000])
+    client.flush(name)
+    insert_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name="vector", index_type=index_type, metric_type="L2", params=params)
+    for field in SCALAR_FIELDS:
+        index_params.add_index(field_name=field, index_type="INVERTED")
+    client.create_index(name, index_params)
+    client.load_collection(name)
+    build_s = time.perf_counter() - start
+    # the params the server chose (AUTOINDEX) or kept, which describe_index returns as strings
+    described = client.describe_index(name, "vector")
+    built = {
+        key: int(value) if str(value).isdigit() else value
+        for key, value in described.items() if key in ("M", "efConstruction", *params)
+    }
+
+    def search(vector: np.ndarray, expr: str, search_params: dict) -> list:
+        result = client.search(
+            name, data=[vector.tolist()], filter=expr, limit=k,
+            search_params={"metric_type": "L2", "params": search_params},
+        )
+        return [hit["id"] for hit in result[0]]
+
+    info = {
+        "insert_s": insert_s, "build_s": build_s, "params": built or params,
+        "index_bytes": estimated_bytes(index_type, {**params, **built}, corpus.chunks, corpus.dim),
+    }
+    return search, info
+
+
+def build_numpy(root: Path, corpus: SyntheticCorpus) -> dict:
+    """The corpus in the numpy backend's store, shared by the in-process configurations"""
+    client = NumpyClient(str(root))
+    start = time.perf_counter()
+    ids = []
+    for rows in corpus_rows(corpus):
+        client.insert("ann", rows)
+        ids.extend(row["pk"] for row in rows)
+    return {
+        "client": client,
+        "collection": open_collection(root / "ann"),
+        "ids": np.array(ids),
+        "insert_s": time.perf_counter() - start,
+    }
+
+
+def build_in_process(store: dict, index_type: str, params: dict, k: int):
+    """Exact search of the numpy store, or a quantized copy of its vectors searched under its filter masks"""
+    collection, ids = store["collection"], store["ids"]
+    vectors = collection.vectors[:collection.count]
+    start = time.perf_counter()
+    if index_type == "NUMPY":
+        def search(vector: np.ndarray, expr: str, search_params: dict) -> list:
+            return [hit["id"] for hit in store["client"].search("ann", [vector], filter=expr, limit=k)[0]]
+        index_bytes = vectors.nbytes + collection.count * 4  # vectors and their squared norms
+    else:
+        # full-precision rows stay in the store's memory map for rescoring
+        quantized = QuantizedVectors(vectors, params["precision"])
+
+        def search(vector: np.ndarray, expr: str, search_params: dict) -> list:
+            top, _ = quantized.search(vector, k, rescore=search_params["rescore"], mask=collection.mask(expr))
+            return ids[top].tolist()
+        index_bytes = quantized.nbytes
+    info = {
+        "insert_s": store["insert_s"], "build_s": time.perf_counter() - start,
+        "params": params, "index_bytes": index_bytes,
+    }
+    return search, info
+
+
+def run_queries(search: Callable, vectors: np.ndarray, filters: List[str], params: dict):
+    """(latencies ms, result ids) of one sequential pass; a few warm-up queries first"""
+    for vector, expr in list(zip(vectors, filters))[:WARMUP_QUERIES]:
+        search(vector, expr, params)
+    latencies, ids = [], []
+    for vector, expr in zip(vectors, filters):
+        start = time.perf_counter()
+        ids.append(search(vector, expr, params))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies), ids
+
+
+def query_filters(queries: list) -> Dict[str, List[str]]:
+    filters = {"base": [], "hierarchical": []}
+    for query in queries:
+        path = "/".join(getattr(query, level) for level in HIERARCHY_LEVELS) + "/"
+        filters["base"].append(f'language == "{query.language}"')
+        filters["hierarchical"].append(
+            f'language == "{query.language}" and doc_type == "{query.doc_type}" and {HIERARCHY_PATH_FIELD} like "{path}%"'
+        )
+    return filters
+
+
+def recall_at_k(found: List[list], truth: List[list], k: int) -> float:
+    return float(np.mean([
+        len(set(f[:k]) & set(t[:k])) / len(t[:k]) if t else 1.0 for f, t in zip(found, truth)
+    ]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100000, help="corpus size in chunks")
+    parser.add_argument("--collection", default="hospital", choices=["hospital", "bank", "fluid_simulation"])
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of chunks per leaf; 0 is uniform")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10, help="recall@k and search limit")
+    parser.add_argument("--index-types", default="FLAT,IVF_FLAT,AUTOINDEX,NUMPY,FLOAT16,INT8,BINARY")
+    parser.add_argument("--nlist", type=int, help="IVF lists (default ~4*sqrt(size), a power of two)")
+    parser.add_argument("--uri", help="Milvus server URI (default: Milvus Lite in a temporary file)")
+    parser.add_argument("--token", default=os.getenv("MILVUS_API_KEY", ""))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="reports")
+    args = parser.parse_args()
+
+    index_types = ["FLAT"] + [t for t in args.index_types.upper().split(",") if t and t != "FLAT"]
+    configs = index_configs(args.size, args.k, args.nlist)
+    unknown = [t for t in index_types if t not in configs]
+    if unknown:
+        parser.error(f"unknown index types {unknown}, expected some of {list(configs)}")
+
+    corpus = SyntheticCorpus(args.collection, args.size, skew=args.skew, dim=args.dim, seed=args.seed)
+    queries, vectors = corpus.queries(args.queries, seed=args.seed)
+    filters = query_filters(queries)
+    print(f"{args.collection}: {args.size:,} chunks, {args.dim}-d, {len(queries)} queries, recall@{args.k} against FLAT")
+
+    rows, truth = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        client = MilvusClient(args.uri or str(Path(tmp) / "ann.db"), token=args.token)
+        server_pid = lite_server_pid() if args.uri is None else None
+        if args.uri is None:
+            print("Note: Milvus Lite searches every index type as FLAT; use --uri for ANN numbers of a Milvus server")
+        store = None
+        print(
+            f"{'index':<10} {'search params':<22} {'mode':<13} {'recall':>7} {'QPS':>8} {'p50 ms':>8} "
+            f"{'p99 ms':>8} {'build s':>8} {'MB':>8} {'RSS MB':>8}"
+        )
+        for index_type in index_types:
+            build_params, grid = configs[index_type]
+            in_process = index_type in IN_PROCESS
+            if in_process and store is None:
+                store = build_numpy(Path(tmp) / "numpy_store", corpus)
+            # Milvus builds in its server process, the in-process configurations in this one
+            pid = None if in_process else server_pid
+            rss_before = process_rss(pid) if in_process or pid else None
+            name = f"ann_{index_type.lower()}"
+            try:
+                if in_process:
+                    search, built = build_in_process(store, index_type, build_params, args.k)
+                else:
+                    search, built = build_milvus(client, name, corpus, index_type, build_params, args.k)
+            except Exception as e:
+                print(f"{index_type:<10} unsupported: {str(e).splitlines()[0][:100]}")
+                rows.append({"index": index_type, "build_params": json.dumps(build_params), "error": str(e).splitlines()[0]})
+                if client.has_collection(name):
+                    client.drop_collection(name)
+                continue
+            rss_after = process_rss(pid) if rss_before else None
+            for search_params in grid:
+                for mode in MODES:
+                    latencies, ids = run_queries(search, vectors, filters[mode], search_params)
+                    if index_type == "FLAT":
+                        truth[mode] = ids
+                    row = {
+                        "index": index_type,
+                        "build_params": json.dumps(built["params"]),
+                        "search_params": json.dumps(search_params),
+                        "mode": mode,
+                        f"recall_at_{args.k}": recall_at_k(ids, truth[mode], args.k),
+                        "qps": 1000 * len(latencies) / latencies.sum(),
+                        "p50_ms": float(np.percentile(latencies, 50)),
+                        "p99_ms": float(np.percentile(latencies, 99)),
+                        "insert_s": built["insert_s"],
+                        "build_s": built["build_s"],
+                        "index_mb": built["index_bytes"] / 2 ** 20 if built["index_bytes"] is not None else None,
+                        "rss_growth_mb": (rss_after - rss_before) / 2 ** 20 if rss_before and rss_after else None,
+                    }
+                    rows.append(row)
+                    mb = f"{row['index_mb']:.1f}" if row["index_mb"] is not None else "-"
+                    rss = f"{row['rss_growth_mb']:.1f}" if row["rss_growth_mb"] is not None else "-"
+                    print(
+                        f"{index_type:<10} {row['search_params']:<22} {mode:<13} {row[f'recall_at_{args.k}']:>7.3f} "
+                        f"{row['qps']:>8.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['build_s']:>8.2f} {mb:>8} {rss:>8}"
+                    )
+            if not in_process:
+                # one loaded collection at a time keeps the memory readings comparable
+                client.release_collection(name)
+                client.drop_collection(name)
+        client.close()
+
+    out = Path(args.output_dir)
+    out.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    setup = {
+        "collection": args.collection, "size": args.size, "dim": args.dim, "skew": args.skew,
+        "queries": len(queries), "k": args.k, "server": args.uri or "milvus-lite", "seed": args.seed,
+    }
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(out / f"ann_{stamp}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(out / f"ann_{stamp}.json", "w") as f:
+        json.dump({"timestamp": stamp, "setup": setup, "results": rows}, f, indent=2)
+
+    path = out / f"ann_{stamp}.md"
+    with open(path, "w") as f:
+        f.write("# ANN Index Benchmark Report\n\n")
+        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"{args.size:,} `{args.collection}` chunks ({args.dim}-d, skew {args.skew:g}) on {setup['server']}, ")
+        f.write(f"{len(queries)} queries, sequential. Recall@{args.k} is measured against Milvus FLAT with the same filter; ")
+        f.write("build is index creation plus load; RSS is the growth of the building process (Milvus Lite server or benchmark).")
+        if args.uri is None:
+            f.write(" Milvus Lite searches every index type exhaustively, so its IVF_FLAT and AUTOINDEX rows are not ANN results.")
+        f.write("\n\n")
+        f.write(f"| Index | Build params | Search params | Mode | Recall@{args.k} | QPS | p50 ms | p99 ms | Build s | Index MB | RSS MB |\n")
+        f.write("|---|---|---|---|---|---|---|---|---|---|---|\n")
+        for row in rows:
+            if "error" in row:
+                f.write(f"| {row['index']} | {row['build_params']} | unsupported: {row['error'][:80]} |||||||||\n")
+                continue
+            mb = f"{row['index_mb']:.1f}" if row["index_mb"] is not None else "-"
+            rss = f"{row['rss_growth_mb']:.1f}" if row["rss_growth_mb"] is not None else "-"
+            f.write(
+                f"| {row['index']} | `{row['build_params']}` | `{row['search_params']}` | {row['mode']} "
+                f"| {row[f'recall_at_{args.k}']:.3f} | {row['qps']:.0f} | {row['p50_ms']:.2f} | {row['p99_ms']:.2f} "
+                f"| {row['build_s']:.2f} | {mb} | {rss} |\n"
+            )
+    print(f"✓ Saved ANN benchmark report: {path} (+ .csv, .json)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Hierarchy filter benchmark: per-level equality conjunction vs hierarchy_path prefix.
+
+Builds a Milvus Lite collection of `--rows` random vectors spread over a
+domain/section/topic hierarchy (with inverted indexes on every filtered
+field) and times filtered top-5 searches at each hierarchy depth.
+
+    uv run python -m benchmarks.hierarchy_filter --rows 50000
+"""
+
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+from pymilvus import MilvusClient, DataType
+
+from src.core.index import HIERARCHY_LEVELS, HIERARCHY_PATH_FIELD, hierarchy_path
+
+DIM = 64
+
+
+def build_collection(client: MilvusClient, rows: int, fanout: int, rng: np.random.Generator) -> list:
+    schema = client.create_schema(auto_id=False)
+    schema.add_field("pk", DataType.INT64, is_primary=True)
+    schema.add_field("vector", DataType.FLOAT_VECTOR, dim=DIM)
+    for field in HIERARCHY_LEVELS + (HIERARCHY_PATH_FIELD,):
+        schema.add_field(field, DataType.VARCHAR, max_length=512)
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name="vector", index_type="FLAT", metric_type="L2")
+    for field in HIERARCHY_LEVELS + (HIERARCHY_PATH_FIELD,):
+        index_params.add_index(field_name=field, index_type="INVERTED")
+    client.create_collection("bench", schema=schema, index_params=index_params)
+
+    labels = [rng.integers(0, fanout, rows) for _ in HIERARCHY_LEVELS]
+    vectors = rng.standard_normal((rows, DIM), dtype=np.float32)
+    batch = []
+    for i in range(rows):
+        row = {"pk": i, "vector": vectors[i].tolist()}
+        for level, codes in zip(HIERARCHY_LEVELS, labels):
+            row[level] = f"{level} {codes[i]}"
+        row[HIERARCHY_PATH_FIELD] = hierarchy_path(row)
+        batch.append(row)
+        if len(batch) == 5000:
+            client.insert("bench", batch)
+            batch = []
+    if batch:
+        client.insert("bench", batch)
+    client.load_collection("bench")
+    return [f"{level} 0" for level in HIERARCHY_LEVELS]
+
+
+def time_filter(client: MilvusClient, expr: str, queries: np.ndarray) -> tuple:
+    latencies, hits = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = client.search("bench", data=[query.tolist()], filter=expr, limit=5, output_fields=["pk"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append(sorted(hit["id"] for hit in result[0]))
+    return np.array(latencies), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--fanout", type=int, default=5, help="labels per hierarchy level")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        client = MilvusClient(str(Path(tmp) / "bench.db"))
+        start = time.perf_counter()
+        path = build_collection(client, args.rows, args.fanout, rng)
+        print(f"built {args.rows:,} rows in {time.perf_counter() - start:.1f}s ({args.fanout} labels per level)")
+        queries = rng.standard_normal((args.queries, DIM), dtype=np.float32)
+
+        print(f"\n{'depth':<6} {'filter':<12} {'mean ms':>8} {'p95 ms':>8}  same results")
+        for depth in range(1, len(HIERARCHY_LEVELS) + 1):
+            conjunction = " and ".join(f'{level} == "{path[i]}"' for i, level in enumerate(HIERARCHY_LEVELS[:depth]))
+            prefix = f'{HIERARCHY_PATH_FIELD} like "{"/".join(path[:depth])}/%"'
+            conj_ms, conj_hits = time_filter(client, conjunction, queries)
+            path_ms, path_hits = time_filter(client, prefix, queries)
+            same = conj_hits == path_hits
+            for label, ms in [("conjunction", conj_ms), ("path prefix", path_ms)]:
+                print(f"{depth:<6} {label:<12} {ms.mean():8.2f} {np.percentile(ms, 95):8.2f}  {same}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
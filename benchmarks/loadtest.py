@@ -0,0 +1,357 @@
+"""
+Load test: throughput, error rate and latency percentiles of the RAG endpoints as load increases.
+
+Targets (`--target`):
+
+- retrieval: `retrieval.retrieval` with each query's hierarchical filters
+- comparison: `app.run_rag_comparison`, i.e. base and hierarchical retrieval
+  plus generation, as the Chat tab runs it
+- http: the Gradio API of a running app (`--url`); MCP tool calls go
+  through the same endpoint and queue
+
+Load models:
+
+- closed loop (`--concurrency 1,4,16`): N workers, each sending its next
+  request as soon as the previous one returns
+- open loop (`--qps 1,5,10`): requests start on a fixed schedule whatever
+  the completions. Latency is counted from the scheduled start, so a
+  saturated deployment shows up as a growing tail instead of a lower
+  offered rate.
+
+Queries are the `EVAL_QUERIES`, or `--queries-file`: JSONL with EvalQuery
+fields, or one question per line (asked of `--collection`).
+
+`--stub` runs offline: deterministic fake embeddings, an LLM stub that
+sleeps `--stub-llm-ms`, and the synthetic documents ingested into a
+temporary numpy-backend store; `--stub-server` serves the fake models from
+`benchmarks.openai_stub` instead, so the OpenAI clients' HTTP path is
+measured too. With `--target http` and no `--url`, the app is launched
+locally on those stubs.
+
+A markdown report is written to `--output-dir`.
+
+    uv run python -m benchmarks.loadtest --stub --target comparison --concurrency 1,2,4,8
+    uv run python -m benchmarks.loadtest --target http --url http://127.0.0.1:7860 --qps 1,2,5
+"""
+
+import os
+import io
+import json
+import time
+import socket
+import argparse
+import tempfile
+import itertools
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+import numpy as np
+
+# src modules read their settings from the environment at import time, so
+# they are imported only once --stub has pointed them at a temporary store.
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class LevelResult:
+    """Outcome of one load level"""
+    load: str
+    elapsed_s: float
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    first_error: Optional[str] = None
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_ms) + self.errors
+
+    def row(self) -> list:
+        throughput = len(self.latencies_ms) / self.elapsed_s if self.elapsed_s else 0.0
+        error_rate = self.errors / self.requests if self.requests else 0.0
+        tails = np.percentile(self.latencies_ms, PERCENTILES) if self.latencies_ms else [float("nan")] * len(PERCENTILES)
+        return [self.load, self.requests, self.errors, f"{error_rate:.1%}", f"{throughput:.2f}"] + [f"{t:.0f}" for t in tails]
+
+
+def _record(result: LevelResult, lock: threading.Lock, latency_ms: float, error: Optional[Exception]):
+    with lock:
+        if error is None:
+            result.latencies_ms.append(latency_ms)
+        else:
+            result.errors += 1
+            result.first_error = result.first_error or f"{type(error).__name__}: {error}"
+
+
+def closed_loop(call: Callable, queries: list, concurrency: int, duration: float) -> LevelResult:
+    """`concurrency` workers issuing requests back to back for `duration` seconds"""
+    result = LevelResult(f"{concurrency} workers", 0.0)
+    lock = threading.Lock()
+    counter = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            query = queries[next(counter) % len(queries)]
+            start = time.perf_counter()
+            try:
+                call(query)
+                error = None
+            except Exception as e:
+                error = e
+            _record(result, lock, (time.perf_counter() - start) * 1000, error)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+
+def open_loop(call: Callable, queries: list, qps: float, duration: float, max_workers: int) -> LevelResult:
+    """Requests started at `qps` for `duration` seconds, whatever the completions"""
+    result = LevelResult(f"{qps:g} qps", 0.0)
+    lock = threading.Lock()
+
+    def timed(query, scheduled: float):
+        try:
+            call(query)
+            error = None
+        except Exception as e:
+            error = e
+        _record(result, lock, (time.perf_counter() - scheduled) * 1000, error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load") as pool:
+        futures = []
+        for i in range(max(1, int(qps * duration))):
+            scheduled = started + i / qps
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            futures.append(pool.submit(timed, queries[i % len(queries)], scheduled))
+        wait(futures)
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+
+# ============================================================================
+# TARGETS
+# ============================================================================
+
+def make_target(name: str, index_prefix: str, url: Optional[str]) -> Callable:
+    """A function sending one EvalQuery to the target, raising on failure"""
+    if name == "retrieval":
+        from src.core.index import MetaData, get_vectorstore
+        from src.core.retrieval import retrieval
+
+        stores, lock = {}, threading.Lock()
+
+        def call(query):
+            with lock:
+                if query.collection not in stores:
+                    stores[query.collection] = get_vectorstore(index_prefix + query.collection)
+            filters = MetaData(
+                language=query.language, domain=query.domain, section=query.section,
+                topic=query.topic, doc_type=query.doc_type,
+            )
+            retrieval(query.query, filters, stores[query.collection])
+        return call
+
+    if name == "comparison":
+        from src.app import run_rag_comparison
+
+        def call(query):
+            for _ in run_rag_comparison(
+                query.query, index_prefix + query.collection, query.language,
+                query.domain, query.section, query.topic, query.doc_type,
+            ):
+                pass
+        return call
+
+    from gradio_client import Client
+
+    local = threading.local()
+
+    def call(query):
+        if not hasattr(local, "client"):
+            local.client = Client(url, verbose=False)
+        # the hierarchy dropdowns are filled per session from a YAML upload, so
+        # API calls can only set the index, language and doc type
+        local.client.predict(
+            query.query, index_prefix + query.collection, query.language, None, None, None, query.doc_type,
+            api_name="/run_rag_comparison",
+        )
+    return call
+
+
+# ============================================================================
+# OFFLINE STUBS
+# ============================================================================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def setup_stub(tmp: Path, index_prefix: str, embed_ms: float, llm_ms: float, server: bool = False):
+    """Point every store at `tmp`, replace the OpenAI models and ingest the synthetic documents.
+
+    With `server`, the real OpenAI clients talk to a local `openai_stub` instead.
+    """
+    os.environ.update(
+        VECTOR_BACKEND="numpy",
+        NUMPY_STORE_DIR=str(tmp / "numpy_store"),
+        COLLECTION_ALIASES_PATH=str(tmp / "aliases.json"),
+        CHUNK_TEXT_DIR=str(tmp / "chunk_text"),
+        METADATA_DICTIONARIES_PATH=str(tmp / "metadata_dictionaries.json"),
+        GENERATION_CACHE_PATH=str(tmp / "generation_cache.sqlite"),
+        INGEST_JOBS_DIR=str(tmp / "jobs"),
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    if server:
+        from benchmarks.openai_stub import StubConfig, serve
+
+        stub = serve(StubConfig(chat_latency=f"fixed:{llm_ms}", embed_latency=f"fixed:{embed_ms}"))
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.messages import AIMessage
+    from src.core import index, retrieval
+    from src.core.ingest import get_chunks, ingest_documents
+    from src.core.synthetic_data import SYNTHETIC_DOCUMENTS
+
+    class StubEmbeddings(DeterministicFakeEmbedding):
+        # unit length like OpenAI embeddings, so relevance scores stay in [0, 1]
+        def _get_embedding(self, seed: int) -> List[float]:
+            vector = np.asarray(super()._get_embedding(seed))
+            return (vector / np.linalg.norm(vector)).tolist()
+
+        def embed_query(self, text: str) -> List[float]:
+            time.sleep(embed_ms / 1000)
+            return super().embed_query(text)
+
+    class StubChatModel:
+        model_name = "stub"
+
+        def invoke(self, prompt: str) -> AIMessage:
+            time.sleep(llm_ms / 1000)
+            return AIMessage(content=f"Stub answer from {len(prompt)} prompt characters.")
+
+    if not server:
+        index.emb_model = StubEmbeddings(size=index.EMBEDDING_DIMENSIONS)
+        retrieval.model = StubChatModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for collection, docs in SYNTHETIC_DOCUMENTS.items():
+            chunks = []
+            for doc_data in docs:
+                doc = Document(page_content=doc_data["content"], metadata=doc_data["metadata"])
+                chunks.extend(get_chunks([doc], index.MetaData(**doc_data["metadata"])))
+            with index.rebuild_collection(index_prefix + collection) as vectorstore:
+                ingest_documents(chunks, vectorstore)
+    where = f"OpenAI stub at {os.environ['OPENAI_BASE_URL']}" if server else "in-process stubs"
+    print(f"Stub store ready in {tmp} ({where}: embedding {embed_ms:g}ms, LLM {llm_ms:g}ms)")
+
+
+def launch_local_app() -> str:
+    from src.app import demo
+
+    port = _free_port()
+    demo.queue().launch(server_name="127.0.0.1", server_port=port, prevent_thread_lock=True, quiet=True)
+    return f"http://127.0.0.1:{port}"
+
+
+def load_queries(path: Optional[str], collection: str, language: str) -> list:
+    from src.core.synthetic_data import EVAL_QUERIES, EvalQuery
+
+    if not path:
+        return list(EVAL_QUERIES)
+    queries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("{"):
+            data = json.loads(line)
+            data.setdefault("ground_truth_chunks", [])
+            data.setdefault("description", "")
+            queries.append(EvalQuery(**{
+                key: data.get(key) for key in (
+                    "query", "collection", "language", "domain", "section", "topic", "doc_type",
+                    "ground_truth_chunks", "description",
+                )
+            }))
+        else:
+            queries.append(EvalQuery(line.strip(), collection, language, None, None, None, None, [], ""))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["retrieval", "comparison", "http"], default="comparison")
+    parser.add_argument("--concurrency", help="closed-loop worker counts, e.g. 1,2,4,8")
+    parser.add_argument("--qps", help="open-loop request rates, e.g. 1,2,5")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per load level")
+    parser.add_argument("--max-workers", type=int, default=64, help="open-loop requests in flight at most")
+    parser.add_argument("--queries-file")
+    parser.add_argument("--collection", default="hospital", help="collection of plain-text queries")
+    parser.add_argument("--language", default="en", help="language of plain-text queries")
+    parser.add_argument("--index-prefix", default="", help='e.g. "eval_" for the evaluation collections')
+    parser.add_argument("--url", help="Gradio app URL for --target http")
+    parser.add_argument("--stub", action="store_true", help="offline: fake embeddings and LLM, temporary store")
+    parser.add_argument("--stub-server", action="store_true", help="with --stub: serve the fake models over HTTP (benchmarks.openai_stub)")
+    parser.add_argument("--stub-embed-ms", type=float, default=20.0)
+    parser.add_argument("--stub-llm-ms", type=float, default=400.0)
+    parser.add_argument("--output-dir", default="reports")
+    args = parser.parse_args()
+    if not args.concurrency and not args.qps:
+        args.concurrency = "1,2,4,8"
+    if args.target == "http" and not args.url and not args.stub:
+        parser.error("--target http needs --url (or --stub to launch the app locally)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.stub:
+            setup_stub(Path(tmp), args.index_prefix, args.stub_embed_ms, args.stub_llm_ms, args.stub_server)
+        url = args.url or (launch_local_app() if args.target == "http" else None)
+        queries = load_queries(args.queries_file, args.collection, args.language)
+        call = make_target(args.target, args.index_prefix, url)
+        levels = [("closed", float(c)) for c in (args.concurrency or "").split(",") if c] + [
+            ("open", float(q)) for q in (args.qps or "").split(",") if q
+        ]
+
+        header = ["load", "requests", "errors", "error rate", "req/s"] + [f"p{p} ms" for p in PERCENTILES]
+        lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+        print(f"{args.target}: {len(queries)} queries, {args.duration:g}s per level")
+        print(lines[0])
+        for loop, level in levels:
+            # the endpoints log every request; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                if loop == "closed":
+                    result = closed_loop(call, queries, int(level), args.duration)
+                else:
+                    result = open_loop(call, queries, level, args.duration, args.max_workers)
+            line = "| " + " | ".join(str(v) for v in result.row()) + " |"
+            lines.append(line)
+            print(line)
+            if result.first_error:
+                print(f"  first error: {result.first_error}")
+
+    out = Path(args.output_dir)
+    out.mkdir(exist_ok=True)
+    path = out / f"loadtest_{args.target}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    with open(path, "w") as f:
+        f.write("# Load Test Report\n\n")
+        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"Target `{args.target}`{' at ' + url if url else ''}, {len(queries)} queries, ")
+        f.write(f"{args.duration:g}s per level{', offline stubs' if args.stub else ''}. ")
+        f.write("Closed-loop levels are worker counts; open-loop latency counts from the scheduled start.\n\n")
+        f.write("\n".join(lines) + "\n")
+    print(f"✓ Saved load test report: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+OpenAI stub: a local chat/embeddings server with deterministic outputs and configurable latency, token rate and errors.
+
+It implements the parts of the OpenAI API the pipeline uses, so every
+`ChatOpenAI` and `OpenAIEmbeddings` in the tree can run against it by
+setting the base URL:
+
+- POST /v1/chat/completions: the answer is drawn from the prompt's words,
+  seeded by the prompt hash; `stream: true` sends it token by token
+- POST /v1/embeddings: unit vectors seeded by the text hash, in the
+  requested `dimensions`, as floats or base64
+- GET /v1/models
+
+Latency specs (`--chat-latency` is the time to first token, `--embed-latency`
+the time per request) are `fixed:MS`, `uniform:LO,HI`, `exponential:MEAN`
+or `lognormal:MEDIAN,SIGMA`. A chat completion then takes
+`--completion-tokens / --tokens-per-second` more; an embedding request
+takes `--embed-per-input-ms` more per input. `--error-rate` of the requests
+fail with a status drawn from `--error-codes`. Latencies and errors come
+from a generator seeded with `--seed`.
+
+    uv run python -m benchmarks.openai_stub --port 8089 --chat-latency lognormal:400,0.5 --error-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub make dev
+"""
+
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Tuple
+import numpy as np
+
+LATENCY_KINDS = {
+    "fixed": lambda rng, ms: ms,
+    "uniform": lambda rng, lo, hi: rng.uniform(lo, hi),
+    "exponential": lambda rng, mean: rng.exponential(mean),
+    "lognormal": lambda rng, median, sigma: median * np.exp(sigma * rng.standard_normal()),
+}
+
+
+def parse_latency(spec: str) -> Callable[[np.random.Generator], float]:
+    """"lognormal:400,0.5" -> function drawing a latency in ms"""
+    kind, _, params = spec.partition(":")
+    if kind not in LATENCY_KINDS:
+        raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {sorted(LATENCY_KINDS)}")
+    values = [float(v) for v in params.split(",") if v]
+    sample = LATENCY_KINDS[kind]
+    sample(np.random.default_rng(0), *values)  # wrong arity fails here, not per request
+    return lambda rng: max(0.0, float(sample(rng, *values)))
+
+
+@dataclass
+class StubConfig:
+    chat_latency: str = "fixed:0"
+    embed_latency: str = "fixed:0"
+    embed_per_input_ms: float = 0.0
+    tokens_per_second: float = 0.0  # 0: the whole completion at once
+    completion_tokens: int = 64
+    dimensions: int = 1536
+    error_rate: float = 0.0
+    error_codes: Tuple[int, ...] = (429, 500)
+    seed: int = 0
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def stub_embedding(text: str, dimensions: int) -> np.ndarray:
+    vector = np.random.default_rng(_seed(text)).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def stub_completion(prompt: str, tokens: int) -> List[str]:
+    """`tokens` words of the prompt, chosen by its hash"""
+    words = re.findall(r"\w+", prompt) or ["stub"]
+    return [str(w) for w in np.random.default_rng(_seed(prompt)).choice(words, size=tokens)]
+
+
+def _message_text(content) -> str:
+    if isinstance(content, list):  # content parts
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig, verbose: bool = False):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.verbose = verbose
+        self.chat_latency = parse_latency(config.chat_latency)
+        self.embed_latency = parse_latency(config.embed_latency)
+        self.rng = np.random.default_rng(config.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def draw(self, latency: Callable) -> Tuple[float, int]:
+        """(latency ms, injected error status or 0) of the next request"""
+        with self.lock:
+            self.requests += 1
+            ms = latency(self.rng)
+            if self.config.error_rate and self.rng.random() < self.config.error_rate:
+                self.errors += 1
+                return ms, int(self.rng.choice(self.config.error_codes))
+            return ms, 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int):
+        error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+        self._send_json(
+            status,
+            {"error": {"message": f"Injected {status} from the OpenAI stub", "type": error_type, "code": error_type}},
+            {"retry-after-ms": "50"} if status == 429 else None,
+        )
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            models = ["gpt-5-nano", "text-embedding-3-small"]
+            self._send_json(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "created": 0, "owned_by": "stub"} for model in models
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        elif path.endswith("/embeddings"):
+            self._embeddings(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _chat(self, body: dict):
+        config = self.server.config
+        first_token_ms, error = self.server.draw(self.server.chat_latency)
+        time.sleep(first_token_ms / 1000)
+        if error:
+            return self._send_error(error)
+
+        prompt = "\n".join(_message_text(m.get("content")) for m in body.get("messages", []))
+        limit = body.get("max_completion_tokens") or body.get("max_tokens") or config.completion_tokens
+        tokens = stub_completion(prompt, min(limit, config.completion_tokens))
+        token_s = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+        usage = {
+            "prompt_tokens": _count_tokens(prompt),
+            "completion_tokens": len(tokens),
+            "total_tokens": _count_tokens(prompt) + len(tokens),
+        }
+        response = {
+            "id": f"chatcmpl-{_seed(prompt):x}",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "system_fingerprint": "stub",
+        }
+
+        if not body.get("stream"):
+            time.sleep(token_s * len(tokens))
+            message = {"role": "assistant", "content": " ".join(tokens)}
+            return self._send_json(200, {
+                **response, "object": "chat.completion", "usage": usage,
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop", "logprobs": None}],
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta: dict, finish_reason=None, **extra):
+            chunk = {**response, "object": "chat.completion.chunk", **extra, "choices": [
+                {"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}
+            ]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(token_s)
+            send({"content": token if i == 0 else " " + token})
+        send({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps({**response, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _embeddings(self, body: dict):
+        config = self.server.config
+        inputs = body.get("input", [])
+        # a string, a token array, or a list of either
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+
+        request_ms, error = self.server.draw(self.server.embed_latency)
+        time.sleep((request_ms + config.embed_per_input_ms * len(texts)) / 1000)
+        if error:
+            return self._send_error(error)
+
+        dimensions = body.get("dimensions") or config.dimensions
+        data = []
+        for i, text in enumerate(texts):
+            vector = stub_embedding(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(_count_tokens(text) for text in texts)
+        self._send_json(200, {
+            "object": "list", "data": data, "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def serve(config: StubConfig, host: str = "127.0.0.1", port: int = 0, verbose: bool = False) -> StubServer:
+    """Start the stub in a background thread; `port=0` picks a free port (see `.base_url`)"""
+    server = StubServer((host, port), config, verbose)
+    threading.Thread(target=server.serve_forever, daemon=True, name="openai-stub").start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--chat-latency", default="lognormal:400,0.5", help="time to first token, ms")
+    parser.add_argument("--embed-latency", default="lognormal:80,0.3", help="time per embedding request, ms")
+    parser.add_argument("--embed-per-input-ms", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="completion token rate, 0 for no delay")
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--dimensions", type=int, default=1536, help="embedding size when a request sets none")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-codes", default="429,500")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        chat_latency=args.chat_latency,
+        embed_latency=args.embed_latency,
+        embed_per_input_ms=args.embed_per_input_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        dimensions=args.dimensions,
+        error_rate=args.error_rate,
+        error_codes=tuple(int(code) for code in args.error_codes.split(",")),
+        seed=args.seed,
+    )
+    server = StubServer((args.host, args.port), config, args.verbose)
+    print(f"OpenAI stub listening on {server.base_url}")
+    print(f"  export OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=stub")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.requests} requests ({server.errors} injected errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Quantization report: recall vs memory vs latency for truncated and reduced-precision vectors.
+
+The synthetic corpus is chunked as in `eval.setup_test_data` and embedded
+once at 1536 dimensions (cached in `--cache`); shorter embeddings are the
+Matryoshka truncations of those vectors. For every dimension x precision
+x rescore setting it reports, over the eval queries (searched within their
+collection and language, like base RAG):
+
+- Hit@5 against the queries' ground-truth snippets
+- Recall@5 against exact float32 search at full dimension
+- bytes per vector and the RAM needed for `--project-rows` vectors
+- p50/p95 search latency over `--latency-rows` vectors (the corpus vectors
+  repeated with noise)
+
+A markdown report is written to `--output-dir`.
+
+    OPENAI_API_KEY=... uv run python -m benchmarks.quantization
+    uv run python -m benchmarks.quantization --embeddings fake   # offline smoke run
+"""
+
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_openai import OpenAIEmbeddings
+
+from src.core.index import MetaData, OPENAI_BASE_URL
+from src.core.ingest import get_chunks
+from src.core.quantize import QuantizedVectors, PRECISIONS, truncate
+from src.core.synthetic_data import SYNTHETIC_DOCUMENTS, EVAL_QUERIES
+
+FULL_DIM = 1536
+K = 5
+
+
+def build_corpus():
+    chunks = []
+    for collection, docs in SYNTHETIC_DOCUMENTS.items():
+        for doc_data in docs:
+            doc = Document(page_content=doc_data["content"], metadata=doc_data["metadata"])
+            for chunk in get_chunks([doc], MetaData(**doc_data["metadata"])):
+                chunk.metadata["collection"] = collection
+                chunks.append(chunk)
+    return chunks
+
+
+def embed(chunks, embeddings: str, cache: Path):
+    texts = [chunk.page_content for chunk in chunks]
+    queries = [q.query for q in EVAL_QUERIES]
+    if cache.exists():
+        cached = np.load(cache)
+        if len(cached["docs"]) == len(texts) and len(cached["queries"]) == len(queries):
+            return cached["docs"], cached["queries"]
+    if embeddings == "fake":
+        model = DeterministicFakeEmbedding(size=FULL_DIM)
+    else:
+        model = OpenAIEmbeddings(
+            model="text-embedding-3-small", dimensions=FULL_DIM, check_embedding_ctx_length=not OPENAI_BASE_URL
+        )
+    doc_vectors = np.asarray(model.embed_documents(texts), dtype=np.float32)
+    query_vectors = np.asarray(model.embed_documents(queries), dtype=np.float32)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(cache, docs=doc_vectors, queries=query_vectors)
+    return doc_vectors, query_vectors
+
+
+def evaluate(chunks, doc_vectors, query_vectors, dim, precision, rescore):
+    """(Hit@5, Recall@5 vs exact full-dimension float32) over the eval queries"""
+    docs = truncate(doc_vectors, dim)
+    queries = truncate(query_vectors, dim)
+    exact = truncate(doc_vectors, FULL_DIM)
+    hits, recalls = [], []
+    for eval_query, query, full_query in zip(EVAL_QUERIES, queries, truncate(query_vectors, FULL_DIM)):
+        rows = np.array([
+            i for i, chunk in enumerate(chunks)
+            if chunk.metadata["collection"] == eval_query.collection
+            and chunk.metadata["language"] == eval_query.language
+        ])
+        if not len(rows):
+            continue
+        found, _ = QuantizedVectors(docs[rows], precision, rescore).search(query, K)
+        expected, _ = QuantizedVectors(exact[rows]).search(full_query, K)
+        recalls.append(len(set(found) & set(expected)) / len(expected))
+        texts = [chunks[rows[i]].page_content.lower() for i in found]
+        hits.append(any(truth.lower() in text for truth in eval_query.ground_truth_chunks for text in texts))
+    return float(np.mean(hits)), float(np.mean(recalls))
+
+
+def latency(doc_vectors, query_vectors, rows, dim, precision, rescore, rng):
+    """p50/p95 search latency (ms) over `rows` noisy copies of the corpus vectors"""
+    base = truncate(doc_vectors, dim)
+    picks = rng.integers(0, len(base), rows)
+    vectors = truncate(base[picks] + 0.05 * rng.standard_normal((rows, dim), dtype=np.float32) / np.sqrt(dim), dim)
+    index = QuantizedVectors(vectors, precision, rescore)
+    timings = []
+    for query in truncate(query_vectors, dim):
+        start = time.perf_counter()
+        index.search(query, K)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def bytes_per_vector(dim, precision):
+    return {"float32": 4 * dim, "float16": 2 * dim, "int8": dim, "binary": (dim + 7) // 8}[precision]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--embeddings", choices=["openai", "fake"], default="openai")
+    parser.add_argument("--dims", default="256,512,1024,1536")
+    parser.add_argument("--precisions", default=",".join(PRECISIONS))
+    parser.add_argument("--rescore", default="0,4", help="rescore factors tried for reduced precisions")
+    parser.add_argument("--latency-rows", type=int, default=100_000)
+    parser.add_argument("--project-rows", type=int, default=1_000_000)
+    parser.add_argument("--cache", default="reports/quantization_vectors.npz")
+    parser.add_argument("--output-dir", default="reports")
+    args = parser.parse_args()
+
+    chunks = build_corpus()
+    cache = Path(args.cache)
+    if args.embeddings == "fake":
+        cache = cache.with_name(f"{cache.stem}_fake{cache.suffix}")
+    doc_vectors, query_vectors = embed(chunks, args.embeddings, cache)
+    print(f"{len(chunks)} chunks, {len(query_vectors)} eval queries ({args.embeddings} embeddings)")
+
+    rng = np.random.default_rng(0)
+    header = "| dim | precision | rescore | Hit@5 | Recall@5 | bytes/vector | RAM @ {:,} | p50 ms | p95 ms |".format(args.project_rows)
+    lines = [header, "|---|---|---|---|---|---|---|---|---|"]
+    print(header)
+    for dim in [int(d) for d in args.dims.split(",")]:
+        for precision in args.precisions.split(","):
+            factors = [0] if precision == "float32" else [int(r) for r in args.rescore.split(",")]
+            for rescore in factors:
+                hit, recall = evaluate(chunks, doc_vectors, query_vectors, dim, precision, rescore)
+                p50, p95 = latency(doc_vectors, query_vectors, args.latency_rows, dim, precision, rescore, rng)
+                size = bytes_per_vector(dim, precision)
+                line = (
+                    f"| {dim} | {precision} | {rescore or '-'} | {hit:.3f} | {recall:.3f} | {size} | "
+                    f"{size * args.project_rows / 2**20:,.0f} MiB | {p50:.2f} | {p95:.2f} |"
+                )
+                lines.append(line)
+                print(line)
+
+    out = Path(args.output_dir)
+    out.mkdir(exist_ok=True)
+    path = out / f"quantization_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    with open(path, "w") as f:
+        f.write("# Vector Quantization Report\n\n")
+        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"{len(chunks)} chunks, {len(query_vectors)} eval queries, {args.embeddings} embeddings. ")
+        f.write(f"Latency over {args.latency_rows:,} vectors; RAM is the candidate copy only ")
+        f.write("(rescoring reads full-precision vectors from disk).\n\n")
+        f.write("\n".join(lines) + "\n")
+    print(f"✓ Saved quantization report: {path}")
+
+
+if __name__ == "__main__":
+    main()
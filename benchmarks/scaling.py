@@ -0,0 +1,223 @@
+"""
+Scaling benchmark: base vs hierarchical retrieval latency and recall against corpus size.
+
+For every `--sizes` entry a `SyntheticCorpus` of that many chunks is
+inserted into a fresh collection (numpy or Milvus Lite backend, FLAT
+index, in a temporary directory) and its paired queries are run through
+`retrieval.retrieval` twice, with their precomputed query vectors:
+
+- base: language filter only, as the Chat tab's standard RAG
+- hierarchical: language, domain/section/topic and doc type
+
+It reports insert throughput, p50/p95 of the vector search and of the
+whole retrieval call, Recall@5 and MRR of each query's source chunk, and
+the mean share of the collection the hierarchical filter keeps. A
+markdown report with SVG charts of latency and recall against size is
+written to `--output-dir`.
+
+    uv run python -m benchmarks.scaling --sizes 10000,100000,1000000
+    uv run python -m benchmarks.scaling --collection bank --skew 1.5 --backend milvus --sizes 10000,100000
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+# src modules read their storage paths from the environment at import time,
+# so they are imported once those point at the temporary directory.
+
+K = 5
+MODES = ("base", "hierarchical")
+COLORS = {"base": "#1f77b4", "hierarchical": "#d62728"}
+
+
+def svg_chart(title: str, sizes: List[int], series: Dict[str, List[float]], y_label: str, log_y: bool = False) -> str:
+    """Line chart of `series` against corpus size (log x axis)"""
+    width, height, left, right, top, bottom = 560, 320, 64, 130, 36, 44
+    plot_w, plot_h = width - left - right, height - top - bottom
+    xs = np.log10(sizes)
+    values = np.array([v for vs in series.values() for v in vs], dtype=float)
+    if log_y:
+        values = np.log10(np.maximum(values, 1e-3))
+    y_min, y_max = (0.0, 1.0) if not log_y and values.max() <= 1 else (values.min(), values.max())
+    if y_max == y_min:
+        y_max = y_min + 1
+    x_span = (xs.max() - xs.min()) or 1.0
+
+    def point(x: float, y: float) -> str:
+        px = left + (x - xs.min()) / x_span * plot_w
+        py = top + plot_h - (y - y_min) / (y_max - y_min) * plot_h
+        return f"{px:.1f},{py:.1f}"
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="11">',
+        f'<text x="{width / 2}" y="20" text-anchor="middle" font-size="13">{title}</text>',
+        f'<rect x="{left}" y="{top}" width="{plot_w}" height="{plot_h}" fill="none" stroke="#999"/>',
+        f'<text x="14" y="{top + plot_h / 2}" transform="rotate(-90 14 {top + plot_h / 2})" text-anchor="middle">{y_label}</text>',
+        f'<text x="{left + plot_w / 2}" y="{height - 8}" text-anchor="middle">chunks</text>',
+    ]
+    for x, size in zip(xs, sizes):
+        px = point(x, y_min).split(",")[0]
+        parts.append(f'<text x="{px}" y="{top + plot_h + 16}" text-anchor="middle">{size:,}</text>')
+    for y in np.linspace(y_min, y_max, 5):
+        label = f"{10 ** y:.3g}" if log_y else f"{y:.3g}"
+        py = point(xs.min(), y).split(",")[1]
+        parts.append(f'<text x="{left - 6}" y="{py}" text-anchor="end" dominant-baseline="middle">{label}</text>')
+    for i, (name, vs) in enumerate(series.items()):
+        ys = np.log10(np.maximum(vs, 1e-3)) if log_y else np.asarray(vs, dtype=float)
+        color = COLORS.get(name.split()[0], "#2ca02c")
+        dash = ' stroke-dasharray="5,3"' if "search" in name else ""
+        points = " ".join(point(x, y) for x, y in zip(xs, ys))
+        parts.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"{dash}/>')
+        parts.append(f'<line x1="{width - right + 10}" y1="{top + 10 + 16 * i}" x2="{width - right + 30}" y2="{top + 10 + 16 * i}" stroke="{color}" stroke-width="2"{dash}/>')
+        parts.append(f'<text x="{width - right + 34}" y="{top + 14 + 16 * i}">{name}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def run_size(size: int, args) -> dict:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from src.core.index import MetaData, get_vectorstore, index_hierarchy_path
+    from src.core.retrieval import retrieval
+    from src.core.synthetic_corpus import SyntheticCorpus
+
+    corpus = SyntheticCorpus(args.collection, size, skew=args.skew, dim=args.dim, seed=args.seed)
+    # the queries never embed: retrieval searches by their precomputed vectors
+    vectorstore = get_vectorstore(f"scaling_{size}", drop_old=True, embeddings=DeterministicFakeEmbedding(size=args.dim))
+    leaf_share = np.zeros((len(corpus.leaves), len(corpus.language_labels), len(corpus.doc_type_labels)))
+
+    insert_s = 0.0
+    for batch in corpus:
+        np.add.at(leaf_share, (batch.leaf, batch.language, batch.doc_type), 1)
+        vectors = batch.vectors if args.backend == "numpy" else batch.vectors.tolist()
+        start = time.perf_counter()
+        vectorstore.add_embeddings(batch.texts, vectors, batch.metadatas(corpus), ids=batch.ids, batch_size=10000)
+        insert_s += time.perf_counter() - start
+    if args.backend == "milvus":
+        index_hierarchy_path(vectorstore)
+    leaf_share /= size
+
+    queries, query_vectors = corpus.queries(args.queries, seed=args.seed)
+    result = {"size": size, "insert_rows_s": size / insert_s}
+    for mode in MODES:
+        search_ms, total_ms, ranks = [], [], []
+        for query, vector in zip(queries, query_vectors):
+            if mode == "base":
+                filters = MetaData(language=query.language)
+            else:
+                filters = MetaData(
+                    language=query.language, domain=query.domain, section=query.section,
+                    topic=query.topic, doc_type=query.doc_type,
+                )
+            timings = {}
+            start = time.perf_counter()
+            docs = retrieval(query.query, filters, vectorstore, query_vector=vector.tolist(), timings=timings)
+            total_ms.append((time.perf_counter() - start) * 1000)
+            search_ms.append(timings.get("vector_search", float("nan")))
+            chunk_ids = [doc.metadata.get("chunk_id") for doc in docs[:K]]
+            answer = query.ground_truth_chunks[0]
+            ranks.append(chunk_ids.index(answer) + 1 if answer in chunk_ids else 0)
+        ranks = np.array(ranks)
+        result[mode] = {
+            "search_p50": np.percentile(search_ms, 50),
+            "search_p95": np.percentile(search_ms, 95),
+            "total_p50": np.percentile(total_ms, 50),
+            "total_p95": np.percentile(total_ms, 95),
+            "recall": float((ranks > 0).mean()),
+            "mrr": float(np.where(ranks > 0, 1 / np.maximum(ranks, 1), 0).mean()),
+        }
+    result["hier_share"] = float(np.mean([
+        leaf_share[
+            corpus.leaves.index({level: getattr(q, level) for level in ("domain", "section", "topic")}),
+            corpus.language_labels.index(q.language),
+            corpus.doc_type_labels.index(q.doc_type),
+        ] for q in queries
+    ]))
+    vectorstore.client.drop_collection(vectorstore.collection_name)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="corpus sizes in chunks (up to 10M)")
+    parser.add_argument("--collection", default="hospital", choices=["hospital", "bank", "fluid_simulation"])
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of chunks per leaf; 0 is uniform")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backend", choices=["numpy", "milvus"], default="numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="reports")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            VECTOR_BACKEND=args.backend,
+            NUMPY_STORE_DIR=str(Path(tmp) / "numpy_store"),
+            COLLECTION_ALIASES_PATH=str(Path(tmp) / "aliases.json"),
+            CHUNK_TEXT_DIR=str(Path(tmp) / "chunk_text"),
+            METADATA_DICTIONARIES_PATH=str(Path(tmp) / "metadata_dictionaries.json"),
+        )
+        os.environ.setdefault("OPENAI_API_KEY", "unused")
+        from src.core import index
+
+        # not through the environment: pymilvus reads MILVUS_URI itself and wants a server URL there
+        index.MILVUS_URI, index.MILVUS_API_KEY = str(Path(tmp) / "scaling.db"), ""
+        print(f"{args.collection}, {args.backend} backend, skew {args.skew:g}, {args.queries} queries per size")
+        print(f"{'chunks':>10} {'insert/s':>10} {'mode':<13} {'search p50':>10} {'p95':>8} {'total p50':>10} {'R@5':>6} {'MRR':>6}")
+        for size in sizes:
+            # retrieval logs every call
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_size(size, args)
+            results.append(result)
+            for mode in MODES:
+                r = result[mode]
+                print(
+                    f"{size:>10,} {result['insert_rows_s']:>10,.0f} {mode:<13} {r['search_p50']:>10.2f} "
+                    f"{r['search_p95']:>8.2f} {r['total_p50']:>10.2f} {r['recall']:>6.3f} {r['mrr']:>6.3f}"
+                )
+
+    out = Path(args.output_dir)
+    out.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    charts = {
+        "latency": svg_chart(
+            "Retrieval latency p50 (ms)", sizes,
+            {f"{mode} {stage}": [r[mode][f"{stage}_p50"] for r in results] for mode in MODES for stage in ("search", "total")},
+            "ms", log_y=True,
+        ),
+        "recall": svg_chart("Recall@5 of the source chunk", sizes, {mode: [r[mode]["recall"] for r in results] for mode in MODES}, "recall@5"),
+    }
+    for name, svg in charts.items():
+        (out / f"scaling_{name}_{stamp}.svg").write_text(svg, encoding="utf-8")
+
+    path = out / f"scaling_{stamp}.md"
+    with open(path, "w") as f:
+        f.write("# Scaling Benchmark Report\n\n")
+        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"Collection `{args.collection}`, {args.backend} backend (FLAT), {args.dim}-d synthetic vectors, ")
+        f.write(f"Zipf skew {args.skew:g}, {args.queries} paired queries per size, top-{K}.\n\n")
+        f.write(f"![latency](scaling_latency_{stamp}.svg)\n![recall](scaling_recall_{stamp}.svg)\n\n")
+        f.write("| Chunks | Insert rows/s | Mode | Search p50 ms | Search p95 ms | Retrieval p50 ms | Retrieval p95 ms | Recall@5 | MRR | Rows kept |\n")
+        f.write("|---|---|---|---|---|---|---|---|---|---|\n")
+        for result in results:
+            for mode in MODES:
+                r = result[mode]
+                kept = f"{result['hier_share']:.2%}" if mode == "hierarchical" else "~50% (language)"
+                f.write(
+                    f"| {result['size']:,} | {result['insert_rows_s']:,.0f} | {mode} | {r['search_p50']:.2f} | {r['search_p95']:.2f} "
+                    f"| {r['total_p50']:.2f} | {r['total_p95']:.2f} | {r['recall']:.3f} | {r['mrr']:.3f} | {kept} |\n"
+                )
+    print(f"✓ Saved scaling report: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,17 +10,18 @@ _project_root = Path(__file__).resolve().parents[1]
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
-from src.core.ingest import load_documents, get_chunks, ingest_documents
+from src.core.jobs import job_manager
+from src.core.ingest import delete_documents, compact_collection
 from src.core.retrieval import generate, retrieval
-from src.core.index import MetaData, get_vectorstore
+from src.core.index import MetaData, get_vectorstore, rollback_alias
 from src.core.synthetic_data import EVAL_QUERIES, SYNTHETIC_DOCUMENTS
-from src.core.eval import run_full_evaluation, save_results
+from src.core.eval import run_full_evaluation, save_results, EVAL_RESUME
 from src.core.eval import generate_summary_report, setup_test_data
 
 
-def ingest_files(files:List[str], index_name:str, lang:Literal["en", "ja"], domain:Optional[str], section:Optional[str], topic:Optional[str], doc_type:Optional[Literal["manual", "policy", "faq"]]):
+def ingest_files(files:List[str], index_name:str, lang:Literal["en", "ja"], domain:Optional[str], section:Optional[str], topic:Optional[str], doc_type:Optional[Literal["manual", "policy", "faq"]], auto_classify:bool=False, replace:bool=False, near_duplicates:Literal["off", "drop", "link"]="off", config:Optional[dict]=None):
     """
-    Load, chunk, embed, and store files in a vector database.
+    Queue a background job that loads, chunks, embeds, and stores files in a vector database.
 
     Args:
         files (list): A list of files to process.
@@ -30,17 +31,23 @@ def ingest_files(files:List[str], index_name:str, lang:Literal["en", "ja"], doma
         section (str): The section of the files.
         topic (str): The topic of the files.
         doc_type (str): The document type of the files.
+        auto_classify (bool): Label each chunk's domain/section/topic from the config hierarchy instead of using the values above.
+        replace (bool): Replace earlier versions of files with the same name; unchanged chunks keep their embeddings.
+        near_duplicates (str): What to do with near-duplicate chunks (e.g. repeated boilerplate): keep them ("off"), "drop" them, or "link" them to the first copy so they reuse its embedding.
+        config (dict): The loaded YAML config, required when auto_classify is set.
 
     Returns:
-        dict: A dictionary containing the status of the ingestion.
+        dict: The queued job's status, including the job_id to poll with get_ingestion_status.
     """
     print("files uploaded", files)
     if not files:
         return "Please upload at least one file."
     if not index_name:
         return "Please select an index."
+    if auto_classify and not (config or {}).get(index_name):
+        return "Please upload a YAML config with a hierarchy for this index to auto-classify."
 
-    print(f"--- Starting Ingestion for Index: {index_name} ---")
+    print(f"--- Queueing Ingestion for Index: {index_name} ---")
     print(
         f"With Metadata: lang={lang}, domain={domain}, section={section}, topic={topic}, doc_type={doc_type}"
     )
@@ -49,16 +56,128 @@ def ingest_files(files:List[str], index_name:str, lang:Literal["en", "ja"], doma
         language=lang, domain=domain, section=section, topic=topic, doc_type=doc_type
     )
     try:
-        vectorstore = get_vectorstore(index_name)
-        docs = load_documents(files)
-        chunks = get_chunks(docs, filter_data)
-        message = ingest_documents(chunks, vectorstore)
+        job = job_manager.submit(
+            files,
+            index_name,
+            filter_data,
+            hierarchy=(config or {}).get(index_name),
+            replace=replace,
+            dedup_mode=near_duplicates,
+            auto_classify=auto_classify,
+        )
     except Exception as e:
         message = f"Error during ingestion: {str(e)}"
         print(message)
         return {"status": "error", "message": message}
-    
-    return {"status": "success", "message": message}
+
+    return {
+        **job.progress(),
+        "message": f"Ingestion job {job.job_id} queued for {len(files)} files.",
+    }
+
+
+def get_ingestion_status(job_id:Optional[str]=None):
+    """
+    Get the progress of an ingestion job.
+
+    Args:
+        job_id (str): The id returned by ingest_files. If empty, all jobs are listed.
+
+    Returns:
+        dict: The job status, progress (0-1), file and chunk counts, and throughput in chunks per second.
+    """
+    if not job_id:
+        return {"jobs": job_manager.list_jobs()}
+    status = job_manager.status(job_id)
+    if status is None:
+        return {"status": "error", "message": f"Unknown job: {job_id}"}
+    return status
+
+
+def cancel_ingestion(job_id:str):
+    """
+    Cancel an ingestion job. Batches already committed are kept.
+
+    Args:
+        job_id (str): The id returned by ingest_files.
+
+    Returns:
+        dict: The job status after the cancellation request.
+    """
+    if not job_id or not job_manager.cancel(job_id):
+        return {"status": "error", "message": f"No active job: {job_id}"}
+    return {**job_manager.status(job_id), "message": f"Cancellation requested for job {job_id}."}
+
+
+def _split_names(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def delete_documents_from_index(index_name:str, doc_ids:Optional[str]=None, source_names:Optional[str]=None):
+    """
+    Delete documents and all their chunks from an index.
+
+    Args:
+        index_name (str): The name of the index to delete from.
+        doc_ids (str): Comma-separated document ids.
+        source_names (str): Comma-separated file names.
+
+    Returns:
+        dict: The number of chunks deleted.
+    """
+    doc_ids, source_names = _split_names(doc_ids), _split_names(source_names)
+    if not index_name:
+        return {"status": "error", "message": "Please select an index."}
+    if not doc_ids and not source_names:
+        return {"status": "error", "message": "Please give at least one doc_id or source name."}
+    try:
+        deleted = delete_documents(get_vectorstore(index_name), doc_ids, source_names)
+    except Exception as e:
+        return {"status": "error", "message": f"Error during deletion: {str(e)}"}
+    return {"status": "success", "deleted_chunks": deleted, "message": f"Deleted {deleted} chunks from {index_name}."}
+
+
+def compact_index(index_name:str):
+    """
+    Compact an index so that deleted chunks are purged from storage.
+
+    Args:
+        index_name (str): The name of the index to compact.
+
+    Returns:
+        dict: The compaction status.
+    """
+    if not index_name:
+        return {"status": "error", "message": "Please select an index."}
+    job_id = compact_collection(get_vectorstore(index_name))
+    if job_id is None:
+        return {"status": "skipped", "message": f"Compaction is not available for {index_name}."}
+    return {"status": "success", "message": f"Compaction {job_id} started for {index_name}."}
+
+
+def rollback_index(index_name:str):
+    """
+    Point an index back at the version it used before its last rebuild.
+
+    Args:
+        index_name (str): The name of the index to roll back.
+
+    Returns:
+        dict: The collection the index now points to.
+    """
+    try:
+        collection = rollback_alias(index_name)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "message": f"{index_name} now serves {collection}."}
+
+
+def _job_id_from_status(status):
+    return status.get("job_id") if isinstance(status, dict) and status.get("job_id") else gr.update()
+
+
+def _poll_ingestion_status(job_id):
+    return get_ingestion_status(job_id) if job_id else gr.update()
 
 def _add_metric(doc):
     return (f"\n### source: {doc.metadata.get('source_name','None')}"
@@ -230,13 +349,15 @@ def setup_synthetic_data(collections: List[str]):
         return f"❌ Error setting up test data: {str(e)}"
 
 
-def run_evaluation_batch(collections:List[str], output_dir:str, progress=gr.Progress(track_tqdm=True)):
+def run_evaluation_batch(collections:List[str], output_dir:str, mode:Literal["full", "retrieval"]="full", resume:bool=False, progress=gr.Progress(track_tqdm=True)):
     """
     Run a full batch evaluation.
 
     Args:
         collections (list): A list of collections to evaluate. 
         output_dir (str): The directory to save the evaluation reports in.
+        mode (str): "full" to also generate answers (cached on disk), "retrieval" to skip generation.
+        resume (bool): Reuse stored results of queries already evaluated with the same config.
         progress (gradio.Progress): A Gradio progress object to track the evaluation progress.
 
     Returns:
@@ -256,26 +377,25 @@ def run_evaluation_batch(collections:List[str], output_dir:str, progress=gr.Prog
         Path(output_dir).mkdir(exist_ok=True, parents=True)
         
         # Run evaluation
-        results = run_full_evaluation(collections, output_dir)
+        results = run_full_evaluation(collections, output_dir, mode=mode, resume=resume)
         
         # Save results
         csv_path, json_path = save_results(results, output_dir)
         md_path = generate_summary_report(results, output_dir)
         
         # Create summary statistics
-        import numpy as np
         base_results = results["base"]
         hier_results = results["hierarchical"]
         
         summary_stats = {
             "Total Queries": len(base_results),
             "Collections": ", ".join(collections),
-            "Base Hit@5": f"{np.mean([r.hit_at_5 for r in base_results]) * 100:.1f}%",
-            "Hier Hit@5": f"{np.mean([r.hit_at_5 for r in hier_results]) * 100:.1f}%",
-            "Base MRR": f"{np.mean([r.mrr for r in base_results]):.3f}",
-            "Hier MRR": f"{np.mean([r.mrr for r in hier_results]):.3f}",
-            "Base Avg Latency": f"{np.mean([r.total_latency_ms for r in base_results]):.0f}ms",
-            "Hier Avg Latency": f"{np.mean([r.total_latency_ms for r in hier_results]):.0f}ms",
+            "Base Hit@5": f"{base_results.mean('hit_at_5') * 100:.1f}%",
+            "Hier Hit@5": f"{hier_results.mean('hit_at_5') * 100:.1f}%",
+            "Base MRR": f"{base_results.mean('mrr'):.3f}",
+            "Hier MRR": f"{hier_results.mean('mrr'):.3f}",
+            "Base Avg Latency": f"{base_results.mean('total_latency_ms'):.0f}ms",
+            "Hier Avg Latency": f"{hier_results.mean('total_latency_ms'):.0f}ms",
         }
         
         # Load markdown summary
@@ -367,11 +487,40 @@ with gr.Blocks(theme=gr.themes.Soft(), title="RAG Evaluation System") as demo:
                     choices=[],  # Populated dynamically
                     info="Upload YAML and select an index to populate."
                 )
+                auto_classify_ingest = gr.Checkbox(
+                    label="Auto-classify chunks",
+                    value=False,
+                    info="Assign domain/section/topic per chunk from the YAML hierarchy.",
+                )
+                replace_ingest = gr.Checkbox(
+                    label="Replace existing versions",
+                    value=False,
+                    info="Delete older versions of files with the same name after ingesting.",
+                )
+                near_duplicates_ingest = gr.Radio(
+                    label="Near-duplicate chunks",
+                    choices=["off", "drop", "link"],
+                    value="off",
+                    info="Drop repeated boilerplate, or link it to its first copy without re-embedding.",
+                )
 
                 ingest_button = gr.Button("Process and Ingest Files", variant="primary")
 
             with gr.Column(scale=1):
+                ingest_job_id = gr.Textbox(label="Ingestion Job ID")
+                with gr.Row():
+                    refresh_job_button = gr.Button("Refresh Status")
+                    cancel_job_button = gr.Button("Cancel Job", variant="stop")
                 ingest_output = gr.JSON(label="Ingestion Status and Sample Metadata")
+                ingest_timer = gr.Timer(2.0)
+
+                with gr.Accordion("Manage Documents", open=False):
+                    delete_doc_ids = gr.Textbox(label="Doc IDs", placeholder="Comma-separated doc_id values")
+                    delete_source_names = gr.Textbox(label="Source Names", placeholder="e.g. policy.pdf, manual.txt")
+                    with gr.Row():
+                        delete_button = gr.Button("Delete Documents", variant="stop")
+                        compact_button = gr.Button("Compact Index")
+                        rollback_button = gr.Button("Rollback Index")
 
         ingest_button.click(
             fn=ingest_files,
@@ -383,8 +532,48 @@ with gr.Blocks(theme=gr.themes.Soft(), title="RAG Evaluation System") as demo:
                 section_select_ingest,
                 topic_select_ingest,
                 doc_type_select_ingest,
+                auto_classify_ingest,
+                replace_ingest,
+                near_duplicates_ingest,
+                config_state,
             ],
             outputs=[ingest_output],
+        ).then(
+            fn=_job_id_from_status,
+            inputs=[ingest_output],
+            outputs=[ingest_job_id],
+            show_api=False
+        )
+        refresh_job_button.click(
+            fn=get_ingestion_status,
+            inputs=[ingest_job_id],
+            outputs=[ingest_output],
+        )
+        cancel_job_button.click(
+            fn=cancel_ingestion,
+            inputs=[ingest_job_id],
+            outputs=[ingest_output],
+        )
+        delete_button.click(
+            fn=delete_documents_from_index,
+            inputs=[index_select_ingest, delete_doc_ids, delete_source_names],
+            outputs=[ingest_output],
+        )
+        compact_button.click(
+            fn=compact_index,
+            inputs=[index_select_ingest],
+            outputs=[ingest_output],
+        )
+        rollback_button.click(
+            fn=rollback_index,
+            inputs=[index_select_ingest],
+            outputs=[ingest_output],
+        )
+        ingest_timer.tick(
+            fn=_poll_ingestion_status,
+            inputs=[ingest_job_id],
+            outputs=[ingest_output],
+            show_api=False
         )
 
     with gr.Tab("💬 Chat with Data"):
@@ -495,6 +684,19 @@ with gr.Blocks(theme=gr.themes.Soft(), title="RAG Evaluation System") as demo:
                     info="Directory where evaluation reports will be saved"
                 )
 
+                eval_mode = gr.Radio(
+                    label="Evaluation Mode",
+                    choices=["full", "retrieval"],
+                    value="full",
+                    info="Retrieval skips answer generation; Hit@k, MRR and similarity do not depend on it.",
+                )
+
+                eval_resume = gr.Checkbox(
+                    label="Resume from stored results",
+                    value=EVAL_RESUME,
+                    info="Reuse results of queries already evaluated with the same config. Code, chunking and corpus changes are not detected.",
+                )
+
                 with gr.Accordion("SYNTHETIC_DOCUMENTS", open=False):
                     gr.JSON(value=SYNTHETIC_DOCUMENTS)
                 with gr.Accordion("EVAL_QUERIES", open=False):
@@ -546,7 +748,7 @@ with gr.Blocks(theme=gr.themes.Soft(), title="RAG Evaluation System") as demo:
         
         run_eval_btn.click(
             fn=run_evaluation_batch,
-            inputs=[eval_collections, eval_output_dir],
+            inputs=[eval_collections, eval_output_dir, eval_mode, eval_resume],
             outputs=[
                 eval_status,
                 eval_summary_stats,
@@ -594,5 +796,9 @@ with gr.Blocks(theme=gr.themes.Soft(), title="RAG Evaluation System") as demo:
     )
 
 
+# Restart jobs interrupted by a crash or restart, however the app is launched (`gradio src/app.py`
+# imports this module); jobs already running in this process are skipped on reloads.
+job_manager.resume()
+
 if __name__ == "__main__":
     demo.launch(mcp_server=True)
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Linear-time sentence-aware chunker with exact character offsets.
+
+The text is cut once into sentence segments (Japanese 。！？ and English
+. ! ? endings, line breaks), oversized segments are cut further at clause
+marks (、，, ;) and whitespace, and the segments are then packed greedily
+into chunks with overlap. Offsets come from the scan itself, so every chunk
+is exactly `text[start_index:end_index]`.
+"""
+
+import re
+from typing import Callable, List, Tuple
+from langchain_core.documents import Document
+
+from .utils import estimate_tokens
+
+# Sentence ends: CJK terminators (plus closing brackets/quotes), ASCII
+# terminators followed by whitespace, and line breaks. The pattern starts with
+# a plain character class so the regex engine can scan for candidates quickly;
+# the lookbehinds then pick the branch for the character found.
+SENTENCE_END = re.compile(
+    r"[。．！？.!?\n](?:(?<=[。．！？])[。．！？]*[」』）】]*\s*"
+    r"|(?<=[.!?])[.!?]*[\"')\]]*(?:\s+|$)"
+    r"|(?<=\n)\s*)"
+)
+# Secondary breaks for sentences longer than a chunk.
+CLAUSE_END = re.compile(r"[、，；：]\s*|[,;:]\s+")
+WHITESPACE = re.compile(r"\s+")
+
+Span = Tuple[int, int]
+
+
+def _cut(text: str, start: int, end: int, pattern: re.Pattern) -> List[Span]:
+    """Cut text[start:end] after every match of `pattern`"""
+    spans = []
+    pos = start
+    for match in pattern.finditer(text, start, end):
+        if match.end() > pos:
+            spans.append((pos, match.end()))
+            pos = match.end()
+    if pos < end:
+        spans.append((pos, end))
+    return spans
+
+
+class Chunker:
+    """Split text into overlapping chunks of at most `chunk_size` units.
+
+    Units are characters by default; pass a `length_function` (or use
+    `Chunker.by_tokens`) to size chunks in tokens. Lengths are measured per
+    segment and summed, so token counts are approximate at segment joins.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+        length_function: Callable[[str], int] = len,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+
+    @classmethod
+    def by_tokens(cls, chunk_size: int = 300, chunk_overlap: int = 50, encoding_name: str = "cl100k_base") -> "Chunker":
+        """Chunker sized in tokens of the embedding model's tokenizer"""
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(encoding_name)
+
+            def length_function(text: str) -> int:
+                return len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            print(f"tiktoken encoding '{encoding_name}' unavailable ({e}), estimating tokens instead")
+            length_function = estimate_tokens
+        return cls(chunk_size, chunk_overlap, length_function)
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        # Character lengths need no slice copy.
+        if self.length_function is len:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def _segments(self, text: str) -> List[Tuple[int, int, int]]:
+        """Sentence segments as (start, end, length), each no longer than chunk_size"""
+        segments = []
+        for start, end in _cut(text, 0, len(text), SENTENCE_END):
+            self._fit(text, start, end, 0, segments)
+        return segments
+
+    def _fit(self, text: str, start: int, end: int, level: int, out: List[Tuple[int, int, int]]):
+        """Append text[start:end] to `out`, cutting finer while it exceeds chunk_size"""
+        length = self._length(text, start, end)
+        if length <= self.chunk_size:
+            out.append((start, end, length))
+            return
+        finer = [CLAUSE_END, WHITESPACE]
+        if level < len(finer):
+            for sub_start, sub_end in _cut(text, start, end, finer[level]):
+                self._fit(text, sub_start, sub_end, level + 1, out)
+            return
+        # No natural break left: hard cut. A character may still take several
+        # tokens (emoji, rare CJK), so each piece is measured and shrunk until it fits.
+        pos = start
+        while pos < end:
+            piece_end = min(end, pos + self.chunk_size)
+            length = self._length(text, pos, piece_end)
+            while length > self.chunk_size and piece_end - pos > 1:
+                piece_end = pos + max(1, min(piece_end - pos - 1, (piece_end - pos) * self.chunk_size // length))
+                length = self._length(text, pos, piece_end)
+            out.append((pos, piece_end, length))
+            pos = piece_end
+
+    def split_text_with_offsets(self, text: str) -> List[Span]:
+        """Chunk `text`, returning (start, end) offsets of each chunk"""
+        segments = self._segments(text)
+        spans: List[Span] = []
+        i = 0
+        while i < len(segments):
+            j, total = i, 0
+            while j < len(segments) and (j == i or total + segments[j][2] <= self.chunk_size):
+                total += segments[j][2]
+                j += 1
+            start, end = segments[i][0], segments[j - 1][1]
+            # Trim surrounding whitespace without losing offsets.
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                spans.append((start, end))
+            if j >= len(segments):
+                break
+            # Step back over trailing segments that fit in the overlap budget.
+            k, overlap = j, 0
+            while k - 1 > i and overlap + segments[k - 1][2] <= self.chunk_overlap:
+                k -= 1
+                overlap += segments[k][2]
+            i = k
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_text_with_offsets(text)]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Chunk documents, adding `start_index`/`end_index` to each chunk's metadata"""
+        chunks = []
+        for doc in documents:
+            for start, end in self.split_text_with_offsets(doc.page_content):
+                chunks.append(
+                    Document(
+                        page_content=doc.page_content[start:end],
+                        metadata={**doc.metadata, "start_index": start, "end_index": end},
+                    )
+                )
+        return chunks
+
+
+# Character-based default, same sizes as the previous RecursiveCharacterTextSplitter
+DEFAULT_CHUNKER = Chunker(chunk_size=1200, chunk_overlap=200)
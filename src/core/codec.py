@@ -0,0 +1,247 @@
+"""
+Dictionary encoding of hierarchy metadata.
+
+In an encoded collection, language/domain/section/topic/doc_type are stored
+as small integers instead of repeating the label strings on every chunk, and
+the hierarchy_path joins those codes ("3/7/") rather than the labels.
+Each physical collection has its own dictionary (code 0 means unset), kept in
+METADATA_DICTIONARIES_PATH and usually seeded from the index's YAML hierarchy.
+New labels are appended at write time. Retrieval translates filters to codes
+and decodes results back, so callers keep working with strings.
+
+Several processes (the app, CLI imports) may write one collection, so codes
+are only ever added under an exclusive lock on the dictionary file, after
+merging what other processes added; a cached dictionary is refreshed when
+the file changes.
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple, get_args, get_origin
+from dotenv import load_dotenv, find_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+find_dotenv()
+load_dotenv()
+
+METADATA_DICTIONARIES_PATH = os.getenv("METADATA_DICTIONARIES_PATH", "./data/metadata_dictionaries.json")
+# Encode the metadata of collections created from now on
+ENCODE_METADATA = os.getenv("ENCODE_METADATA", "false").lower() in ("1", "true", "yes")
+
+ENCODED_FIELDS = ("language", "domain", "section", "topic", "doc_type")
+UNSET = 0
+UNKNOWN = -1  # filter value for a label the collection has never stored
+
+_lock = threading.Lock()
+# collection -> (codec, dictionary file stamp it was last synced with)
+_codecs: Dict[str, Tuple["MetadataCodec", Optional[Tuple[int, int]]]] = {}
+
+
+def _literal_values(annotation) -> List[str]:
+    """Values of a (possibly Optional) Literal annotation"""
+    if get_origin(annotation) is Literal:
+        return list(get_args(annotation))
+    return [value for arg in get_args(annotation) for value in _literal_values(arg)]
+
+
+class MetadataCodec:
+    """Bidirectional label <-> integer code mapping per metadata field"""
+
+    def __init__(self, dictionary: Optional[Dict[str, List[str]]] = None):
+        dictionary = dictionary or {}
+        self.dictionary = {field: list(dictionary.get(field, [])) for field in ENCODED_FIELDS}
+        self.codes = {
+            field: {label: i + 1 for i, label in enumerate(labels)}
+            for field, labels in self.dictionary.items()
+        }
+        self.changed = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy: Optional[dict] = None) -> "MetadataCodec":
+        """Seed codes from a YAML index entry and the fixed MetaData literals"""
+        from .index import MetaData
+
+        hierarchy = hierarchy or {}
+        return cls({
+            "language": _literal_values(MetaData.model_fields["language"].annotation),
+            "doc_type": _literal_values(MetaData.model_fields["doc_type"].annotation),
+            "domain": sorted(hierarchy.get("domains") or []),
+            "section": sorted(hierarchy.get("sections") or []),
+            "topic": sorted(hierarchy.get("topics") or []),
+        })
+
+    def code(self, field: str, label: Optional[str], add: bool = False) -> int:
+        if label is None:
+            return UNSET
+        code = self.codes[field].get(label)
+        if code is None:
+            if not add:
+                return UNKNOWN
+            with self.lock:
+                code = self.codes[field].get(label)
+                if code is None:
+                    self.dictionary[field].append(label)
+                    code = self.codes[field][label] = len(self.dictionary[field])
+                    self.changed = True
+        return code
+
+    def merge(self, dictionary: Dict[str, List[str]]):
+        """Append the labels another process added; codes already given never change"""
+        with self.lock:
+            for field in ENCODED_FIELDS:
+                labels, known = dictionary.get(field, []), self.dictionary[field]
+                if labels[:len(known)] != known:
+                    raise ValueError(f"Stored {field} dictionary conflicts with the cached one")
+                for label in labels[len(known):]:
+                    known.append(label)
+                    self.codes[field][label] = len(known)
+
+    def new_labels(self, metadatas: List[dict]) -> Dict[str, List[str]]:
+        """Labels of `metadatas` that have no code yet, per field"""
+        return {
+            field: [
+                label for label in dict.fromkeys(metadata.get(field) for metadata in metadatas)
+                if isinstance(label, str) and label not in self.codes[field]
+            ]
+            for field in ENCODED_FIELDS
+        }
+
+    def label(self, field: str, code: int) -> Optional[str]:
+        if code is None or code <= UNSET or code > len(self.dictionary[field]):
+            return None
+        return self.dictionary[field][code - 1]
+
+    def encode(self, metadata: dict) -> dict:
+        """Copy of `metadata` with the hierarchy fields as codes (new labels get new codes)"""
+        encoded = dict(metadata)
+        for field in ENCODED_FIELDS:
+            if field in encoded:
+                encoded[field] = self.code(field, encoded[field], add=True)
+        return encoded
+
+    def decode(self, metadata: dict) -> dict:
+        decoded = dict(metadata)
+        for field in ENCODED_FIELDS:
+            if isinstance(decoded.get(field), int):
+                decoded[field] = self.label(field, decoded[field])
+        return decoded
+
+
+def _load() -> Dict[str, dict]:
+    path = Path(METADATA_DICTIONARIES_PATH)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _store(dictionaries: Dict[str, dict]):
+    path = Path(METADATA_DICTIONARIES_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(dictionaries, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _stamp() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(METADATA_DICTIONARIES_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextmanager
+def _file_lock():
+    """Exclusive across threads and processes for a read-modify-write of the dictionary file"""
+    path = Path(f"{METADATA_DICTIONARIES_PATH}.lock")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock, open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _sync(collection_name: str, dictionaries: Dict[str, dict]) -> Optional[MetadataCodec]:
+    """Cached codec updated from the file contents (caller holds `_lock`)"""
+    dictionary = dictionaries.get(collection_name)
+    cached = _codecs.get(collection_name)
+    if dictionary is None:
+        _codecs.pop(collection_name, None)
+        return None
+    if cached is None:
+        codec = MetadataCodec(dictionary)
+    else:
+        codec = cached[0]
+        codec.merge(dictionary)
+    _codecs[collection_name] = (codec, _stamp())
+    return codec
+
+
+def get_codec(collection_name: str) -> Optional[MetadataCodec]:
+    """The codec of an encoded collection, or None for a collection storing strings"""
+    with _lock:
+        cached = _codecs.get(collection_name)
+        if cached is not None and cached[1] == _stamp():
+            return cached[0]
+        return _sync(collection_name, _load())
+
+
+def register_codec(collection_name: str, codec: MetadataCodec) -> MetadataCodec:
+    """Mark a collection as encoded; call before its first write.
+
+    If another process registered the collection first, its dictionary is
+    kept and returned instead of `codec`.
+    """
+    with _file_lock():
+        dictionaries = _load()
+        if collection_name not in dictionaries:
+            dictionaries[collection_name] = codec.dictionary
+            _store(dictionaries)
+            _codecs[collection_name] = (codec, None)
+        return _sync(collection_name, dictionaries)
+
+
+def add_labels(collection_name: str, metadatas: List[dict]) -> MetadataCodec:
+    """Give the new labels of `metadatas` codes in the collection's stored dictionary.
+
+    Codes are assigned under the file lock after merging labels other
+    processes added, so one code never stands for two labels.
+    """
+    codec = get_codec(collection_name)
+    if codec is None:
+        raise ValueError(f"Collection {collection_name} is not dictionary-encoded")
+    if not any(codec.new_labels(metadatas).values()):
+        return codec
+    with _file_lock():
+        dictionaries = _load()
+        codec = _sync(collection_name, dictionaries)
+        if codec is None:
+            raise ValueError(f"Collection {collection_name} is not dictionary-encoded")
+        for field, labels in codec.new_labels(metadatas).items():
+            for label in labels:
+                codec.code(field, label, add=True)
+        dictionaries[collection_name] = codec.dictionary
+        _store(dictionaries)
+        codec.changed = False
+        _codecs[collection_name] = (codec, _stamp())
+    return codec
+
+
+def drop_codec(collection_name: str):
+    with _file_lock():
+        _codecs.pop(collection_name, None)
+        dictionaries = _load()
+        if dictionaries.pop(collection_name, None) is not None:
+            _store(dictionaries)
@@ -0,0 +1,135 @@
+"""
+Near-duplicate chunk detection with MinHash LSH.
+
+Chunks are normalised (NFKC, lower case) and cut into shingles: word
+3-grams for space-separated text, character 3-grams for Japanese and other
+text written without spaces. A MinHash signature estimates the Jaccard
+similarity of two shingle sets; LSH banding finds candidate pairs without
+comparing every chunk against every other, and candidates are confirmed
+against the signature estimate.
+"""
+
+import os
+import re
+import zlib
+import unicodedata
+from typing import Dict, List, Literal, Optional, Set, Tuple
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+
+find_dotenv()
+load_dotenv()
+
+# "off" | "drop" | "link"
+NEAR_DUPLICATE_MODE = os.getenv("NEAR_DUPLICATE_MODE", "off")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+
+# Kana, CJK ideographs and half-width katakana
+CJK = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uff66-\uff9f]")
+WORD = re.compile(r"\w+")
+NON_WORD = re.compile(r"[\W_]+")
+
+DedupMode = Literal["off", "drop", "link"]
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """Word k-grams, or character k-grams for text written mostly without spaces"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    compact = NON_WORD.sub("", text)
+    if len(CJK.findall(compact)) > 0.3 * len(compact):
+        grams = {compact[i:i + k] for i in range(len(compact) - k + 1)}
+        return grams or {compact}
+    words = WORD.findall(text)
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return grams or {" ".join(words)}
+
+
+def _bands_for(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) whose LSH threshold (1/b)^(1/r) is the highest not above `threshold`"""
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda br: (1 / br[0]) ** (1 / br[1])) if below else options[0]
+
+
+class NearDuplicateDetector:
+    """Streaming MinHash LSH index mapping each near-duplicate to the first chunk seen.
+
+    `mode` tells `get_chunks` what to do with a near-duplicate: keep it as is
+    ("off", the NEAR_DUPLICATE_MODE default), "drop" it, or "link" it to its
+    canonical chunk through the `canonical_id` metadata field.
+    """
+
+    def __init__(
+        self,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        mode: DedupMode = NEAR_DUPLICATE_MODE,
+        num_perm: int = 128,
+        seed: int = 0,
+    ):
+        self.threshold = threshold
+        self.mode = mode
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: odd 64-bit multipliers, keep the high 32 bits
+        self.a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.bands, self.rows = _bands_for(threshold, num_perm)
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self.keys: List[str] = []
+        self.signatures: List[np.ndarray] = []
+        self.stats = {"checked": 0, "near_duplicates": 0}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in shingles(text)), dtype=np.uint64
+        )
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self.a + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def check(self, key: str, text: str) -> Optional[str]:
+        """Return the key of an earlier near-duplicate of `text`, or register it as canonical"""
+        self.stats["checked"] += 1
+        sig = self.signature(text)
+        band_keys = [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = set()
+        for band, band_key in zip(self.buckets, band_keys):
+            candidates.update(band.get(band_key, ()))
+        for index in sorted(candidates):
+            if np.mean(self.signatures[index] == sig) >= self.threshold:
+                self.stats["near_duplicates"] += 1
+                return self.keys[index]
+
+        self._register(key, sig, band_keys)
+        return None
+
+    def _register(self, key: str, sig: np.ndarray, band_keys: List[bytes]):
+        index = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(sig)
+        for band, band_key in zip(self.buckets, band_keys):
+            band.setdefault(band_key, []).append(index)
+
+    def save(self, path: str):
+        """Write the canonical chunks' signatures atomically to `path` (.npz)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(self.keys, dtype=str),
+                signatures=np.array(self.signatures, dtype=np.uint32).reshape(-1, self.num_perm),
+                params=np.array([self.threshold, self.num_perm, self.seed], dtype=np.float64),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, mode: DedupMode = NEAR_DUPLICATE_MODE) -> "NearDuplicateDetector":
+        """Detector restored from `save`, still matching new chunks against the saved ones"""
+        with np.load(path) as data:
+            threshold, num_perm, seed = data["params"]
+            detector = cls(float(threshold), mode, int(num_perm), int(seed))
+            for key, sig in zip(data["keys"], data["signatures"]):
+                band_keys = [sig[i * detector.rows:(i + 1) * detector.rows].tobytes() for i in range(detector.bands)]
+                detector._register(str(key), sig, band_keys)
+        return detector
@@ -0,0 +1,149 @@
+"""
+Rate-limit-aware batched embedding for ingestion.
+
+`EmbeddingScheduler` keeps up to `max_in_flight` embedding batches running
+concurrently, spends a token-per-minute budget through a token bucket, and
+adapts the batch size to observed latency and 429 responses.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Tuple
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv, find_dotenv
+
+from .utils import estimate_tokens
+
+find_dotenv()
+load_dotenv()
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000"))
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    """Whether an embedding error is a provider 429"""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `tokens_per_minute`"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Block until `tokens` are available, returning the time spent waiting"""
+        # A request larger than the whole bucket can never fit; let it drain the bucket.
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class EmbeddingScheduler:
+    """Embed texts in concurrent, adaptively sized batches under a TPM budget"""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+        tokens_per_minute: int = EMBED_TOKENS_PER_MINUTE,
+        min_batch_size: int = 8,
+        max_batch_size: int = 2048,
+        target_latency_s: float = 2.0,
+        max_retries: int = 6,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_in_flight = max(1, max_in_flight)
+        self.bucket = TokenBucket(tokens_per_minute)
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency_s = target_latency_s
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.stats = {"batches": 0, "texts": 0, "tokens": 0, "rate_limited": 0, "throttle_wait_s": 0.0}
+
+    def _adapt(self, latency_s: float, rate_limited: bool):
+        """AIMD: halve on 429, shrink when slow, grow additively when fast"""
+        with self.lock:
+            if rate_limited:
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            elif latency_s > self.target_latency_s * 1.5:
+                self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.75))
+            elif latency_s < self.target_latency_s:
+                self.batch_size = min(self.max_batch_size, self.batch_size + self.min_batch_size)
+
+    def _embed_batch(self, start: int, texts: List[str]) -> Tuple[int, List[List[float]]]:
+        """Embed one batch, backing off and retrying on 429"""
+        for attempt in range(self.max_retries + 1):
+            t0 = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                with self.lock:
+                    self.stats["rate_limited"] += 1
+                self._adapt(time.perf_counter() - t0, rate_limited=True)
+                time.sleep(min(60.0, 2 ** attempt))
+                continue
+            self._adapt(time.perf_counter() - t0, rate_limited=False)
+            with self.lock:
+                self.stats["batches"] += 1
+            return start, vectors
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed `texts`, returning vectors in input order"""
+        results: List[List[float]] = [None] * len(texts)
+        with self.lock:
+            batches, rate_limited = self.stats["batches"], self.stats["rate_limited"]
+        t0 = time.perf_counter()
+        pos = 0
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            pending = set()
+            while pos < len(texts) or pending:
+                while pos < len(texts) and len(pending) < self.max_in_flight:
+                    end = min(len(texts), pos + self.batch_size)
+                    batch = texts[pos:end]
+                    tokens = sum(estimate_tokens(text) for text in batch)
+                    waited = self.bucket.acquire(tokens)
+                    with self.lock:
+                        self.stats["tokens"] += tokens
+                        self.stats["throttle_wait_s"] += waited
+                    pending.add(pool.submit(self._embed_batch, pos, batch))
+                    pos = end
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, vectors = future.result()
+                    results[start:start + len(vectors)] = vectors
+
+        elapsed = time.perf_counter() - t0
+        self.stats["texts"] += len(texts)
+        if texts:
+            print(
+                f"embedded {len(texts)} texts in {self.stats['batches'] - batches} batches, {elapsed:.2f}s "
+                f"({len(texts) / max(elapsed, 1e-9):.0f} texts/s, {self.stats['rate_limited'] - rate_limited} rate limited, "
+                f"final batch size {self.batch_size})"
+            )
+        return results
@@ -3,22 +3,32 @@ Retrieval Evaluation Script for Base RAG vs Hierarchical RAG
 Generates synthetic test data, evaluates retrieval performance, and produces reports.
 """
 
+import os
 import json
 import csv
 import time
 import uuid
+import hashlib
 from tqdm import tqdm
-from random import shuffle
+from random import Random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Literal, Tuple, Union, Iterator
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 import numpy as np
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
+from langchain_milvus import Milvus
 from dotenv import load_dotenv, find_dotenv
-from .index import MetaData, get_vectorstore
-from .retrieval import retrieval, generate
+from .index import (
+    MetaData, EMBEDDING_DIMENSIONS, MILVUS_INDEX_TYPE, OPENAI_BASE_URL, VECTOR_BACKEND, get_vectorstore, rebuild_collection
+)
+from .numpy_store import NUMPY_VECTOR_PRECISION
+from .embedder import TokenBucket, is_rate_limited
+from .retrieval import retrieval, generate, stored_vectors_of, RERANK, model as llm
+from .gencache import GenerationCache, get_generation_cache
+from .resultstore import result_key, get_result_store
 from .ingest import ingest_documents, get_chunks
 from .synthetic_data import SYNTHETIC_DOCUMENTS, EVAL_QUERIES, EvalQuery
 
@@ -26,7 +36,29 @@ find_dotenv()
 load_dotenv()
 
 # Embedding model for semantic similarity
-emb_model = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=1536)
+emb_model = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSIONS, check_embedding_ctx_length=not OPENAI_BASE_URL)
+
+# Query evaluations running at once, and their start rate (each makes a retrieval and an LLM call)
+EVAL_MAX_IN_FLIGHT = int(os.getenv("EVAL_MAX_IN_FLIGHT", "8"))
+EVAL_REQUESTS_PER_MINUTE = int(os.getenv("EVAL_REQUESTS_PER_MINUTE", "500"))
+EVAL_MAX_RETRIES = 5
+# Reuse answers already generated for an identical prompt and model
+EVAL_CACHE_GENERATIONS = os.getenv("EVAL_CACHE_GENERATIONS", "true").lower() in ("1", "true", "yes")
+# Reuse stored results of unchanged (query, config) pairs, resuming interrupted runs. Off by
+# default: the config does not cover code, chunking or corpus changes, which a reuse would hide.
+EVAL_RESUME = os.getenv("EVAL_RESUME", "false").lower() in ("1", "true", "yes")
+
+RAG_TYPES = ("base", "hierarchical")
+# "full" retrieves and generates; "retrieval" skips generation (no metric depends on it)
+EvalMode = Literal["full", "retrieval"]
+EVAL_MODES = ("full", "retrieval")
+# Cutoffs of the Hit@k, precision@k, recall@k and nDCG@k columns
+METRIC_KS = (1, 3, 5)
+# Instrumented stages of a query, stored as <stage>_ms columns (0 when the stage did not run)
+LATENCY_STAGES = ("embedding", "vector_search", "hydrate", "rerank", "context", "llm")
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+# Upper edges (ms) of the latency histogram buckets; the last bucket is everything above
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
 
 @dataclass
 class EvalResult:
@@ -58,55 +90,194 @@ class EvalResult:
     # Metadata
     filters_used: Dict
     timestamp: str
+    
+    # Ranking metrics at k=5
+    ndcg_at_5: float = 0.0
+    precision_at_5: float = 0.0
+    recall_at_5: float = 0.0
+
+
+def _column(values: list) -> np.ndarray:
+    """Numeric array for numbers and booleans, object array for anything else"""
+    if all(isinstance(v, (bool, int, float, np.number, np.bool_)) for v in values):
+        return np.asarray(values)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+class EvalTable:
+    """Evaluation results stored column-wise, one array per field.
+
+    Indexing with a field name returns its column; with a slice or boolean
+    mask, the selected rows as a new table. Iterating yields `EvalResult`s.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, records: List[dict], relevance: List[np.ndarray]) -> "EvalTable":
+        """Table of per-query records, with every ranking metric computed from their relevance matrices"""
+        metrics = retrieval_metrics(relevance)
+        names = list(records[0]) if records else [
+            f.name for f in fields(EvalResult) if f.name not in metrics
+        ] + [f"{stage}_ms" for stage in LATENCY_STAGES] + ["reused"]
+        columns = {name: _column([record[name] for record in records]) for name in names}
+        columns.update(metrics)
+        return cls(columns)
+
+    @classmethod
+    def from_results(cls, results: List[EvalResult]) -> "EvalTable":
+        names = [f.name for f in fields(EvalResult)]
+        return cls({name: _column([getattr(r, name) for r in results]) for name in names})
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, key: Union[str, slice, np.ndarray]) -> Union[np.ndarray, "EvalTable"]:
+        if isinstance(key, str):
+            return self.columns[key]
+        return EvalTable({name: column[key] for name, column in self.columns.items()})
+
+    def __add__(self, other: "EvalTable") -> "EvalTable":
+        return EvalTable({
+            name: _column(column.tolist() + other.columns[name].tolist()) for name, column in self.columns.items()
+        })
+
+    def __iter__(self) -> Iterator[EvalResult]:
+        names = [f.name for f in fields(EvalResult)]
+        for row in self.rows():
+            yield EvalResult(**{name: row[name] for name in names})
+
+    def rows(self) -> List[dict]:
+        """One dict of plain Python values per result"""
+        lists = {name: column.tolist() for name, column in self.columns.items()}
+        return [dict(zip(lists, values)) for values in zip(*lists.values())]
+
+    def mean(self, name: str) -> float:
+        column = self.columns[name]
+        return float(np.mean(column)) if len(column) else 0.0
 
 
 # ============================================================================
 # EVALUATION FUNCTIONS
 # ============================================================================
 
-def calculate_semantic_similarity(query: str, documents: List[Document]) -> float:
-    """Calculate average semantic similarity between query and retrieved documents"""
+def cosine_similarities(query_vector: List[float], doc_vectors: np.ndarray) -> np.ndarray:
+    """Cosine similarity of the query to every document vector, as one normalized matrix product"""
+    query_vector = np.asarray(query_vector, dtype=np.float32)
+    doc_vectors = np.asarray(doc_vectors, dtype=np.float32)
+    query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+    norms = np.maximum(np.linalg.norm(doc_vectors, axis=1), 1e-12)
+    return (doc_vectors / norms[:, None]) @ query_vector
+
+
+def calculate_semantic_similarity(
+    query: str,
+    documents: List[Document],
+    query_vector: Optional[List[float]] = None,
+    doc_vectors: Optional[np.ndarray] = None,
+) -> float:
+    """Calculate average semantic similarity between query and retrieved documents.
+
+    Vectors already at hand (the search's query vector, the documents'
+    stored vectors) are used as given; only missing ones are embedded.
+    """
     if not documents:
         return 0.0
     
-    query_embedding = emb_model.embed_query(query)
-    doc_embeddings = emb_model.embed_documents([doc.page_content for doc in documents])
-    
-    similarities = []
-    for doc_emb in doc_embeddings:
-        # Cosine similarity
-        similarity = np.dot(query_embedding, doc_emb) / (
-            np.linalg.norm(query_embedding) * np.linalg.norm(doc_emb)
-        )
-        similarities.append(similarity)
+    if query_vector is None:
+        query_vector = emb_model.embed_query(query)
+    if doc_vectors is None:
+        doc_vectors = emb_model.embed_documents([doc.page_content for doc in documents])
     
-    return float(np.mean(similarities))
+    return float(np.mean(cosine_similarities(query_vector, doc_vectors)))
+
+
+def relevance_matrix(ground_truth: List[str], retrieved_docs: List[Document]) -> np.ndarray:
+    """Snippet x rank matrix: [i, r] is True when ground-truth snippet i occurs in the document at rank r + 1"""
+    texts = [doc.page_content.lower() for doc in retrieved_docs]
+    truths = [truth.lower() for truth in ground_truth]
+    return np.array([[truth in text for text in texts] for truth in truths], dtype=bool).reshape(
+        len(truths), len(texts)
+    )
+
+
+def retrieval_metrics(matrices: List[np.ndarray], ks: Tuple[int, ...] = METRIC_KS) -> Dict[str, np.ndarray]:
+    """MRR and Hit@k, precision@k, recall@k, nDCG@k of every query at once.
+
+    A document is relevant when it contains any ground-truth snippet. Recall
+    is the share of the query's snippets found in the top k; nDCG uses binary
+    gains against an ideal ranking of min(#snippets, k) relevant documents.
+    """
+    n = len(matrices)
+    snippets = max((m.shape[0] for m in matrices), default=0)
+    ranks = max([m.shape[1] for m in matrices] + list(ks))
+    relevance = np.zeros((n, snippets, ranks), dtype=bool)
+    for i, m in enumerate(matrices):
+        relevance[i, :m.shape[0], :m.shape[1]] = m
+    n_truth = np.array([m.shape[0] for m in matrices], dtype=np.int64)
+
+    relevant = relevance.any(axis=1)  # query x rank
+    found = np.logical_or.accumulate(relevance, axis=2)  # snippet seen at or above the rank
+    hits = np.cumsum(relevant, axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, ranks + 2))
+    dcg = np.cumsum(relevant * discounts, axis=1)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])
+
+    metrics = {"mrr": np.where(relevant.any(axis=1), 1.0 / (relevant.argmax(axis=1) + 1), 0.0)}
+    for k in ks:
+        metrics[f"hit_at_{k}"] = hits[:, k - 1] > 0
+        metrics[f"precision_at_{k}"] = hits[:, k - 1] / k
+        metrics[f"recall_at_{k}"] = found[:, :, k - 1].sum(axis=1) / np.maximum(n_truth, 1)
+        idcg = ideal[np.minimum(n_truth, k)]
+        metrics[f"ndcg_at_{k}"] = np.divide(dcg[:, k - 1], idcg, out=np.zeros(n), where=idcg > 0)
+    return metrics
 
 
 def calculate_mrr(ground_truth: List[str], retrieved_docs: List[Document]) -> float:
     """Calculate Mean Reciprocal Rank"""
-    for rank, doc in enumerate(retrieved_docs, start=1):
-        # Check if any ground truth snippet appears in the document
-        for truth in ground_truth:
-            if truth.lower() in doc.page_content.lower():
-                return 1.0 / rank
-    return 0.0
+    return float(retrieval_metrics([relevance_matrix(ground_truth, retrieved_docs)])["mrr"][0])
 
 
 def calculate_hit_at_k(ground_truth: List[str], retrieved_docs: List[Document], k: int) -> bool:
     """Check if any ground truth appears in top-k results"""
-    for doc in retrieved_docs[:k]:
-        for truth in ground_truth:
-            if truth.lower() in doc.page_content.lower():
-                return True
-    return False
+    return bool(relevance_matrix(ground_truth, retrieved_docs[:k]).any())
 
 
-def evaluate_single_query(
+def query_id(eval_query: EvalQuery, rag_type: str) -> str:
+    """Stable id from the query's content (unlike `hash()`, which is salted per process)"""
+    content = json.dumps([
+        eval_query.collection, eval_query.query, eval_query.language, eval_query.domain, eval_query.section,
+        eval_query.topic, eval_query.doc_type, eval_query.ground_truth_chunks,
+    ], ensure_ascii=False)
+    return f"{eval_query.collection}_{rag_type}_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]}"
+
+
+def eval_config(mode: EvalMode, vectorstore: Milvus) -> dict:
+    """Everything besides the query that a stored result depends on"""
+    return {
+        "mode": mode,
+        # the resolved version: rebuilding the test data invalidates stored results
+        "collection": vectorstore.collection_name,
+        "backend": VECTOR_BACKEND,
+        "embedding_dimensions": EMBEDDING_DIMENSIONS,
+        # compressed candidate scans can change rankings
+        "vector_index": NUMPY_VECTOR_PRECISION if VECTOR_BACKEND == "numpy" else MILVUS_INDEX_TYPE,
+        "rerank": RERANK,
+        "llm": llm.model_name if mode == "full" else None,
+    }
+
+
+def _evaluate_query(
     eval_query: EvalQuery,
-    rag_type: str = "base"
-) -> EvalResult:
-    """Evaluate a single query with either base or hierarchical RAG"""
+    rag_type: str = "base",
+    vectorstore: Optional[Milvus] = None,
+    mode: EvalMode = "full",
+    cache: Optional[GenerationCache] = None,
+) -> Tuple[dict, np.ndarray]:
+    """Run one query: (its EvalResult fields except the ranking metrics, its relevance matrix)"""
     
     # Set up filters based on RAG type
     if rag_type == "base":
@@ -128,42 +299,43 @@ def evaluate_single_query(
             "doc_type": eval_query.doc_type
         }
     
+    vectorstore = vectorstore or get_vectorstore("eval_"+eval_query.collection)
+    timings = dict.fromkeys(LATENCY_STAGES, 0.0)
+    
     # Retrieval
-    ret_start = time.time()
-    vectorstore = get_vectorstore("eval_"+eval_query.collection)
-    docs = retrieval(eval_query.query, filters, vectorstore)
-    ret_end = time.time()
+    ret_start = time.perf_counter()
+    # embedded here so the same vector serves the search and the semantic similarity
+    query_vector = vectorstore.embeddings.embed_query(eval_query.query)
+    timings["embedding"] = (time.perf_counter() - ret_start) * 1000
+    docs = retrieval(eval_query.query, filters, vectorstore, query_vector=query_vector, timings=timings)
+    ret_end = time.perf_counter()
     ret_latency = (ret_end - ret_start) * 1000  # Convert to ms
     
     # Generation
-    gen_start = time.time()
-    answer = generate(eval_query.query, docs) if docs else "No relevant documents found."
-    gen_end = time.time()
-    gen_latency = (gen_end - gen_start) * 1000  # Convert to ms
+    if mode == "retrieval":
+        answer = ""
+        gen_latency = 0.0
+    else:
+        gen_start = time.perf_counter()
+        answer = generate(eval_query.query, docs, cache=cache, timings=timings) if docs else "No relevant documents found."
+        gen_latency = (time.perf_counter() - gen_start) * 1000  # Convert to ms
     
     total_latency = ret_latency + gen_latency
     
-    # Calculate metrics
-    hit_1 = calculate_hit_at_k(eval_query.ground_truth_chunks, docs, 1)
-    hit_3 = calculate_hit_at_k(eval_query.ground_truth_chunks, docs, 3)
-    hit_5 = calculate_hit_at_k(eval_query.ground_truth_chunks, docs, 5)
-    mrr = calculate_mrr(eval_query.ground_truth_chunks, docs)
+    # Ranking metrics are derived from the relevance matrix, for the whole run at once
+    relevance = relevance_matrix(eval_query.ground_truth_chunks, docs)
     
     avg_sim_score = np.mean([doc.metadata.get('similarity_score', 0) for doc in docs]) if docs else 0.0
-    semantic_sim = calculate_semantic_similarity(eval_query.query, docs)
-    
-    query_id = f"{eval_query.collection}_{rag_type}_{hash(eval_query.query) % 10000}"
+    # stored vectors are read back by primary key instead of re-embedding the documents
+    doc_vectors = stored_vectors_of(docs, vectorstore) if docs else None
+    semantic_sim = calculate_semantic_similarity(eval_query.query, docs, query_vector, doc_vectors)
     
-    return EvalResult(
-        query_id=query_id,
+    record = dict(
+        query_id=query_id(eval_query, rag_type),
         collection=eval_query.collection,
         query=eval_query.query,
         rag_type=rag_type,
         retrieved_docs=len(docs),
-        hit_at_1=hit_1,
-        hit_at_3=hit_3,
-        hit_at_5=hit_5,
-        mrr=mrr,
         avg_similarity_score=float(avg_sim_score),
         retrieval_latency_ms=ret_latency,
         generation_latency_ms=gen_latency,
@@ -171,46 +343,175 @@ def evaluate_single_query(
         avg_semantic_similarity=semantic_sim,
         generated_answer=answer,
         filters_used=filters_dict,
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        **{f"{stage}_ms": timings[stage] for stage in LATENCY_STAGES},
     )
+    return record, relevance
+
+
+def evaluate_single_query(
+    eval_query: EvalQuery,
+    rag_type: str = "base",
+    vectorstore: Optional[Milvus] = None,
+    mode: EvalMode = "full",
+    cache: Optional[GenerationCache] = None,
+) -> EvalResult:
+    """Evaluate a single query with either base or hierarchical RAG"""
+    record, relevance = _evaluate_query(eval_query, rag_type, vectorstore, mode, cache)
+    return next(iter(EvalTable.from_records([record], [relevance])))
+
+
+def _evaluate_with_retry(
+    eval_query: EvalQuery,
+    rag_type: str,
+    vectorstore: Milvus,
+    bucket: TokenBucket,
+    mode: EvalMode = "full",
+    cache: Optional[GenerationCache] = None,
+) -> Tuple[dict, np.ndarray]:
+    """Evaluate one query once the rate limit allows, backing off on provider 429s"""
+    for attempt in range(EVAL_MAX_RETRIES + 1):
+        bucket.acquire(1)
+        try:
+            return _evaluate_query(eval_query, rag_type, vectorstore, mode=mode, cache=cache)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == EVAL_MAX_RETRIES:
+                raise
+            time.sleep(min(60.0, 2 ** attempt))
 
 
 def run_full_evaluation(
     collections: List[str] = None,
-    output_dir: str = "reports"
-) -> Dict[str, List[EvalResult]]:
-    """Run complete evaluation on all queries"""
+    output_dir: str = "reports",
+    max_in_flight: int = EVAL_MAX_IN_FLIGHT,
+    requests_per_minute: int = EVAL_REQUESTS_PER_MINUTE,
+    seed: int = 0,
+    mode: EvalMode = "full",
+    cache_generations: bool = EVAL_CACHE_GENERATIONS,
+    resume: bool = EVAL_RESUME,
+) -> Dict[str, EvalTable]:
+    """Run complete evaluation on all queries.
+
+    Every (query, rag_type) pair is evaluated on a thread pool with at most
+    `max_in_flight` running and at most `requests_per_minute` started per
+    minute. Results keep the order of the seeded query shuffle, whatever the
+    completion order. Ranking metrics are computed for the whole run at
+    once from the per-query relevance matrices.
+
+    `mode="retrieval"` skips generation, which none of the retrieval metrics
+    need. In full mode answers go through the on-disk generation cache
+    unless `cache_generations` is off, so reruns over unchanged context make
+    no LLM calls.
+
+    With `resume`, each result is appended to the on-disk result store as it
+    completes, keyed by its content-based query id and the evaluation config,
+    and pairs already stored are not evaluated again. Their rows have
+    `reused` set and are left out of the latency summaries, since their
+    latencies were measured by an earlier run.
+    """
+    if mode not in EVAL_MODES:
+        raise ValueError(f"Unknown evaluation mode {mode}; expected one of {EVAL_MODES}")
     
     if collections is None:
         collections = ["hospital", "bank", "fluid_simulation"]
     
     Path(output_dir).mkdir(exist_ok=True)
     
-    all_results = {
-        "base": [],
-        "hierarchical": []
-    }
-    
     # Filter queries by requested collections
     queries_to_eval = [q for q in EVAL_QUERIES if q.collection in collections]
-    shuffle(queries_to_eval)
+    Random(seed).shuffle(queries_to_eval)
+    tasks = [(eval_query, rag_type) for eval_query in queries_to_eval for rag_type in RAG_TYPES]
     print(f"\n{'='*70}")
-    print(f"Starting Evaluation: {len(queries_to_eval)} queries across {len(collections)} collections")
+    print(f"Starting Evaluation ({mode}): {len(queries_to_eval)} queries across {len(collections)} collections")
     print(f"{'='*70}\n")
     
-    for eval_query in tqdm(queries_to_eval, desc="Running evaluation queries"):
-        # Evaluate with base RAG
-        base_result = evaluate_single_query(eval_query, "base")
-        all_results["base"].append(base_result)
-        
-        # Evaluate with hierarchical RAG
-        hier_result = evaluate_single_query(eval_query, "hierarchical")
-        all_results["hierarchical"].append(hier_result)
+    # one client per collection, shared by the workers
+    vectorstores = {c: get_vectorstore("eval_"+c) for c in sorted({q.collection for q in queries_to_eval})}
+    bucket = TokenBucket(requests_per_minute)
+    cache = get_generation_cache() if mode == "full" and cache_generations else None
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    store = get_result_store() if resume else None
+    configs = {c: eval_config(mode, vectorstore) for c, vectorstore in vectorstores.items()}
+    keys = [result_key(query_id(q, rag_type), configs[q.collection]) for q, rag_type in tasks]
+    results: List[Optional[Tuple[dict, np.ndarray]]] = [
+        store.get(key) if store is not None else None for key in keys
+    ]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if store is not None:
+        print(f"Reusing {len(tasks) - len(pending)} stored results, evaluating {len(pending)}")
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="eval") as pool:
+        futures = {
+            pool.submit(
+                _evaluate_with_retry, tasks[i][0], tasks[i][1], vectorstores[tasks[i][0].collection], bucket, mode, cache
+            ): i
+            for i in pending
+        }
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Running evaluation queries"):
+                i = futures[future]
+                results[i] = future.result()
+                if store is not None:
+                    store.put(keys[i], *results[i])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            # as_completed may yield the failure before results that finished earlier
+            if store is not None:
+                for future, i in futures.items():
+                    if results[i] is None and future.done() and not future.cancelled() and future.exception() is None:
+                        store.put(keys[i], *future.result())
+            raise
+    if cache is not None:
+        print(f"Generation cache: {cache.hits - hits} hits, {cache.misses - misses} misses")
+    
+    evaluated = set(pending)
+    records = [{**record, "reused": i not in evaluated} for i, (record, _) in enumerate(results)]
+    return {
+        rag_type: EvalTable.from_records(
+            [record for record in records if record["rag_type"] == rag_type],
+            [relevance for record, (_, relevance) in zip(records, results) if record["rag_type"] == rag_type],
+        )
+        for rag_type in RAG_TYPES
+    }
+
+
+def latency_summary(table: EvalTable) -> Dict[str, Dict[str, dict]]:
+    """Percentiles, mean and histogram of every stage and of the retrieval, generation and total
+    latencies, overall and per collection; results reused from an earlier run are left out"""
+    if "reused" in table.columns:
+        table = table[~table["reused"].astype(bool)]
+    columns = [f"{stage}_ms" for stage in LATENCY_STAGES] + [
+        "retrieval_latency_ms", "generation_latency_ms", "total_latency_ms"
+    ]
+    names = list(LATENCY_STAGES) + ["retrieval", "generation", "total"]
+    
+    def summarize(rows: EvalTable) -> Dict[str, dict]:
+        if not len(rows):
+            return {}
+        values = np.stack([np.asarray(rows[column], dtype=np.float64) for column in columns], axis=1)
+        percentiles = np.percentile(values, LATENCY_PERCENTILES, axis=0)
+        buckets = np.searchsorted(LATENCY_BUCKETS_MS, values)  # bucket i holds values <= edge i
+        return {
+            name: {
+                **{f"p{p}": float(percentiles[i, j]) for i, p in enumerate(LATENCY_PERCENTILES)},
+                "mean": float(values[:, j].mean()),
+                "histogram": np.bincount(buckets[:, j], minlength=len(LATENCY_BUCKETS_MS) + 1).tolist(),
+            }
+            for j, name in enumerate(names)
+        }
     
-    return all_results
+    collections = sorted(set(table["collection"].tolist())) if len(table) else []
+    return {
+        "overall": summarize(table),
+        "collections": {c: summarize(table[table["collection"] == c]) for c in collections},
+    }
+
 
+def _bucket_labels() -> List[str]:
+    return [f"<={edge}ms" for edge in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
 
-def save_results(results: Dict[str, List[EvalResult]], output_dir: str = "reports"):
+
+def save_results(results: Dict[str, EvalTable], output_dir: str = "reports"):
     """Save evaluation results to CSV and JSON"""
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -222,12 +523,11 @@ def save_results(results: Dict[str, List[EvalResult]], output_dir: str = "report
     # Save as CSV
     csv_path = Path(output_dir) / f"eval_results_{timestamp}.csv"
     with open(csv_path, 'w', newline='') as f:
-        if all_results:
-            fieldnames = list(asdict(all_results[0]).keys())
+        if len(all_results):
+            fieldnames = list(all_results.columns)
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            for result in all_results:
-                row = asdict(result)
+            for row in all_results.rows():
                 # Convert complex types to strings
                 row['filters_used'] = json.dumps(row['filters_used'])
                 writer.writerow(row)
@@ -240,11 +540,13 @@ def save_results(results: Dict[str, List[EvalResult]], output_dir: str = "report
         "metadata": {
             "timestamp": timestamp,
             "total_queries": len(all_results),
-            "collections_tested": list(set(r.collection for r in all_results))
+            "collections_tested": list(set(all_results["collection"].tolist())),
+            "latency_histogram_buckets": _bucket_labels(),
         },
+        "latency": {rag_type: latency_summary(table) for rag_type, table in results.items()},
         "results": {
-            "base": [asdict(r) for r in results["base"]],
-            "hierarchical": [asdict(r) for r in results["hierarchical"]]
+            "base": results["base"].rows(),
+            "hierarchical": results["hierarchical"].rows()
         }
     }
     with open(json_path, 'w') as f:
@@ -252,10 +554,30 @@ def save_results(results: Dict[str, List[EvalResult]], output_dir: str = "report
     
     print(f"✓ Saved JSON report: {json_path}")
     
+    # Latency percentiles and histograms, one row per rag type x collection x stage
+    latency_path = Path(output_dir) / f"eval_latency_{timestamp}.csv"
+    with open(latency_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["rag_type", "collection", "stage"] + [f"p{p}_ms" for p in LATENCY_PERCENTILES] + ["mean_ms"] + _bucket_labels()
+        )
+        for rag_type, table in results.items():
+            summary = latency_summary(table)
+            scopes = [("all", summary["overall"])] + list(summary["collections"].items())
+            for collection, stages in scopes:
+                for stage, stats in stages.items():
+                    writer.writerow(
+                        [rag_type, collection, stage]
+                        + [f"{stats[f'p{p}']:.3f}" for p in LATENCY_PERCENTILES]
+                        + [f"{stats['mean']:.3f}"] + stats["histogram"]
+                    )
+    
+    print(f"✓ Saved latency CSV: {latency_path}")
+    
     return csv_path, json_path
 
 
-def generate_summary_report(results: Dict[str, List[EvalResult]], output_dir: str = "reports"):
+def generate_summary_report(results: Dict[str, EvalTable], output_dir: str = "reports"):
     """Generate markdown summary report with comparative analysis"""
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -265,31 +587,34 @@ def generate_summary_report(results: Dict[str, List[EvalResult]], output_dir: st
     hier_results = results["hierarchical"]
     
     # Calculate aggregate metrics
-    def calc_metrics(result_list):
+    def calc_metrics(table: EvalTable):
         return {
-            "total_queries": len(result_list),
-            "avg_hit_at_1": np.mean([r.hit_at_1 for r in result_list]) * 100,
-            "avg_hit_at_3": np.mean([r.hit_at_3 for r in result_list]) * 100,
-            "avg_hit_at_5": np.mean([r.hit_at_5 for r in result_list]) * 100,
-            "avg_mrr": np.mean([r.mrr for r in result_list]),
-            "avg_similarity": np.mean([r.avg_similarity_score for r in result_list]),
-            "avg_semantic_sim": np.mean([r.avg_semantic_similarity for r in result_list]),
-            "avg_retrieval_latency": np.mean([r.retrieval_latency_ms for r in result_list]),
-            "avg_generation_latency": np.mean([r.generation_latency_ms for r in result_list]),
-            "avg_total_latency": np.mean([r.total_latency_ms for r in result_list]),
+            "total_queries": len(table),
+            "avg_hit_at_1": table.mean("hit_at_1") * 100,
+            "avg_hit_at_3": table.mean("hit_at_3") * 100,
+            "avg_hit_at_5": table.mean("hit_at_5") * 100,
+            "avg_mrr": table.mean("mrr"),
+            "avg_ndcg_at_5": table.mean("ndcg_at_5"),
+            "avg_precision_at_5": table.mean("precision_at_5") * 100,
+            "avg_recall_at_5": table.mean("recall_at_5") * 100,
+            "avg_similarity": table.mean("avg_similarity_score"),
+            "avg_semantic_sim": table.mean("avg_semantic_similarity"),
+            "avg_retrieval_latency": table.mean("retrieval_latency_ms"),
+            "avg_generation_latency": table.mean("generation_latency_ms"),
+            "avg_total_latency": table.mean("total_latency_ms"),
         }
     
     base_metrics = calc_metrics(base_results)
     hier_metrics = calc_metrics(hier_results)
     
     # Calculate per-collection metrics
-    collections = list(set(r.collection for r in base_results))
+    collections = list(set(base_results["collection"].tolist()))
     collection_metrics = {}
     
     for collection in collections:
         collection_metrics[collection] = {
-            "base": calc_metrics([r for r in base_results if r.collection == collection]),
-            "hierarchical": calc_metrics([r for r in hier_results if r.collection == collection])
+            "base": calc_metrics(base_results[base_results["collection"] == collection]),
+            "hierarchical": calc_metrics(hier_results[hier_results["collection"] == collection])
         }
     
     # Generate markdown report
@@ -314,6 +639,9 @@ def generate_summary_report(results: Dict[str, List[EvalResult]], output_dir: st
             ("Hit@3", "avg_hit_at_3", "%", True),
             ("Hit@5", "avg_hit_at_5", "%", True),
             ("MRR", "avg_mrr", "", True),
+            ("nDCG@5", "avg_ndcg_at_5", "", True),
+            ("Precision@5", "avg_precision_at_5", "%", True),
+            ("Recall@5", "avg_recall_at_5", "%", True),
             ("Avg Similarity Score", "avg_similarity", "", True),
             ("Semantic Similarity", "avg_semantic_sim", "", True),
             ("Retrieval Latency", "avg_retrieval_latency", "ms", False),
@@ -399,6 +727,43 @@ def generate_summary_report(results: Dict[str, List[EvalResult]], output_dir: st
         else:
             f.write("- ⚠️ Consider optimizing index structure to reduce latency overhead.\n")
         
+        f.write("\n")
+        
+        # Latency breakdown: tails per stage, overall and per collection
+        f.write("## Latency Breakdown\n\n")
+        percentile_header = " | ".join(f"p{p}" for p in LATENCY_PERCENTILES)
+        for rag_type, label in [("base", "Base RAG"), ("hierarchical", "Hierarchical RAG")]:
+            summary = latency_summary(results[rag_type])
+            if not summary["overall"]:
+                continue
+            f.write(f"### {label}\n\n")
+            reused = int(np.sum(results[rag_type]["reused"])) if "reused" in results[rag_type].columns else 0
+            if reused:
+                f.write(f"{reused} results reused from an earlier run are left out of these latencies.\n\n")
+            f.write(f"| Stage | {percentile_header} | Mean |\n")
+            f.write("|-------|" + "-----|" * (len(LATENCY_PERCENTILES) + 1) + "\n")
+            for stage, stats in summary["overall"].items():
+                values = " | ".join(f"{stats[f'p{p}']:.1f}ms" for p in LATENCY_PERCENTILES)
+                f.write(f"| {stage} | {values} | {stats['mean']:.1f}ms |\n")
+            f.write("\n")
+            
+            f.write(f"| Collection | Stage | {percentile_header} |\n")
+            f.write("|------------|-------|" + "-----|" * len(LATENCY_PERCENTILES) + "\n")
+            for collection, stages in summary["collections"].items():
+                for stage, stats in stages.items():
+                    values = " | ".join(f"{stats[f'p{p}']:.1f}ms" for p in LATENCY_PERCENTILES)
+                    f.write(f"| {collection} | {stage} | {values} |\n")
+            f.write("\n")
+            
+            stages = list(summary["overall"])
+            f.write("| Bucket | " + " | ".join(stages) + " |\n")
+            f.write("|--------|" + "-----|" * len(stages) + "\n")
+            for i, bucket in enumerate(_bucket_labels()):
+                counts = [summary["overall"][stage]["histogram"][i] for stage in stages]
+                if any(counts):
+                    f.write(f"| {bucket} | " + " | ".join(str(c) for c in counts) + " |\n")
+            f.write("\n")
+        
         f.write("\n---\n\n")
         f.write("## Detailed Query Results\n\n")
         
@@ -444,8 +809,9 @@ def setup_test_data(collections: List[str] = None):
             chunks = get_chunks([doc], metadata)
             documents.extend(chunks)
             
-        vectorstore = get_vectorstore("eval_"+collection_name, drop_old=True)
-        ingest_documents(documents, vectorstore)
+        # Build beside the live collection and swap, so evaluation queries never see an empty index
+        with rebuild_collection("eval_"+collection_name) as vectorstore:
+            ingest_documents(documents, vectorstore)
         tot_docs += len(docs)
         print(f"✓ Completed '{collection_name}' collection")
     
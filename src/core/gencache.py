@@ -0,0 +1,90 @@
+"""
+On-disk cache of LLM generations.
+
+Answers are stored in a local SQLite file keyed by the SHA-256 of the model
+name and the full prompt, so a rerun over the same retrieved context never
+pays for an identical LLM call again. Any change to the retrieved chunks,
+their order or the prompt template changes the key.
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from dotenv import load_dotenv, find_dotenv
+
+find_dotenv()
+load_dotenv()
+
+GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", "./data/generation_cache.sqlite")
+
+_lock = threading.Lock()
+_caches: Dict[str, "GenerationCache"] = {}
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """(model, prompt) -> answer records in a SQLite table"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # shared by the evaluation workers; writes are serialised by the lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations "
+            "(key TEXT PRIMARY KEY, model TEXT NOT NULL, answer TEXT NOT NULL, created TEXT NOT NULL)"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT answer FROM generations WHERE key = ?", (prompt_key(model, prompt),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, prompt: str, answer: str):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?)",
+                (prompt_key(model, prompt), model, answer, datetime.now().isoformat()),
+            )
+            self.conn.commit()
+
+    def clear(self) -> int:
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM generations").rowcount
+            self.conn.commit()
+        return deleted
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def get_generation_cache(path: Optional[str] = None) -> GenerationCache:
+    """Shared cache for `path` (default GENERATION_CACHE_PATH)"""
+    path = str(path or GENERATION_CACHE_PATH)
+    with _lock:
+        if path not in _caches:
+            _caches[path] = GenerationCache(path)
+        return _caches[path]
@@ -2,10 +2,22 @@
 from langchain_openai import ChatOpenAI
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_milvus import Milvus, BM25BuiltInFunction
-from typing import Literal, Optional
+from langchain_core.embeddings import Embeddings
+from pymilvus import MilvusClient
+from contextlib import contextmanager
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv, find_dotenv
+from pathlib import Path
+import json
 import os
+import threading
+import time
+import uuid
+
+from .codec import drop_codec
+from .textstore import drop_text_store
+from .numpy_store import NumpyClient, NumpyVectorStore
 find_dotenv()
 load_dotenv()
 
@@ -18,20 +30,169 @@ class MetaData(BaseModel):
     doc_type: Optional[Literal["policy", "manual", "faq"]] = None
 
 
+HIERARCHY_LEVELS = ("domain", "section", "topic")
+HIERARCHY_PATH_FIELD = "hierarchy_path"
+
+
+def hierarchy_path(metadata: dict) -> str:
+    """Materialized path of the hierarchy, e.g. "Healthcare/Patient Care/Diagnostics/".
+
+    The path stops at the first unset level and always ends with "/", so a
+    prefix match on "Healthcare/" cannot match a sibling like "Healthcare IT/".
+    """
+    path = ""
+    for level in HIERARCHY_LEVELS:
+        label = metadata.get(level)
+        if not label:
+            break
+        path += f"{label}/"
+    return path
+
+
 # model = ChatGoogleGenerativeAI(model="models/gemini-2.5-flash-lite")
 # emb_model = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001", output_dimensionality=1536)
 model = ChatOpenAI(model="gpt-5-nano")
-emb_model = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=1536)
+# text-embedding-3 vectors can be shortened (e.g. 256/512) at a small recall cost; see quantize.py.
+# Collections keep the dimension they were built with: rebuild them after changing it.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+# OpenAI-compatible endpoint instead of api.openai.com (the openai client reads it too), e.g. the
+# offline stub in benchmarks/openai_stub.py. Such servers take raw strings, so texts are not
+# pre-tokenized with tiktoken, whose encodings would be downloaded.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+emb_model = OpenAIEmbeddings(
+    model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSIONS, check_embedding_ctx_length=not OPENAI_BASE_URL
+)
 
 MILVUS_URI = os.getenv("MILVUS_URI","./data/rag_task.db")
 MILVUS_API_KEY = os.getenv("MILVUS_API_KEY","")
+# "milvus" or "numpy" (in-process store under NUMPY_STORE_DIR, see numpy_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "milvus")
+# Milvus index over the vectors. FLAT scans them exactly; a compressed index such as IVF_SQ8
+# (int8 codes) or, on Milvus 2.6, HNSW_SQ with {"sq_type": "SQ8", "refine": true, "refine_type": "FP32"}
+# rescores its candidates at full precision (MILVUS_SEARCH_PARAMS e.g. {"ef": 64, "refine_k": 4}).
+# Milvus Lite only builds FLAT, IVF_FLAT and AUTOINDEX. Existing collections keep their index.
+MILVUS_INDEX_TYPE = os.getenv("MILVUS_INDEX_TYPE", "FLAT")
+MILVUS_INDEX_PARAMS = json.loads(os.getenv("MILVUS_INDEX_PARAMS", "{}"))
+# Required for index types langchain_milvus has no default search params for (e.g. HNSW_SQ)
+MILVUS_SEARCH_PARAMS = json.loads(os.getenv("MILVUS_SEARCH_PARAMS", "null"))
+
+# Alias -> {"current": collection, "previous": [older collections, newest first]}
+COLLECTION_ALIASES_PATH = os.getenv("COLLECTION_ALIASES_PATH", "./data/collection_aliases.json")
+# Previous versions kept for rollback after a rebuild
+KEEP_OLD_VERSIONS = int(os.getenv("KEEP_OLD_VERSIONS", "1"))
+
+# reentrant: rollback_alias swaps while holding it
+_alias_lock = threading.RLock()
+
+
+def _load_aliases() -> Dict[str, dict]:
+    path = Path(COLLECTION_ALIASES_PATH)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_aliases(aliases: Dict[str, dict]):
+    """Replace the alias file atomically, so readers see either version"""
+    path = Path(COLLECTION_ALIASES_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(aliases, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _client() -> MilvusClient:
+    if VECTOR_BACKEND == "numpy":
+        return NumpyClient()
+    return MilvusClient(uri=MILVUS_URI, token=MILVUS_API_KEY)
+
 
-def get_vectorstore(collection_name: str, drop_old=False) -> Milvus:
+def resolve_collection(name: str) -> str:
+    """The collection an alias currently points to (or `name` itself)"""
+    return _load_aliases().get(name, {}).get("current", name)
+
+
+def _mirror_native_alias(client: MilvusClient, alias: str, collection: str):
+    """Point the server-side Milvus alias too, so other clients follow the swap"""
+    try:
+        # has_collection(alias) is also true once the alias exists, so aliases are listed instead
+        if alias in client.list_aliases().get("aliases", []):
+            if client.describe_alias(alias).get("collection_name") != collection:
+                client.alter_alias(collection, alias)
+        elif not client.has_collection(alias):
+            client.create_alias(collection, alias)
+        # else a legacy collection still owns the name until it is collected
+    except Exception as e:
+        # Milvus Lite has no aliases; the alias file alone drives get_vectorstore
+        print(f"Native alias unavailable for {alias}: {e}")
+
+
+def swap_alias(alias: str, collection: str, client: Optional[MilvusClient] = None) -> Optional[str]:
+    """Point `alias` at `collection`, returning the collection it pointed to before"""
+    client = client or _client()
+    with _alias_lock:
+        aliases = _load_aliases()
+        entry = aliases.get(alias)
+        if entry is None:
+            # A plain collection with the alias's name becomes the first rollback target
+            entry = {"current": alias if client.has_collection(alias) else None, "previous": []}
+        previous = entry["current"]
+        history = [name for name in entry["previous"] if name != collection]
+        if previous and previous != collection:
+            history.insert(0, previous)
+        aliases[alias] = {"current": collection, "previous": history}
+        _save_aliases(aliases)
+    _mirror_native_alias(client, alias, collection)
+    print(f"alias {alias} -> {collection} (was {previous})")
+    return previous
+
+
+def rollback_alias(alias: str) -> str:
+    """Point `alias` back at its previous version"""
+    with _alias_lock:
+        entry = _load_aliases().get(alias)
+        if not entry or not entry["previous"]:
+            raise ValueError(f"No previous version to roll back to for {alias}")
+        swap_alias(alias, entry["previous"][0])
+    return entry["previous"][0]
+
+
+def gc_versions(alias: str, keep: int = KEEP_OLD_VERSIONS, client: Optional[MilvusClient] = None) -> List[str]:
+    """Drop all but the `keep` newest previous versions of `alias`"""
+    client = client or _client()
+    with _alias_lock:
+        aliases = _load_aliases()
+        entry = aliases.get(alias)
+        if not entry:
+            return []
+        dropped = entry["previous"][keep:]
+        entry["previous"] = entry["previous"][:keep]
+        _save_aliases(aliases)
+    for name in dropped:
+        if client.has_collection(name):
+            client.drop_collection(name)
+        drop_codec(name)
+        drop_text_store(name)
+    if dropped:
+        print(f"dropped old versions of {alias}: {', '.join(dropped)}")
+        if entry["current"]:
+            _mirror_native_alias(client, alias, entry["current"])
+    return dropped
+
+
+def get_vectorstore(collection_name: str, drop_old=False, embeddings: Optional[Embeddings] = None) -> Milvus:
+    """Vectorstore for a collection, following a rebuild alias if one is set"""
+    resolved = resolve_collection(collection_name)
+    if VECTOR_BACKEND == "numpy":
+        vectorstore = NumpyVectorStore(embeddings or emb_model, resolved, drop_old=drop_old)
+        print(f"vectorstore successfully initialized for {collection_name} (numpy backend)")
+        return vectorstore
     vectorstore = Milvus(
-        embedding_function=emb_model,
-        collection_name=collection_name,
+        embedding_function=embeddings or emb_model,
+        collection_name=resolved,
         connection_args={"uri": MILVUS_URI,"token": MILVUS_API_KEY},
-        index_params={"index_type": "FLAT", "metric_type": "L2"},
+        index_params={"index_type": MILVUS_INDEX_TYPE, "metric_type": "L2", "params": MILVUS_INDEX_PARAMS},
+        search_params={"metric_type": "L2", "params": MILVUS_SEARCH_PARAMS} if MILVUS_SEARCH_PARAMS else None,
         drop_old=drop_old,
     )
     # builtin_function=BM25BuiltInFunction(output_field_names="sparse"),
@@ -39,3 +200,39 @@ def get_vectorstore(collection_name: str, drop_old=False) -> Milvus:
     # vector_field=["dense", "sparse"],
     print(f"vectorstore successfully initialized for {collection_name}")
     return vectorstore
+
+
+def index_hierarchy_path(vectorstore: Milvus):
+    """Add an inverted index on the hierarchy path field (serves prefix LIKE filters)"""
+    try:
+        if HIERARCHY_PATH_FIELD in vectorstore.client.list_indexes(vectorstore.collection_name):
+            return
+        index_params = vectorstore.client.prepare_index_params()
+        index_params.add_index(field_name=HIERARCHY_PATH_FIELD, index_type="INVERTED")
+        vectorstore.client.create_index(vectorstore.collection_name, index_params)
+    except Exception as e:
+        print(f"Could not index {HIERARCHY_PATH_FIELD} on {vectorstore.collection_name}: {e}")
+
+
+@contextmanager
+def rebuild_collection(alias: str, embeddings: Optional[Embeddings] = None, keep: int = KEEP_OLD_VERSIONS):
+    """Build a new version of `alias` beside the live one, then swap to it.
+
+    Yields an empty vectorstore for a fresh versioned collection. Queries keep
+    hitting the current version until the block finishes, when the alias is
+    flipped in one atomic write; older versions beyond `keep` are dropped. If
+    the block raises, the new version is dropped and the alias is untouched.
+    The new version may use different `embeddings` (model or dimensions).
+    """
+    version = f"{alias}__v{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    vectorstore = get_vectorstore(version, drop_old=True, embeddings=embeddings)
+    try:
+        yield vectorstore
+    except BaseException:
+        if vectorstore.client.has_collection(version):
+            vectorstore.client.drop_collection(version)
+        drop_codec(version)
+        drop_text_store(version)
+        raise
+    swap_alias(alias, version, vectorstore.client)
+    gc_versions(alias, keep, vectorstore.client)
@@ -1,70 +1,463 @@
 from langchain_community.document_loaders import PDFMinerLoader,TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_milvus import Milvus
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv, find_dotenv
-from typing import List
-import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import json
+import os
 
-from .index import MetaData
-from .utils import mask_pii
+from .index import MetaData, HIERARCHY_PATH_FIELD, hierarchy_path, index_hierarchy_path
+from .utils import mask_pii, content_hash
+from .embedder import EmbeddingScheduler
+from .chunking import Chunker, DEFAULT_CHUNKER
+from .dedup import NearDuplicateDetector
+from .codec import MetadataCodec, ENCODE_METADATA, get_codec, register_codec, add_labels
+from .textstore import SEPARATE_CHUNK_TEXT, get_text_store, create_text_store, stash
 
 find_dotenv()
 load_dotenv()
 
 model = ChatOpenAI(model="gpt-5-nano")
 
+# Max number of primary keys per `pk in [...]` lookup expression
+ID_LOOKUP_BATCH_SIZE = 500
+# Rows per Milvus insert/upsert call, independent of the embedding batch size
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "1000"))
+# Deleted rows after which a collection compaction is triggered
+COMPACT_AFTER_DELETES = int(os.getenv("COMPACT_AFTER_DELETES", "10000"))
+
+_deleted_since_compact: Dict[str, int] = {}
+
+
+def existing_ids(vectorstore: Milvus, ids: List[str]) -> Set[str]:
+    """Return the subset of `ids` already stored as primary keys in the vectorstore."""
+    if vectorstore.col is None or not ids:
+        return set()
+    found = set()
+    for i in range(0, len(ids), ID_LOOKUP_BATCH_SIZE):
+        batch = ids[i:i + ID_LOOKUP_BATCH_SIZE]
+        found.update(vectorstore.get_pks(_in_filter(vectorstore._primary_field, batch)) or [])
+    return found
+
+
+def stored_vectors_by_id(vectorstore: Milvus, ids: List[str]) -> Dict[str, List[float]]:
+    """Map each of `ids` stored as a primary key to its stored embedding."""
+    if vectorstore.col is None or not ids:
+        return {}
+    pk_field, vector_field = vectorstore._primary_field, vectorstore._vector_field
+    found = {}
+    for i in range(0, len(ids), ID_LOOKUP_BATCH_SIZE):
+        rows = vectorstore.client.query(
+            vectorstore.collection_name,
+            filter=_in_filter(pk_field, ids[i:i + ID_LOOKUP_BATCH_SIZE]),
+            output_fields=[pk_field, vector_field],
+        )
+        found.update({row[pk_field]: list(row[vector_field]) for row in rows})
+    return found
+
 
 def load_documents(file_paths: List[str]):
-    """Ingest files into vectorstore after processing and chunking."""
-    documents: list[Document] = []
+    """Ingest files into vectorstore after processing and chunking.
+
+    Every document gets a `doc_id` derived from its file content hash, and
+    byte-identical files are loaded once. Files are always parsed: a file left
+    partly ingested by a failed run must be chunked again to be finished, and
+    its chunks already stored are skipped by chunk id before embedding.
+    """
+    file_ids = {}
     for file_path in file_paths:
+        if not file_path.endswith((".txt", ".pdf")):
+            print(f"Unsupported file format: {file_path}")
+            continue
+        with open(file_path, "rb") as f:
+            doc_id = content_hash(f.read())
+        if doc_id in file_ids.values():
+            print(f"Skipping duplicate file: {file_path}")
+            continue
+        file_ids[file_path] = doc_id
+
+    documents: list[Document] = []
+    for file_path, doc_id in file_ids.items():
         if file_path.endswith(".txt"):
             docs = TextLoader(file_path, encoding="utf-8").load()
-        elif file_path.endswith(".pdf"):
-            docs = PDFMinerLoader(file_path).load()
         else:
-            print(f"Unsupported file format: {file_path}")
-            continue
+            docs = PDFMinerLoader(file_path).load()
+        for doc in docs:
+            doc.metadata["doc_id"] = doc_id
         documents.extend(docs)
 
     print(f"loaded {len(documents)} documents from {len(file_paths)} files.")
     return documents
 
-def get_chunks(documents: List[Document], metadata: MetaData):
-    """Split documents into chunks and mask PII."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,  # chunk size (characters)
-        chunk_overlap=200,  # chunk overlap (characters)
-        add_start_index=True,  # track index in original document
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"generated {len(chunks)} chunks.")
+def get_chunks(
+    documents: List[Document],
+    metadata: MetaData,
+    chunker: Optional[Chunker] = None,
+    dedup: Optional[NearDuplicateDetector] = None,
+):
+    """Mask PII once per document, then split into chunks.
 
-    doc_id = str(uuid.uuid4())
-    chunks = [
+    `doc_id` comes from the loader's file hash (or the document text) and `chunk_id`
+    from the chunk text within that document, so re-chunking the same content
+    yields the same ids. Identical chunks within a document are emitted once.
+    Chunks carry exact `start_index`/`end_index` offsets into the masked document.
+    With a `dedup` detector, near-duplicates of earlier chunks are dropped or get
+    the earlier chunk's id as `canonical_id` (which is otherwise their own id).
+    """
+    chunker = chunker or DEFAULT_CHUNKER
+    documents = [
         Document(
-            page_content=mask_pii(chunk.page_content),
-            metadata={
-                "doc_id": doc_id,
-                "chunk_id": str(uuid.uuid4()),
-                "source_name": chunk.metadata.get("source",'Not Available').split("/")[-1],
-                "start_index": chunk.metadata.get("start_index",0),
-                **metadata.model_dump(),
-            },
+            page_content=mask_pii(doc.page_content),
+            metadata={**doc.metadata, "doc_id": doc.metadata.get("doc_id") or content_hash(doc.page_content)},
         )
-        for chunk in chunks
+        for doc in documents
     ]
-    return chunks
+    chunks = chunker.split_documents(documents)
+    print(f"generated {len(chunks)} chunks.")
+
+    results = []
+    seen = set()
+    for chunk in chunks:
+        doc_id = chunk.metadata["doc_id"]
+        chunk_id = content_hash(doc_id, chunk.page_content)
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        canonical_id = dedup.check(chunk_id, chunk.page_content) if dedup and dedup.mode != "off" else None
+        if canonical_id and dedup.mode == "drop":
+            continue
+        results.append(
+            Document(
+                page_content=chunk.page_content,
+                metadata={
+                    "doc_id": doc_id,
+                    "chunk_id": chunk_id,
+                    "source_name": chunk.metadata.get("source",'Not Available').split("/")[-1],
+                    "start_index": chunk.metadata["start_index"],
+                    "end_index": chunk.metadata["end_index"],
+                    **metadata.model_dump(),
+                    "label_confidence": 1.0,  # manually assigned
+                    "canonical_id": canonical_id or chunk_id,
+                },
+            )
+        )
+    if dedup:
+        print(f"{dedup.stats['near_duplicates']} near-duplicate chunks found so far (mode: {dedup.mode}).")
+    return results
+
+
+class HierarchyClassifier:
+    """Nearest-centroid domain/section/topic classifier over chunk embeddings.
+
+    `hierarchy` is one index entry of the YAML config
+    (`{"domains": [...], "sections": [...], "topics": [...]}`). Each label's
+    centroid is the embedding of the label itself ("section: Radiology"), not
+    a mean over example chunks; chunks are then labelled from the vectors
+    already computed for indexing, so no per-chunk model call is made.
+
+    An optional `tree` entry nests the levels
+    (`{"Healthcare": {"Patient Care": ["Diagnostics"]}}`). Each level is then
+    chosen only among the children of the label picked at the level above, so
+    a chunk never gets a section or topic from another domain; a label with no
+    children leaves the levels below it unset. Without a tree, levels are
+    classified independently.
+    """
+
+    LEVELS = ("domain", "section", "topic")
+
+    def __init__(self, hierarchy: Dict[str, Any], embeddings: Embeddings, temperature: float = 0.05):
+        self.temperature = temperature
+        self.labels: Dict[str, List[str]] = {}
+        self.centroids: Dict[str, np.ndarray] = {}
+        # (labels chosen above) -> allowed labels at the next level
+        self.children: Optional[Dict[tuple, List[str]]] = None
+        tree_labels: Dict[str, set] = {level: set() for level in self.LEVELS}
+        if hierarchy.get("tree"):
+            self.children = {}
+            self._walk(hierarchy["tree"], (), tree_labels)
+        for level in self.LEVELS:
+            labels = sorted(set(hierarchy.get(f"{level}s") or []) | tree_labels[level])
+            if not labels:
+                continue
+            vectors = np.asarray(embeddings.embed_documents([f"{level}: {label}" for label in labels]), dtype=np.float32)
+            self.labels[level] = labels
+            self.centroids[level] = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _walk(self, node: Any, path: tuple, tree_labels: Dict[str, set]):
+        if len(path) >= len(self.LEVELS) or not node:
+            return
+        labels = list(node) if isinstance(node, (dict, list)) else [node]
+        self.children[path] = labels
+        tree_labels[self.LEVELS[len(path)]].update(labels)
+        if isinstance(node, dict):
+            for label, child in node.items():
+                self._walk(child, path + (label,), tree_labels)
+
+    def classify(self, vectors: List[List[float]]) -> List[dict]:
+        """Label each vector per level; `label_confidence` is the lowest level's softmax probability"""
+        X = np.asarray(vectors, dtype=np.float32)
+        X = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+        results = [{} for _ in range(len(X))]
+        confidence = np.ones(len(X), dtype=np.float32)
+        paths: List[Optional[tuple]] = [()] * len(X)
+        for level, centroids in self.centroids.items():
+            logits = (X @ centroids.T) / self.temperature
+            if self.children is not None:
+                allowed = np.zeros(logits.shape, dtype=bool)
+                columns = {label: i for i, label in enumerate(self.labels[level])}
+                for i, path in enumerate(paths):
+                    if path is not None:
+                        allowed[i, [columns[label] for label in self.children.get(path, [])]] = True
+                logits = np.where(allowed, logits, -np.inf)
+            labelled = np.isfinite(logits).any(axis=1)
+            peak = np.where(labelled, logits.max(axis=1, initial=-np.inf), 0.0)
+            probs = np.exp(logits - peak[:, None])
+            probs /= np.maximum(probs.sum(axis=1, keepdims=True), 1e-12)
+            best = probs.argmax(axis=1)
+            confidence = np.where(labelled, np.minimum(confidence, probs[np.arange(len(X)), best]), confidence)
+            for i, index in enumerate(best):
+                if labelled[i]:
+                    results[i][level] = self.labels[level][index]
+                    paths[i] = paths[i] + (results[i][level],)
+                else:
+                    results[i][level] = None  # no child of the label above: nothing below it either
+                    paths[i] = None
+        for result, conf in zip(results, confidence):
+            result["label_confidence"] = round(float(conf), 4)
+        return results
+
 
+def _write_embeddings(vectorstore: Milvus, ids: List[str], docs: List[Document], vectors: List[List[float]]):
+    """Upsert pre-computed embeddings in INSERT_BATCH_SIZE batches.
 
-def ingest_documents(docs: List[Document], vectorstore:Milvus):
-    """Ingest documents into the specified vectorstore collection."""
-    
-    ids = [str(uuid.uuid4()) for _ in range(len(docs))]
-    vectorstore.add_documents(docs, ids=ids)
-    success_message = f"Ingested {len(docs)} documents into {vectorstore.collection_name} index."
+    Each row gets a `hierarchy_path` (see `index.hierarchy_path`). Hierarchy
+    fields are dictionary-encoded for encoded collections, whose path joins
+    the level codes ("3/7/") instead of the labels; with
+    ENCODE_METADATA set, a collection created by this write becomes one.
+    Slim collections (SEPARATE_CHUNK_TEXT) get their text and non-filter
+    metadata written to the chunk-text store first.
+    """
+    texts = [doc.page_content for doc in docs]
+    # the path is derived here so it also reflects auto-classified labels
+    metadatas = [{**doc.metadata, HIERARCHY_PATH_FIELD: hierarchy_path(doc.metadata)} for doc in docs]
+    name = vectorstore.collection_name
+    text_store = get_text_store(name)
+    if text_store is None and SEPARATE_CHUNK_TEXT and vectorstore.col is None:
+        text_store = create_text_store(name)
+    if text_store is not None:
+        texts, metadatas = stash(text_store, ids, texts, metadatas)
+    codec = get_codec(name)
+    if codec is None and ENCODE_METADATA and vectorstore.col is None:
+        codec = register_codec(name, MetadataCodec.from_hierarchy())
+    if codec is not None:
+        # new labels get their codes in the stored dictionary before any row uses them
+        codec = add_labels(name, metadatas)
+        metadatas = [codec.encode(metadata) for metadata in metadatas]
+        for metadata in metadatas:
+            if HIERARCHY_PATH_FIELD in metadata:
+                metadata[HIERARCHY_PATH_FIELD] = hierarchy_path(metadata)
+    if vectorstore.col is None:
+        # upsert needs an existing collection; the first insert creates it
+        vectorstore.add_embeddings(texts, vectors, metadatas, batch_size=INSERT_BATCH_SIZE, ids=ids)
+        index_hierarchy_path(vectorstore)
+        return
+    rows = vectorstore._prepare_insert_list(texts, [vectors], metadatas, ids=ids, force_ids=True)
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        vectorstore.client.upsert(name, rows[i:i + INSERT_BATCH_SIZE])
+
+
+def upsert_chunks(
+    docs: List[Document],
+    vectorstore: Milvus,
+    scheduler: Optional[EmbeddingScheduler] = None,
+    classifier: Optional[HierarchyClassifier] = None,
+    known_vectors: Optional[Dict[str, List[float]]] = None,
+) -> Tuple[int, int, int]:
+    """Embed and write the chunks not yet in the vectorstore, returning (written, skipped, reused).
+
+    `known_vectors` maps chunk text to an already stored embedding; those
+    chunks are written without being embedded again, and `reused` counts the
+    written chunks that took their vector from it. A chunk linked to a
+    canonical chunk reuses the canonical chunk's embedding: taken from the
+    same batch, or read back by id when the canonical chunk was written
+    earlier (another batch or file).
+    """
+    unique = {}
+    for doc in docs:
+        chunk_id = doc.metadata.get("chunk_id") or content_hash(doc.page_content)
+        unique.setdefault(chunk_id, doc)
+
+    skip = existing_ids(vectorstore, list(unique))
+    new_ids = [chunk_id for chunk_id in unique if chunk_id not in skip]
+    new_docs = [unique[chunk_id] for chunk_id in new_ids]
+
+    reused = 0
+    if new_docs:
+        known_vectors = known_vectors or {}
+        canonical_ids = [doc.metadata.get("canonical_id") for doc in new_docs]
+        linked = stored_vectors_by_id(
+            vectorstore, list(dict.fromkeys(c for c in canonical_ids if c and c not in unique))
+        )
+        # text whose embedding each chunk is stored with
+        sources = [
+            unique.get(canonical_id, doc).page_content for canonical_id, doc in zip(canonical_ids, new_docs)
+        ]
+        embedded = [canonical_id not in linked for canonical_id in canonical_ids]
+        reused = sum(1 for text, own in zip(sources, embedded) if own and text in known_vectors)
+        missing = list(dict.fromkeys(
+            text for text, own in zip(sources, embedded) if own and text not in known_vectors
+        ))
+        if missing:
+            scheduler = scheduler or EmbeddingScheduler(vectorstore.embeddings)
+            known_vectors = {**known_vectors, **dict(zip(missing, scheduler.embed(missing)))}
+        vectors = [
+            linked[canonical_id] if canonical_id in linked else known_vectors[text]
+            for canonical_id, text in zip(canonical_ids, sources)
+        ]
+        if classifier is not None:
+            for doc, labels in zip(new_docs, classifier.classify(vectors)):
+                doc.metadata.update(labels)
+        _write_embeddings(vectorstore, new_ids, new_docs, vectors)
+    return len(new_docs), len(docs) - len(new_docs), reused
+
+
+def ingest_documents(
+    docs: List[Document],
+    vectorstore:Milvus,
+    scheduler: Optional[EmbeddingScheduler] = None,
+    classifier: Optional[HierarchyClassifier] = None,
+):
+    """Upsert documents into the specified vectorstore collection.
+
+    Documents are keyed by their `chunk_id`; ids already present in the collection
+    are skipped before embedding, so re-ingesting unchanged content is nearly free.
+    New chunks are embedded through an `EmbeddingScheduler` and written in
+    INSERT_BATCH_SIZE batches. With a `classifier`, each chunk's domain/section/topic
+    is replaced by its nearest-centroid label, computed from the same embeddings.
+    """
+    written, skipped, _ = upsert_chunks(docs, vectorstore, scheduler, classifier)
+    success_message = (
+        f"Ingested {written} documents into {vectorstore.collection_name} index "
+        f"({skipped} unchanged or duplicate skipped)."
+    )
     print(success_message)
     return success_message
 
+
+def _in_filter(field: str, values: List[str], negate: bool = False) -> str:
+    # json quoting escapes quotes inside file names
+    return f"{field} {'not in' if negate else 'in'} {json.dumps(list(values), ensure_ascii=False)}"
+
+
+def _document_filter(doc_ids: Optional[List[str]] = None, source_names: Optional[List[str]] = None) -> str:
+    clauses = []
+    if doc_ids:
+        clauses.append(_in_filter("doc_id", doc_ids))
+    if source_names:
+        clauses.append(_in_filter("source_name", source_names))
+    return " or ".join(f"({clause})" for clause in clauses)
+
+
+def compact_collection(vectorstore: Milvus) -> Optional[int]:
+    """Trigger a compaction so deleted rows are purged from the collection's segments."""
+    _deleted_since_compact[vectorstore.collection_name] = 0
+    try:
+        job_id = vectorstore.client.compact(vectorstore.collection_name)
+    except Exception as e:
+        # Milvus Lite has no compaction; deletes are already invisible to search
+        print(f"Compaction unavailable for {vectorstore.collection_name}: {e}")
+        return None
+    print(f"Started compaction {job_id} for {vectorstore.collection_name}")
+    return job_id
+
+
+def _record_deletes(vectorstore: Milvus, count: int):
+    name = vectorstore.collection_name
+    _deleted_since_compact[name] = _deleted_since_compact.get(name, 0) + count
+    if _deleted_since_compact[name] >= COMPACT_AFTER_DELETES:
+        compact_collection(vectorstore)
+
+
+def _delete_where(vectorstore: Milvus, expr: str) -> int:
+    text_store = get_text_store(vectorstore.collection_name)
+    if text_store is not None:
+        rows = vectorstore.client.query(
+            vectorstore.collection_name, filter=expr, output_fields=[vectorstore._primary_field]
+        )
+        text_store.delete(row[vectorstore._primary_field] for row in rows)
+    result = vectorstore.client.delete(vectorstore.collection_name, filter=expr)
+    count = result.get("delete_count", 0) if isinstance(result, dict) else len(result or [])
+    _record_deletes(vectorstore, count)
+    return count
+
+
+def delete_documents(
+    vectorstore: Milvus,
+    doc_ids: Optional[List[str]] = None,
+    source_names: Optional[List[str]] = None,
+) -> int:
+    """Delete every chunk of the given documents, returning the number of chunks removed.
+
+    A compaction is triggered once COMPACT_AFTER_DELETES chunks have been deleted
+    from the collection.
+    """
+    expr = _document_filter(doc_ids, source_names)
+    if vectorstore.col is None or not expr:
+        return 0
+    count = _delete_where(vectorstore, expr)
+    print(f"Deleted {count} chunks from {vectorstore.collection_name} index.")
+    return count
+
+
+def delete_stale_versions(vectorstore: Milvus, source_names: List[str], keep_doc_ids: List[str]) -> int:
+    """Delete chunks of `source_names` that belong to documents other than `keep_doc_ids`."""
+    if vectorstore.col is None or not source_names or not keep_doc_ids:
+        return 0
+    stale = f"{_in_filter('source_name', source_names)} and {_in_filter('doc_id', keep_doc_ids, negate=True)}"
+    return _delete_where(vectorstore, stale)
+
+
+def stored_vectors(vectorstore: Milvus, source_names: List[str]) -> Dict[str, List[float]]:
+    """Map chunk text to its stored embedding for every chunk of the given sources."""
+    if vectorstore.col is None or not source_names:
+        return {}
+    pk_field, text_field, vector_field = vectorstore._primary_field, vectorstore._text_field, vectorstore._vector_field
+    rows = vectorstore.client.query(
+        vectorstore.collection_name,
+        filter=_in_filter("source_name", source_names),
+        output_fields=[pk_field, text_field, vector_field],
+    )
+    text_store = get_text_store(vectorstore.collection_name)
+    if text_store is not None:
+        records = text_store.get(row[pk_field] for row in rows)
+        for row in rows:
+            row[text_field] = records.get(row[pk_field], {}).get("text", "")
+    return {row[text_field]: list(row[vector_field]) for row in rows if row[text_field]}
+
+
+def replace_documents(
+    docs: List[Document],
+    vectorstore: Milvus,
+    scheduler: Optional[EmbeddingScheduler] = None,
+    classifier: Optional[HierarchyClassifier] = None,
+):
+    """Replace the stored versions of the chunks' source documents with `docs`.
+
+    The new chunks are written first, reusing the stored embedding of any chunk
+    whose text is unchanged, and only then are chunks of older versions of the
+    same `source_name` deleted, so the document never disappears from search.
+    """
+    source_names = sorted({doc.metadata["source_name"] for doc in docs})
+    doc_ids = sorted({doc.metadata["doc_id"] for doc in docs})
+    known = stored_vectors(vectorstore, source_names)
+    written, skipped, reused = upsert_chunks(docs, vectorstore, scheduler, classifier, known_vectors=known)
+    deleted = delete_stale_versions(vectorstore, source_names, doc_ids)
+    success_message = (
+        f"Replaced {', '.join(source_names)} in {vectorstore.collection_name} index: "
+        f"{written} chunks written ({reused} reused stored embeddings), {deleted} stale chunks deleted."
+    )
+    print(success_message)
+    return success_message
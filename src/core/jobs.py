@@ -0,0 +1,324 @@
+"""
+Background ingestion jobs.
+
+`JobManager` runs ingestion on a small worker pool instead of inside the
+request handler. A job's state is checkpointed to `<INGEST_JOBS_DIR>/<job_id>/job.json`
+after every committed batch, so its progress can be polled, it can be
+cancelled between batches, and a job interrupted by a crash resumes with the
+file it was writing. That file is chunked again from its first batch; chunks
+committed before the interruption are skipped by id, so only the rest is
+embedded. The near-duplicate detector is saved after every finished file, so
+duplicates of earlier files are still caught after a resume. Uploaded files
+are copied into the job directory so they outlive the upload's temp files.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, List, Optional
+from dotenv import load_dotenv, find_dotenv
+
+from .index import MetaData, get_vectorstore
+from .ingest import load_documents, get_chunks, upsert_chunks, HierarchyClassifier
+from .ingest import stored_vectors, delete_stale_versions
+from .embedder import EmbeddingScheduler, EMBED_BATCH_SIZE, EMBED_MAX_IN_FLIGHT
+from .dedup import NearDuplicateDetector, NEAR_DUPLICATE_MODE
+from .codec import MetadataCodec, ENCODE_METADATA, get_codec, register_codec
+
+find_dotenv()
+load_dotenv()
+
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", "./data/jobs")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Chunks embedded and committed between two checkpoints; by default enough to keep
+# every concurrent embedding batch of the scheduler busy
+INGEST_JOB_BATCH_SIZE = int(os.getenv("INGEST_JOB_BATCH_SIZE", str(EMBED_BATCH_SIZE * EMBED_MAX_IN_FLIGHT)))
+
+ACTIVE_STATES = ("queued", "running")
+
+
+@dataclass
+class IngestJob:
+    """Persisted state of one ingestion job"""
+    job_id: str
+    index_name: str
+    files: List[str]
+    metadata: dict
+    hierarchy: Optional[dict] = None  # the index's YAML hierarchy, if loaded
+    auto_classify: bool = False
+    replace: bool = False  # delete older versions of each file's source_name
+    dedup_mode: str = NEAR_DUPLICATE_MODE  # near-duplicate chunks: off | drop | link
+    status: str = "queued"  # queued | running | completed | failed | cancelled
+    files_done: int = 0
+    file_started: bool = False  # current file may have committed chunks
+    file_chunks: int = 0
+    batches_done: int = 0  # committed batches of the current file
+    file_written: int = 0  # chunks of the current file written, across restarts
+    file_skipped: int = 0
+    chunks_written: int = 0
+    chunks_skipped: int = 0
+    chunks_deleted: int = 0
+    chunks_near_duplicate: int = 0
+    elapsed_s: float = 0.0  # running time, summed across resumes
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def progress(self, batch_size: int = INGEST_JOB_BATCH_SIZE) -> dict:
+        """Status summary with progress and throughput"""
+        current = 0.0
+        if self.file_chunks and self.files_done < len(self.files):
+            current = min(1.0, self.batches_done * batch_size / self.file_chunks)
+        fraction = (self.files_done + current) / len(self.files) if self.files else 1.0
+        processed = self.chunks_written + self.chunks_skipped
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "index_name": self.index_name,
+            "progress": round(fraction, 4),
+            "files_done": self.files_done,
+            "files_total": len(self.files),
+            "chunks_written": self.chunks_written,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_deleted": self.chunks_deleted,
+            "chunks_near_duplicate": self.chunks_near_duplicate,
+            "chunks_per_s": round(processed / self.elapsed_s, 1) if self.elapsed_s else 0.0,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Queue ingestion jobs on a worker pool with checkpointing, cancellation and resume"""
+
+    def __init__(
+        self,
+        jobs_dir: str = INGEST_JOBS_DIR,
+        max_workers: int = INGEST_WORKERS,
+        batch_size: int = INGEST_JOB_BATCH_SIZE,
+    ):
+        self.jobs_dir = Path(jobs_dir)
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest")
+        self.jobs: Dict[str, IngestJob] = {}
+        self.futures: Dict[str, Future] = {}
+        self.cancel_events: Dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id / "job.json"
+
+    def _save(self, job: IngestJob):
+        """Write the job state atomically"""
+        path = self._path(job.job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(job), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _dedup_path(self, job: IngestJob) -> Path:
+        """Detector state as of `job.files_done` finished files"""
+        return self.jobs_dir / job.job_id / f"dedup_{job.files_done}.npz"
+
+    def _load(self, job_id: str) -> Optional[IngestJob]:
+        path = self._path(job_id)
+        if not path.exists():
+            return None
+        return IngestJob(**json.loads(path.read_text(encoding="utf-8")))
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job or self._load(job_id)
+
+    def submit(
+        self,
+        files: List[str],
+        index_name: str,
+        metadata: MetaData,
+        hierarchy: Optional[dict] = None,
+        replace: bool = False,
+        dedup_mode: str = NEAR_DUPLICATE_MODE,
+        auto_classify: bool = False,
+    ) -> IngestJob:
+        """Copy the files into a new job directory and queue the job"""
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self.jobs_dir / job_id / "files"
+        stored = []
+        for i, file_path in enumerate(files):
+            # one subdirectory per file keeps the original name (used as source_name)
+            target = job_dir / str(i) / Path(file_path).name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, target)
+            stored.append(str(target))
+        job = IngestJob(
+            job_id, index_name, stored, metadata.model_dump(), hierarchy, auto_classify, replace, dedup_mode
+        )
+        self._save(job)
+        self._start(job)
+        print(f"queued ingestion job {job_id}: {len(files)} files into {index_name}")
+        return job
+
+    def _start(self, job: IngestJob):
+        cancel = threading.Event()
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.cancel_events[job.job_id] = cancel
+            self.futures[job.job_id] = self.pool.submit(self._run, job, cancel)
+
+    def resume(self) -> List[str]:
+        """Restart jobs left queued or running by a previous process"""
+        resumed = []
+        if not self.jobs_dir.exists():
+            return resumed
+        for path in sorted(self.jobs_dir.glob("*/job.json")):
+            job_id = path.parent.name
+            with self.lock:
+                if job_id in self.jobs:
+                    continue
+            job = self._load(job_id)
+            if job is not None and job.status in ACTIVE_STATES:
+                job.status = "queued"
+                self._start(job)
+                resumed.append(job_id)
+        if resumed:
+            print(f"resumed {len(resumed)} ingestion jobs: {', '.join(resumed)}")
+        return resumed
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; a running job stops after its current batch"""
+        with self.lock:
+            event = self.cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+            return True
+        # Not running in this process: mark it so it is not resumed.
+        job = self._load(job_id)
+        if job is None or job.status not in ACTIVE_STATES:
+            return False
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        self._save(job)
+        return True
+
+    def status(self, job_id: str) -> Optional[dict]:
+        job = self.get(job_id)
+        return job.progress(self.batch_size) if job else None
+
+    def list_jobs(self) -> List[dict]:
+        """Status of every known job, newest first"""
+        jobs = {}
+        if self.jobs_dir.exists():
+            for path in self.jobs_dir.glob("*/job.json"):
+                job = self._load(path.parent.name)
+                if job is not None:
+                    jobs[job.job_id] = job
+        with self.lock:
+            jobs.update(self.jobs)
+        ordered = sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+        return [job.progress(self.batch_size) for job in ordered]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Block until the job finishes, returning its final status"""
+        with self.lock:
+            future = self.futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.status(job_id)
+
+    def _checkpoint(self, job: IngestJob, tick: float) -> float:
+        now = time.perf_counter()
+        job.elapsed_s += now - tick
+        self._save(job)
+        return now
+
+    def _run(self, job: IngestJob, cancel: threading.Event):
+        tick = time.perf_counter()
+        job.status = "running"
+        self._save(job)
+        try:
+            vectorstore = get_vectorstore(job.index_name)
+            metadata = MetaData(**job.metadata)
+            scheduler = EmbeddingScheduler(vectorstore.embeddings)
+            classifier = None
+            if job.auto_classify and job.hierarchy:
+                classifier = HierarchyClassifier(job.hierarchy, vectorstore.embeddings)
+            if ENCODE_METADATA and vectorstore.col is None and get_codec(vectorstore.collection_name) is None:
+                # a new collection: seed its dictionary with the YAML labels
+                register_codec(vectorstore.collection_name, MetadataCodec.from_hierarchy(job.hierarchy))
+            # one detector per job, so boilerplate repeated across files is caught too
+            dedup = None
+            if job.dedup_mode != "off":
+                saved = self._dedup_path(job)
+                if saved.exists():
+                    dedup = NearDuplicateDetector.load(str(saved), mode=job.dedup_mode)
+                else:
+                    dedup = NearDuplicateDetector(mode=job.dedup_mode)
+
+            while job.files_done < len(job.files) and not cancel.is_set():
+                file_path = job.files[job.files_done]
+                docs = load_documents([file_path])
+                found = dedup.stats["near_duplicates"] if dedup else 0
+                chunks = get_chunks(docs, metadata, dedup=dedup)
+                near_duplicates = dedup.stats["near_duplicates"] - found if dedup else 0
+                # Chunks written before a restart come back as skipped; they are
+                # taken out of the skipped count so the totals stay exact.
+                committed = 0
+                if job.file_started:
+                    job.chunks_skipped -= job.file_skipped
+                    committed = job.file_written
+                job.file_chunks, job.batches_done, job.file_skipped = len(chunks), 0, 0
+                job.file_started = True
+                tick = self._checkpoint(job, tick)
+                source_names = sorted({chunk.metadata["source_name"] for chunk in chunks})
+                # Unchanged chunks of the previous version keep their embeddings
+                known = stored_vectors(vectorstore, source_names) if job.replace else None
+
+                for start in range(0, len(chunks), self.batch_size):
+                    if cancel.is_set():
+                        break
+                    batch = chunks[start:start + self.batch_size]
+                    written, skipped, _ = upsert_chunks(batch, vectorstore, scheduler, classifier, known_vectors=known)
+                    rewritten = min(committed, skipped)
+                    committed -= rewritten
+                    job.chunks_written += written
+                    job.chunks_skipped += skipped - rewritten
+                    job.file_written += written
+                    job.file_skipped += skipped - rewritten
+                    job.batches_done += 1
+                    tick = self._checkpoint(job, tick)
+                else:
+                    if job.replace:
+                        doc_ids = sorted({chunk.metadata["doc_id"] for chunk in chunks})
+                        job.chunks_deleted += delete_stale_versions(vectorstore, source_names, doc_ids)
+                    job.chunks_near_duplicate += near_duplicates
+                    previous = self._dedup_path(job)
+                    job.files_done += 1
+                    job.file_started, job.file_chunks, job.batches_done = False, 0, 0
+                    job.file_written, job.file_skipped = 0, 0
+                    if dedup:
+                        dedup.save(str(self._dedup_path(job)))
+                    tick = self._checkpoint(job, tick)
+                    # dropped only once the checkpoint no longer points at it
+                    previous.unlink(missing_ok=True)
+
+            job.status = "cancelled" if cancel.is_set() else "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"ingestion job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            self._checkpoint(job, tick)
+            with self.lock:
+                self.cancel_events.pop(job.job_id, None)
+        print(f"ingestion job {job.job_id} {job.status}: {job.chunks_written} chunks written, {job.chunks_skipped} skipped")
+
+
+job_manager = JobManager()
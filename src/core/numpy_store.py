@@ -0,0 +1,867 @@
+"""
+In-process vector store on NumPy, selected with VECTOR_BACKEND=numpy.
+
+Each collection is a directory under NUMPY_STORE_DIR with a memory-mapped
+float32 vector matrix and an append-only JSONL log of inserts and deletes.
+The log is replayed into columnar metadata arrays on load. String fields are
+dictionary-encoded, so `MetaData` filters compile to integer comparisons
+over NumPy arrays (boolean masks). Search is a brute-force squared-L2 scan of
+the masked rows with `argpartition`: no server and no IPC.
+
+With NUMPY_VECTOR_PRECISION set to float16, int8 or binary, a compact copy
+of the vectors (see quantize.py) is kept in RAM and scanned for the top
+`k * RESCORE_FACTOR` candidates, whose exact distances are then computed
+from the float32 matrix, which stays memory-mapped on disk.
+
+`NumpyVectorStore` mirrors the parts of `langchain_milvus.Milvus` used in
+this package (`col`, `fields`, `client`, `add_embeddings`, `get_pks`,
+`similarity_search_with_relevance_scores`, ...). `NumpyClient` mirrors the
+`MilvusClient` calls (`query`, `upsert`, `delete`, `compact`, ...), and both
+accept filter expressions in the Milvus syntax this package writes: `==`,
+`!=`, comparisons, `in`, `not in`, `like`, `and`, `or`, `not`, parentheses.
+"""
+
+import os
+import re
+import ast
+import json
+import uuid
+import shutil
+import operator
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from dotenv import load_dotenv, find_dotenv
+
+from .quantize import PRECISIONS, RESCORE_FACTOR, QuantizedVectors, _top_k
+
+find_dotenv()
+load_dotenv()
+
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "./data/numpy_store")
+# float32 (exact scan) | float16 | int8 | binary: precision of the in-RAM copy scanned for candidates
+NUMPY_VECTOR_PRECISION = os.getenv("NUMPY_VECTOR_PRECISION", "float32")
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix product, bounding the temporary distance buffers
+SEARCH_BLOCK_ROWS = 65536
+
+COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne, ">": operator.gt,
+    ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+      | (?P<op>==|!=|>=|<=|>|<|\(|\)|\[|\]|,)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )""", re.VERBOSE)
+
+
+# ============================================================================
+# FILTER EXPRESSIONS
+# ============================================================================
+
+def _tokenize(expr: str) -> List[Tuple[str, Any]]:
+    tokens, pos, expr = [], 0, expr.rstrip()
+    while pos < len(expr):
+        match = TOKEN.match(expr, pos)
+        if match is None:
+            raise ValueError(f"Cannot parse filter at {expr[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        tokens.append((kind, ast.literal_eval(text) if kind in ("string", "number") else text))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over tokens; `and` binds tighter than `or`"""
+
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self) -> Tuple[Optional[str], Any]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[Optional[str], Any]:
+        token = self.peek()
+        self.i += 1
+        return token
+
+    def keyword(self, word: str) -> bool:
+        kind, value = self.peek()
+        if kind == "word" and value.lower() == word:
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, symbol: str):
+        if self.take() != ("op", symbol):
+            raise ValueError(f"Expected {symbol!r} in filter")
+
+    def parse(self) -> tuple:
+        node = self.or_expr()
+        if self.i != len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r} in filter")
+        return node
+
+    def or_expr(self) -> tuple:
+        node = self.and_expr()
+        while self.keyword("or"):
+            node = ("or", node, self.and_expr())
+        return node
+
+    def and_expr(self) -> tuple:
+        node = self.unary()
+        while self.keyword("and"):
+            node = ("and", node, self.unary())
+        return node
+
+    def unary(self) -> tuple:
+        if self.keyword("not"):
+            return ("not", self.unary())
+        if self.peek() == ("op", "("):
+            self.i += 1
+            node = self.or_expr()
+            self.expect(")")
+            return node
+        return self.predicate()
+
+    def predicate(self) -> tuple:
+        kind, field = self.take()
+        if kind != "word":
+            raise ValueError(f"Expected a field name in filter, got {field!r}")
+        if self.keyword("not"):
+            if not self.keyword("in"):
+                raise ValueError("Expected 'in' after 'not' in filter")
+            return ("not", ("pred", "in", field, self.values()))
+        if self.keyword("in"):
+            return ("pred", "in", field, self.values())
+        if self.keyword("like"):
+            kind, pattern = self.take()
+            if kind != "string":
+                raise ValueError("Expected a string pattern after 'like'")
+            return ("pred", "like", field, pattern)
+        kind, op = self.take()
+        if op not in COMPARISONS:
+            raise ValueError(f"Unsupported operator {op!r} in filter")
+        return ("pred", op, field, self.value())
+
+    def value(self) -> Any:
+        kind, value = self.take()
+        if kind in ("string", "number"):
+            return value
+        if kind == "word" and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        raise ValueError(f"Expected a value in filter, got {value!r}")
+
+    def values(self) -> list:
+        self.expect("[")
+        values = []
+        if self.peek() != ("op", "]"):
+            values.append(self.value())
+            while self.peek() == ("op", ","):
+                self.i += 1
+                values.append(self.value())
+        self.expect("]")
+        return values
+
+
+@lru_cache(maxsize=1024)
+def parse_filter(expr: str) -> Optional[tuple]:
+    """Syntax tree of a Milvus boolean expression (None for an empty one)"""
+    if not expr or not expr.strip():
+        return None
+    return _Parser(_tokenize(expr)).parse()
+
+
+def _like_regex(pattern: str) -> re.Pattern:
+    parts = re.split(r"(%|_)", pattern)
+    return re.compile("".join(".*" if p == "%" else "." if p == "_" else re.escape(p) for p in parts), re.DOTALL)
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def _kind(value: Any) -> str:
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "object"
+    return "int" if isinstance(value, int) else "float"
+
+
+class _Column:
+    """One field: dictionary codes for strings (0 = null), else a numeric or object array"""
+
+    DTYPES = {"str": np.int32, "int": np.int64, "float": np.float64, "object": object}
+
+    def __init__(self, kind: str, capacity: int):
+        self.kind = kind
+        self.data = self._empty(kind, capacity)
+        self.vocab: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    @classmethod
+    def _empty(cls, kind: str, capacity: int) -> np.ndarray:
+        if kind == "object":
+            return np.full(capacity, None, dtype=object)
+        if kind == "float":
+            return np.full(capacity, np.nan)
+        return np.zeros(capacity, dtype=cls.DTYPES[kind])
+
+    def resize(self, capacity: int):
+        data = self._empty(self.kind, capacity)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def _fits(self, value: Any) -> bool:
+        kind = _kind(value)
+        return self.kind == "object" or kind == self.kind or (self.kind == "float" and kind == "int")
+
+    def _widen(self, value: Any, count: int):
+        values = [self.get(row) for row in range(count)]
+        self.kind = "float" if {self.kind, _kind(value)} == {"int", "float"} else "object"
+        self.data = self._empty(self.kind, len(self.data))
+        self.vocab, self.codes = [], {}
+        self.write(0, values, count)
+
+    def write(self, start: int, values: List[Any], count: int):
+        for value in values:
+            if value is not None and not self._fits(value):
+                self._widen(value, count)
+        if self.kind == "str":
+            self.data[start:start + len(values)] = [self.code(value) for value in values]
+        else:
+            empty = self._empty(self.kind, 1)[0]
+            self.data[start:start + len(values)] = [empty if value is None else value for value in values]
+
+    def code(self, label: Optional[str]) -> int:
+        if label is None:
+            return 0
+        code = self.codes.get(label)
+        if code is None:
+            self.vocab.append(label)
+            code = self.codes[label] = len(self.vocab)
+        return code
+
+    def get(self, row: int) -> Any:
+        value = self.data[row]
+        if self.kind == "str":
+            return self.vocab[value - 1] if value else None
+        if self.kind == "float":
+            return None if np.isnan(value) else float(value)
+        return int(value) if self.kind == "int" else value
+
+    def mask(self, op: str, value: Any, count: int) -> np.ndarray:
+        data = self.data[:count]
+        if self.kind == "str":
+            if op == "in":
+                return np.isin(data, [self.codes[v] for v in value if isinstance(v, str) and v in self.codes])
+            if op == "like":
+                regex = _like_regex(value)
+                return np.isin(data, [code for label, code in self.codes.items() if regex.fullmatch(label)])
+            if op in ("==", "!="):
+                code = self.codes.get(value, -1) if isinstance(value, str) else -1
+                return COMPARISONS[op](data, code)
+            raise ValueError(f"Operator {op} is not supported on string fields")
+        if op == "like":
+            raise ValueError("like is only supported on string fields")
+        if self.kind == "object":
+            if op == "in":
+                return np.fromiter((v in value for v in data), dtype=bool, count=count)
+            return np.fromiter((v is not None and COMPARISONS[op](v, value) for v in data), dtype=bool, count=count)
+        if op == "in":
+            return np.isin(data, [v for v in value if _kind(v) in ("int", "float")])
+        if _kind(value) not in ("int", "float"):
+            return np.zeros(count, dtype=bool)
+        return COMPARISONS[op](data, value)
+
+
+class NumpyCollection:
+    """Vectors in a memory-mapped float32 matrix plus columnar metadata, persisted as an append-only log.
+
+    Files are generation-numbered (`vectors.<g>.npy`, `log.<g>.jsonl`) and
+    `CURRENT` names the live generation, so compaction switches atomically.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        primary_field: str = "pk",
+        text_field: str = "text",
+        vector_field: str = "vector",
+        precision: Optional[str] = None,
+    ):
+        self.path = path
+        self.primary_field = primary_field
+        self.text_field = text_field
+        self.vector_field = vector_field
+        self.precision = precision or NUMPY_VECTOR_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {self.precision}; expected one of {PRECISIONS}")
+        self.lock = threading.RLock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.generation = 0
+        self.dim: Optional[int] = None
+        self.count = 0  # rows used, deleted ones included
+        self.capacity = 0
+        self.vectors: Optional[np.ndarray] = None
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.texts: List[str] = []
+        self.columns: Dict[str, _Column] = {self.primary_field: _Column("str", 0)}
+        self.rows_by_pk: Dict[str, int] = {}
+        self.quantized: Optional[QuantizedVectors] = None  # first rows' compact copy, built on search
+
+    @property
+    def exists(self) -> bool:
+        return (self.path / "CURRENT").exists()
+
+    def _file(self, name: str, generation: Optional[int] = None) -> Path:
+        stem, suffix = name.split(".")
+        return self.path / f"{stem}.{self.generation if generation is None else generation}.{suffix}"
+
+    def _load(self):
+        if not self.exists:
+            return
+        self.generation = int((self.path / "CURRENT").read_text())
+        self.vectors = np.load(self._file("vectors.npy"), mmap_mode="r+")
+        self.capacity, self.dim = self.vectors.shape
+        self._resize(self.capacity)
+        log = self._file("log.jsonl")
+        good = 0
+        with open(log, "rb") as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break  # torn last write: drop it
+                good += len(line)
+        if good < log.stat().st_size:
+            with open(log, "r+b") as f:
+                f.truncate(good)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS][:self.count - start])
+            self.sq_norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    def _resize(self, capacity: int):
+        for name in ("sq_norms", "alive"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old[:capacity]
+            setattr(self, name, new)
+        for column in self.columns.values():
+            column.resize(capacity)
+
+    def _create(self, dim: int):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.vectors = np.lib.format.open_memmap(
+            self._file("vectors.npy"), mode="w+", dtype=np.float32, shape=(INITIAL_CAPACITY, dim)
+        )
+        self.capacity = INITIAL_CAPACITY
+        self._resize(self.capacity)
+        self._file("log.jsonl").touch()
+        tmp = self.path / "CURRENT.tmp"
+        tmp.write_text(str(self.generation))
+        os.replace(tmp, self.path / "CURRENT")
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        path = self._file("vectors.npy")
+        tmp = path.with_name(path.name + ".tmp")
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        grown[:self.count] = self.vectors[:self.count]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp, path)
+        self.vectors = np.load(path, mmap_mode="r+")
+        self.capacity = capacity
+        self._resize(capacity)
+
+    def _log(self, entry: dict):
+        with open(self._file("log.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def _apply(self, entry: dict):
+        if entry["op"] == "delete":
+            rows = entry["rows"]
+            self.alive[rows] = False
+            for row in rows:
+                pk = self.columns[self.primary_field].get(row)
+                if self.rows_by_pk.get(pk) == row:
+                    del self.rows_by_pk[pk]
+            return
+        start, pks, metadatas = entry["start"], entry["pks"], entry["metadatas"]
+        end = start + len(pks)
+        self.texts[start:end] = entry["texts"]
+        for name in dict.fromkeys(key for metadata in metadatas for key in metadata):
+            if name not in self.columns:
+                first = next((m[name] for m in metadatas if m.get(name) is not None), "")
+                self.columns[name] = _Column(_kind(first), self.capacity)
+        self.columns[self.primary_field].write(start, pks, start)
+        for name, column in self.columns.items():
+            if name != self.primary_field:
+                column.write(start, [metadata.get(name) for metadata in metadatas], start)
+        self.alive[start:end] = True
+        self.rows_by_pk.update((pk, start + i) for i, pk in enumerate(pks))
+        self.count = end
+
+    def add(self, pks: List[str], texts: List[str], vectors: Any, metadatas: List[dict]) -> List[str]:
+        """Insert rows; a primary key already stored is replaced (upsert)"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(pks), -1)
+        # the last row wins for a primary key repeated in the batch
+        last = {pk: i for i, pk in enumerate(pks)}
+        keep = sorted(last.values())
+        pks, texts, vectors = [pks[i] for i in keep], [texts[i] for i in keep], vectors[keep]
+        metadatas = [metadatas[i] for i in keep]
+        with self.lock:
+            if self.dim is None:
+                self._create(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match the collection ({self.dim})")
+            replaced = [self.rows_by_pk[pk] for pk in pks if pk in self.rows_by_pk]
+            if replaced:
+                self._delete_rows(replaced)
+            start = self.count
+            self._grow(start + len(pks))
+            self.vectors[start:start + len(pks)] = vectors
+            self.vectors.flush()
+            self.sq_norms[start:start + len(pks)] = np.einsum("ij,ij->i", vectors, vectors)
+            entry = {"op": "add", "start": start, "pks": pks, "texts": texts, "metadatas": metadatas}
+            self._log(entry)
+            self._apply(entry)
+        return pks
+
+    def _delete_rows(self, rows: List[int]) -> int:
+        entry = {"op": "delete", "rows": [int(row) for row in rows]}
+        self._log(entry)
+        self._apply(entry)
+        return len(rows)
+
+    def delete(self, expr: Optional[str] = None, ids: Optional[List[str]] = None) -> int:
+        with self.lock:
+            if ids is not None:
+                rows = [self.rows_by_pk[pk] for pk in dict.fromkeys(ids) if pk in self.rows_by_pk]
+            else:
+                rows = np.flatnonzero(self.mask(expr)).tolist()
+            return self._delete_rows(rows) if rows else 0
+
+    def _node_mask(self, node: tuple) -> np.ndarray:
+        kind = node[0]
+        if kind == "and":
+            return self._node_mask(node[1]) & self._node_mask(node[2])
+        if kind == "or":
+            return self._node_mask(node[1]) | self._node_mask(node[2])
+        if kind == "not":
+            return ~self._node_mask(node[1])
+        _, op, field, value = node
+        if field == self.primary_field and op in ("in", "=="):
+            rows = [self.rows_by_pk.get(pk) for pk in (value if op == "in" else [value]) if isinstance(pk, str)]
+            mask = np.zeros(self.count, dtype=bool)
+            mask[[row for row in rows if row is not None]] = True
+            return mask
+        column = self.columns.get(field)
+        if column is None:
+            raise ValueError(f"Unknown field {field} in filter")
+        return column.mask(op, value, self.count)
+
+    def mask(self, expr: Optional[str] = None) -> np.ndarray:
+        """Live rows matching a filter expression"""
+        node = parse_filter(expr) if expr else None
+        with self.lock:
+            alive = self.alive[:self.count]
+            return alive.copy() if node is None else alive & self._node_mask(node)
+
+    def _quantized(self) -> QuantizedVectors:
+        """Compact copy of every row's vector, kept in step with inserts"""
+        encoded = len(self.quantized) if self.quantized is not None else 0
+        # rebuilt once the rows double, so an int8 scale fitted on few rows does not stick
+        if self.quantized is None or self.count > 2 * encoded:
+            self.quantized = QuantizedVectors(self.vectors[:self.count], self.precision)
+        elif encoded < self.count:
+            self.quantized.extend(self.vectors[encoded:self.count], self.vectors)
+        return self.quantized
+
+    def search(self, vector: Any, k: int, expr: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(row, squared L2 distance) of the `k` nearest live rows matching `expr`.
+
+        With a reduced precision, only the best candidates of the compact copy
+        (ranked by inner product, i.e. by L2 for unit-length embeddings) are
+        scored exactly.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            if self.dim is None or k <= 0:
+                return []
+            mask = self.mask(expr)
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return []
+            if self.precision != "float32":
+                scores = self._quantized().approximate_scores(query)[rows]
+                rows = np.sort(rows[_top_k(scores, k * RESCORE_FACTOR if RESCORE_FACTOR else k)])
+            distances = np.empty(len(rows), dtype=np.float32)
+            dense = len(rows) == self.count  # no filter, no deletes: scan without gathering rows
+            for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+                block = rows[start:start + SEARCH_BLOCK_ROWS]
+                vectors = self.vectors[block[0]:block[-1] + 1] if dense else self.vectors[block]
+                distances[start:start + len(block)] = self.sq_norms[block] - 2 * (vectors @ query)
+            distances += query @ query
+            k = min(k, len(rows))
+            top = np.argpartition(distances, k - 1)[:k]
+            top = top[np.argsort(distances[top], kind="stable")]
+            return [(int(rows[i]), max(0.0, float(distances[i]))) for i in top]
+
+    def row(self, row: int, output_fields: Optional[List[str]] = None) -> dict:
+        """A stored row as a dict; `output_fields` None or ["*"] means every scalar field"""
+        everything = not output_fields or "*" in output_fields
+        wanted = set(self.columns) | {self.text_field} if everything else set(output_fields)
+        result = {self.primary_field: self.columns[self.primary_field].get(row)}
+        if self.text_field in wanted:
+            result[self.text_field] = self.texts[row]
+        for name, column in self.columns.items():
+            if name in wanted and name != self.primary_field:
+                result[name] = column.get(row)
+        if (output_fields and "*" in output_fields) or self.vector_field in wanted:
+            result[self.vector_field] = np.array(self.vectors[row], dtype=np.float32)
+        return result
+
+    def compact(self):
+        """Rewrite the live rows into a new generation, dropping deleted ones"""
+        with self.lock:
+            if self.dim is None:
+                return
+            rows = np.flatnonzero(self.alive[:self.count])
+            generation = self.generation + 1
+            capacity = max(INITIAL_CAPACITY, len(rows))
+            vectors = np.lib.format.open_memmap(
+                self._file("vectors.npy", generation), mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+            )
+            vectors[:len(rows)] = self.vectors[rows]
+            vectors.flush()
+            del vectors
+            records = [self.row(int(row)) for row in rows]
+            entry = {
+                "op": "add", "start": 0,
+                "pks": [record.pop(self.primary_field) for record in records],
+                "texts": [record.pop(self.text_field) for record in records],
+                "metadatas": records,
+            }
+            with open(self._file("log.jsonl", generation), "w", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            tmp = self.path / "CURRENT.tmp"
+            tmp.write_text(str(generation))
+            os.replace(tmp, self.path / "CURRENT")
+            old = self.generation
+            self.vectors = None
+            self._reset()
+            self._load()
+            self._file("vectors.npy", old).unlink(missing_ok=True)
+            self._file("log.jsonl", old).unlink(missing_ok=True)
+
+    def fields(self) -> List[str]:
+        if self.dim is None:
+            return []
+        return [self.primary_field, self.text_field, self.vector_field] + [
+            name for name in self.columns if name != self.primary_field
+        ]
+
+
+_registry_lock = threading.Lock()
+_collections: Dict[Path, NumpyCollection] = {}
+
+
+def open_collection(path: Path) -> NumpyCollection:
+    """The shared in-memory instance of the collection stored at `path`"""
+    path = path.resolve()
+    with _registry_lock:
+        if path not in _collections:
+            _collections[path] = NumpyCollection(path)
+        return _collections[path]
+
+
+def drop_collection(path: Path):
+    path = path.resolve()
+    with _registry_lock:
+        collection = _collections.pop(path, None)
+    if collection is not None:
+        with collection.lock:
+            collection.vectors = None
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# ============================================================================
+# MILVUS-COMPATIBLE INTERFACE
+# ============================================================================
+
+class _QueryIterator:
+    def __init__(self, rows: List[dict], batch_size: int):
+        self.rows = rows
+        self.batch_size = batch_size
+        self.position = 0
+
+    def next(self) -> List[dict]:
+        batch = self.rows[self.position:self.position + self.batch_size]
+        self.position += len(batch)
+        return batch
+
+    def close(self):
+        self.rows = []
+
+
+class NumpyClient:
+    """The `MilvusClient` calls used in this package, served from NUMPY_STORE_DIR"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or NUMPY_STORE_DIR)
+
+    def _collection(self, name: str) -> NumpyCollection:
+        collection = open_collection(self.root / name)
+        if not collection.exists:
+            raise ValueError(f"Collection {name} does not exist")
+        return collection
+
+    def has_collection(self, collection_name: str, **kwargs) -> bool:
+        return (self.root / collection_name / "CURRENT").exists()
+
+    def list_collections(self, **kwargs) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(path.parent.name for path in self.root.glob("*/CURRENT"))
+
+    def drop_collection(self, collection_name: str, **kwargs):
+        drop_collection(self.root / collection_name)
+
+    def describe_collection(self, collection_name: str, **kwargs) -> dict:
+        collection = self._collection(collection_name)
+        return {
+            "collection_name": collection_name,
+            "fields": [
+                {"name": name, "params": {"dim": collection.dim} if name == collection.vector_field else {}}
+                for name in collection.fields()
+            ],
+        }
+
+    def query(
+        self,
+        collection_name: str,
+        filter: str = "",
+        output_fields: Optional[List[str]] = None,
+        ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> List[dict]:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            if ids is not None:
+                filter = f"{collection.primary_field} in {json.dumps(list(ids), ensure_ascii=False)}"
+            mask = collection.mask(filter)
+            if output_fields == ["count(*)"]:
+                return [{"count(*)": int(mask.sum())}]
+            rows = np.flatnonzero(mask)[:limit]
+            return [collection.row(int(row), output_fields) for row in rows]
+
+    def query_iterator(
+        self,
+        collection_name: str,
+        batch_size: int = 1000,
+        filter: str = "",
+        output_fields: Optional[List[str]] = None,
+        **kwargs,
+    ) -> _QueryIterator:
+        return _QueryIterator(self.query(collection_name, filter, output_fields), batch_size)
+
+    def upsert(self, collection_name: str, data: List[dict], **kwargs) -> dict:
+        collection = open_collection(self.root / collection_name)
+        pk, text, vector = collection.primary_field, collection.text_field, collection.vector_field
+        metadatas = [{key: value for key, value in row.items() if key not in (pk, text, vector)} for row in data]
+        collection.add(
+            [row[pk] for row in data], [row.get(text, "") for row in data], [row[vector] for row in data], metadatas
+        )
+        return {"upsert_count": len(data)}
+
+    insert = upsert
+
+    def delete(self, collection_name: str, ids: Optional[List[str]] = None, filter: Optional[str] = None, **kwargs) -> dict:
+        if not self.has_collection(collection_name):
+            return {"delete_count": 0}
+        return {"delete_count": self._collection(collection_name).delete(filter, ids)}
+
+    def compact(self, collection_name: str, **kwargs) -> int:
+        """Compacts synchronously; returns a job id for parity with Milvus"""
+        self._collection(collection_name).compact()
+        return 0
+
+    def list_indexes(self, collection_name: str, **kwargs) -> List[str]:
+        # every field is filtered through its columnar array; there is nothing to build
+        return self._collection(collection_name).fields()
+
+    def search(
+        self,
+        collection_name: str,
+        data: List[List[float]],
+        filter: str = "",
+        limit: int = 10,
+        output_fields: Optional[List[str]] = None,
+        **kwargs,
+    ) -> List[List[dict]]:
+        collection = self._collection(collection_name)
+        results = []
+        for vector in data:
+            hits = collection.search(vector, limit, filter)
+            results.append([
+                {"id": collection.columns[collection.primary_field].get(row), "distance": distance,
+                 "entity": collection.row(row, output_fields)}
+                for row, distance in hits
+            ])
+        return results
+
+
+class NumpyVectorStore(VectorStore):
+    """LangChain vector store with the `langchain_milvus.Milvus` surface used in this package"""
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        collection_name: str,
+        drop_old: bool = False,
+        root: Optional[str] = None,
+    ):
+        self.embedding_func = embedding_function
+        self.collection_name = collection_name
+        self.client = NumpyClient(root)
+        if drop_old:
+            self.client.drop_collection(collection_name)
+        self._primary_field = self.collection.primary_field
+        self._text_field = self.collection.text_field
+        self._vector_field = self.collection.vector_field
+
+    @property
+    def collection(self) -> NumpyCollection:
+        # looked up on each use, so a store outlives a drop and re-create of its collection
+        return open_collection(self.client.root / self.collection_name)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_func
+
+    @property
+    def col(self) -> Optional[NumpyCollection]:
+        """None until the first insert creates the collection, as with Milvus"""
+        return self.collection if self.collection.exists else None
+
+    @property
+    def fields(self) -> List[str]:
+        return self.collection.fields()
+
+    def _prepare_insert_list(
+        self,
+        texts: List[str],
+        embeddings: List[List[List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        force_ids: bool = False,
+    ) -> List[dict]:
+        return [
+            {self._primary_field: pk, self._text_field: text, self._vector_field: vector, **(metadata or {})}
+            for pk, text, vector, metadata in zip(ids, texts, embeddings[0], metadatas or [{}] * len(texts))
+        ]
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        timeout: Optional[float] = None,
+        batch_size: int = 1000,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        for i in range(0, len(texts), batch_size):
+            self.collection.add(
+                ids[i:i + batch_size], texts[i:i + batch_size], embeddings[i:i + batch_size], metadatas[i:i + batch_size]
+            )
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        timeout: Optional[float] = None,
+        batch_size: int = 1000,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding_func.embed_documents(texts)
+        return self.add_embeddings(texts, vectors, metadatas, batch_size=batch_size, ids=ids)
+
+    def get_pks(self, expr: str, **kwargs: Any) -> Optional[List[str]]:
+        if self.col is None:
+            return None
+        return [row[self._primary_field] for row in self.client.query(self.collection_name, expr, [self._primary_field])]
+
+    def delete(self, ids: Optional[List[str]] = None, expr: Optional[str] = None, **kwargs: Any) -> Optional[bool]:
+        if self.col is None:
+            return False
+        return self.collection.delete(expr, ids) > 0
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        results = []
+        for row, distance in self.collection.search(embedding, k, expr):
+            data = self.collection.row(row)
+            results.append((Document(page_content=data.pop(self._text_field), metadata=data), distance))
+        return results
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_func.embed_query(query), k, expr)
+
+    def similarity_search(self, query: str, k: int = 4, expr: Optional[str] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, expr)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, expr)]
+
+    def _select_relevance_score_fn(self):
+        # same mapping as langchain_milvus for L2 on unit vectors (squared distance in [0, 4])
+        return lambda distance: 1 - distance / 4.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        collection_name: str = "LangChainCollection",
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding, collection_name, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
@@ -0,0 +1,139 @@
+"""
+Embedding truncation and reduced-precision vector storage.
+
+text-embedding-3 models are trained Matryoshka-style: the first `d`
+components of a vector, renormalised, are a usable `d`-dimensional
+embedding (what the API returns for `dimensions=d`). `truncate` does the
+same to vectors that are already stored.
+
+`QuantizedVectors` keeps a compact copy of a matrix of unit vectors for the
+candidate search:
+
+- float16: half precision, 2 bytes per component
+- int8: per-dimension symmetric scalar quantization, 1 byte per component
+- binary: sign bits, 1 bit per component, scored by Hamming distance
+
+The top `k * rescore` candidates are then rescored with the full-precision
+vectors, which may stay on disk (e.g. a `np.load(..., mmap_mode="r")`
+matrix), so RAM holds only the compact copy. The NumPy backend searches this
+way when NUMPY_VECTOR_PRECISION is set (see numpy_store.py).
+"""
+
+import os
+from typing import Literal, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+
+find_dotenv()
+load_dotenv()
+
+# Candidates per requested result that are rescored at full precision (0 disables rescoring)
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+# Rows upcast to float32 at a time when scoring float16/int8 codes (stays in cache)
+SCORE_BLOCK_ROWS = 2048
+
+Precision = Literal["float32", "float16", "int8", "binary"]
+PRECISIONS = ("float32", "float16", "int8", "binary")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """First `dim` components of each vector, renormalised to unit length"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dim > vectors.shape[-1]:
+        raise ValueError(f"Cannot truncate {vectors.shape[-1]}-dimensional vectors to {dim}")
+    return normalize(vectors[..., :dim])
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class QuantizedVectors:
+    """Compact copy of unit vectors for inner-product search with full-precision rescoring"""
+
+    def __init__(self, vectors: np.ndarray, precision: Precision = "float32", rescore: int = RESCORE_FACTOR):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision}; expected one of {PRECISIONS}")
+        self.precision = precision
+        self.rescore = rescore
+        self.full = vectors  # left as given: may be a memmap
+        self.dim = vectors.shape[1]
+        self.scale: Optional[np.ndarray] = None
+        data = np.asarray(vectors, dtype=np.float32)
+        if precision == "int8":
+            self.scale = np.maximum(np.abs(data).max(axis=0), 1e-12) / 127
+        self.codes = self._encode(data)
+
+    def _encode(self, data: np.ndarray) -> np.ndarray:
+        if self.precision == "float32":
+            return data
+        if self.precision == "float16":
+            return data.astype(np.float16)
+        if self.precision == "int8":
+            return np.clip(np.rint(data / self.scale), -127, 127).astype(np.int8)
+        return np.packbits(data > 0, axis=1)
+
+    def extend(self, vectors: np.ndarray, full: np.ndarray):
+        """Append rows (int8 keeps its scale); `full` is the full-precision matrix now covering them"""
+        data = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self.codes = np.concatenate([self.codes, self._encode(data)])
+        self.full = full
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the compact copy searched for candidates"""
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Inner product (or negated Hamming distance for binary) against every stored vector"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.precision == "float32":
+            return self.codes @ query
+        if self.precision in ("float16", "int8"):
+            if self.scale is not None:
+                query = query * self.scale
+            # numpy has no fast float16/int8 matmul: upcast a block at a time
+            return np.concatenate([
+                self.codes[i:i + SCORE_BLOCK_ROWS].astype(np.float32) @ query
+                for i in range(0, len(self.codes), SCORE_BLOCK_ROWS)
+            ]) if len(self.codes) else np.empty(0, dtype=np.float32)
+        bits = np.packbits(query > 0)
+        return -np.bitwise_count(self.codes ^ bits).sum(axis=1, dtype=np.int32)
+
+    def search(
+        self, query: np.ndarray, k: int, rescore: Optional[int] = None, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, full-precision inner products) of the `k` nearest vectors, best first.
+
+        A boolean `mask` (e.g. a metadata filter) restricts the search to its rows.
+        """
+        rescore = self.rescore if rescore is None else rescore
+        query = np.asarray(query, dtype=np.float32)
+        scores = self.approximate_scores(query)
+        rows = np.flatnonzero(mask) if mask is not None else None
+        if rows is not None:
+            scores = scores[rows]
+        if self.precision == "float32":
+            top = _top_k(scores, k)
+            top_scores = scores[top]
+        else:
+            # without rescoring the approximate order is kept; only the returned scores are exact
+            candidates = _top_k(scores, k * rescore if rescore else k)
+            full_rows = candidates if rows is None else rows[candidates]
+            exact = np.asarray(self.full[full_rows], dtype=np.float32) @ query
+            best = _top_k(exact, k) if rescore else np.arange(len(candidates))
+            top, top_scores = candidates[best], exact[best]
+        return (top if rows is None else rows[top]), top_scores
@@ -0,0 +1,93 @@
+"""
+Append-only store of per-query evaluation results.
+
+Every evaluated (query, rag type, config) is appended to a JSONL file as
+soon as it completes, under a key hashed from the query id and the
+evaluation config. A run skips the keys already stored, so an interrupted
+run resumes where it stopped and unchanged pairs are reused by later runs;
+any config change (collection version, model, mode, ...) changes the key.
+The last line of a key wins, and a line torn by a crash is ignored.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+
+find_dotenv()
+load_dotenv()
+
+EVAL_RESULT_STORE = os.getenv("EVAL_RESULT_STORE", "./data/eval_results.jsonl")
+
+_lock = threading.Lock()
+_stores: Dict[str, "ResultStore"] = {}
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def result_key(query_id: str, config: dict) -> str:
+    payload = json.dumps({"query_id": query_id, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """key -> (result record, relevance matrix) lines in an append-only JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.results: Dict[str, Tuple[dict, np.ndarray]] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write of an interrupted run
+                    relevance = np.array(entry["relevance"], dtype=bool).reshape(entry["shape"])
+                    self.results[entry["key"]] = (entry["record"], relevance)
+            # end a torn last line so the next append starts on its own line
+            with open(self.path, "rb+") as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.results
+
+    def get(self, key: str) -> Optional[Tuple[dict, np.ndarray]]:
+        with self.lock:
+            return self.results.get(key)
+
+    def put(self, key: str, record: dict, relevance: np.ndarray):
+        line = json.dumps({
+            "key": key,
+            "record": record,
+            "shape": list(relevance.shape),
+            "relevance": relevance.ravel().astype(int).tolist(),
+        }, ensure_ascii=False, default=_plain)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+            self.results[key] = (record, relevance)
+
+
+def get_result_store(path: Optional[str] = None) -> ResultStore:
+    """Shared store for `path` (default EVAL_RESULT_STORE)"""
+    path = str(path or EVAL_RESULT_STORE)
+    with _lock:
+        if path not in _stores:
+            _stores[path] = ResultStore(path)
+        return _stores[path]
@@ -3,13 +3,29 @@ from langchain_community.retrievers import BM25Retriever
 from langchain_openai import ChatOpenAI
 from langchain_milvus import Milvus
 from dotenv import load_dotenv, find_dotenv
-from typing import List
-from .index import MetaData
+from typing import Dict, List, Optional, Tuple
+from time import perf_counter
+import os
+import json
+import numpy as np
+from .index import MetaData, HIERARCHY_LEVELS, HIERARCHY_PATH_FIELD, hierarchy_path
+from .codec import MetadataCodec, get_codec
+from .textstore import get_text_store
+from .gencache import GenerationCache
 find_dotenv()
 load_dotenv()
 
 model = ChatOpenAI(model="gpt-5-nano")
 
+# Rerank the retrieved top-k with BM25
+RERANK = os.getenv("RETRIEVAL_RERANK", "false").lower() in ("1", "true", "yes")
+
+
+def _elapsed(timings: Optional[Dict[str, float]], stage: str, start: float):
+    """Record the ms since `start` for `stage` when the caller collects timings"""
+    if timings is not None:
+        timings[stage] = (perf_counter() - start) * 1000
+
 
 def reranker(query: str, docs: List[Document]) -> List[Document]:
     """Rerank documents using BM25Retriever"""
@@ -22,47 +38,167 @@ def reranker(query: str, docs: List[Document]) -> List[Document]:
     return docs
 
 
+def _path_filter(filter_data: MetaData, codec: Optional[MetadataCodec] = None) -> Optional[str]:
+    """Single prefix predicate for the requested hierarchy levels, if they form a prefix"""
+    labels = [getattr(filter_data, level) for level in HIERARCHY_LEVELS]
+    depth = next((i for i, label in enumerate(labels) if not label), len(labels))
+    if depth == 0 or any(labels[depth:]):
+        return None  # a gap (e.g. topic without section) needs the per-level predicates
+    if codec is not None:
+        # dictionary-encoded collection: the stored path joins the level codes
+        labels = [str(codec.code(level, label)) for level, label in zip(HIERARCHY_LEVELS, labels[:depth])]
+    # LIKE wildcards, quotes and the separator inside a label cannot be expressed as a prefix
+    elif any(ch in label for label in labels[:depth] for ch in '/%_"\\'):
+        return None
+    return f'{HIERARCHY_PATH_FIELD} like "{"/".join(labels[:depth])}/%"'
+
+
+def _filter_expr(filter_data: MetaData, vectorstore: Milvus) -> Optional[str]:
+    codec = get_codec(vectorstore.collection_name)
+    fields = getattr(vectorstore, "fields", None)
+    path_filter = _path_filter(filter_data, codec) if isinstance(fields, list) and HIERARCHY_PATH_FIELD in fields else None
+    filters = []
+    for field in ("language", "doc_type") + (() if path_filter else HIERARCHY_LEVELS):
+        value = getattr(filter_data, field)
+        if not value:
+            continue
+        if codec is not None:
+            # dictionary-encoded collection: compare integer codes
+            filters.append(f"{field} == {codec.code(field, value)}")
+        else:
+            filters.append(f'{field} == "{value}"')
+    if path_filter:
+        filters.append(path_filter)
+
+    return " and ".join(filters) if filters else None
+
+
+def _hydrate(results: List[Tuple[Document, float]], vectorstore: Milvus) -> List[Document]:
+    """Decode, fill in slim-collection text and attach the similarity score of every result"""
+    codec = get_codec(vectorstore.collection_name)
+    text_store = get_text_store(vectorstore.collection_name)
+    pk_field = vectorstore._primary_field
+    # slim collection: only the ranked top-k is read from the chunk-text store
+    records = text_store.get(doc.metadata.get(pk_field) for doc, _ in results) if text_store else {}
+    docs = []
+    for doc, score in results:
+        if codec is not None:
+            doc.metadata = codec.decode(doc.metadata)
+            if HIERARCHY_PATH_FIELD in doc.metadata:
+                doc.metadata[HIERARCHY_PATH_FIELD] = hierarchy_path(doc.metadata)
+        record = records.get(doc.metadata.get(pk_field))
+        if record is not None:
+            doc.page_content = record["text"]
+            doc.metadata.update(record["metadata"])
+        doc.metadata["similarity_score"] = score
+        docs.append(doc)
+    return docs
+
+
 def retrieval(
-    query: str, filter_data: MetaData, vectorstore: Milvus
+    query: str,
+    filter_data: MetaData,
+    vectorstore: Milvus,
+    query_vector: Optional[List[float]] = None,
+    timings: Optional[Dict[str, float]] = None,
 ) -> List[tuple[Document, float]]:
-    """Retrieve relevant documents from the vector store based on the query and filters."""
+    """Retrieve relevant documents from the vector store based on the query and filters.
+
+    A caller that already embedded the query passes `query_vector`, and the
+    store is searched by it instead of embedding the query again. A
+    `timings` dict receives the ms spent in vector_search, hydrate and rerank.
+    """
     print(
         f"RETRIEVAL query: {query[:40]}, for {vectorstore.collection_name} collection, with filters: {filter_data}"
     )
 
-    filters = [f'language == "{filter_data.language}"']
-    if filter_data.doc_type:
-        filters.append(f'doc_type == "{filter_data.doc_type}"')
-    if filter_data.domain:
-        filters.append(f'domain == "{filter_data.domain}"')
-    if filter_data.section:
-        filters.append(f'section == "{filter_data.section}"')
-    if filter_data.topic:
-        filters.append(f'topic == "{filter_data.topic}"')
-
-    expr = " and ".join(filters) if filters else None
+    expr = _filter_expr(filter_data, vectorstore)
+    start = perf_counter()
     try:
-        results = vectorstore.similarity_search_with_relevance_scores(
-            query, k=5, expr=expr
-        )
+        if query_vector is None:
+            results = vectorstore.similarity_search_with_relevance_scores(
+                query, k=5, expr=expr
+            )
+        else:
+            relevance = vectorstore._select_relevance_score_fn()
+            results = [
+                (doc, relevance(distance))
+                for doc, distance in vectorstore.similarity_search_with_score_by_vector(
+                    list(query_vector), k=5, expr=expr
+                )
+            ]
     except ValueError as e:
         print(f"Error in retrieval: {str(e)}")
         return []
-    docs = []
-    for doc, score in results:
-        doc.metadata["similarity_score"] = score
-        docs.append(doc)
-    # docs = reranker(query, docs)
+    _elapsed(timings, "vector_search", start)
+    start = perf_counter()
+    docs = _hydrate(results, vectorstore)
+    _elapsed(timings, "hydrate", start)
+    if RERANK:
+        start = perf_counter()
+        docs = reranker(query, docs)
+        _elapsed(timings, "rerank", start)
     print("RETRIEVED DOCS: ", len(docs))
     return docs
 
 
-def generate(query: str, ctx_docs: List[Document]) -> str:
-    """Generate answer using the language model based on the query and context documents."""
+def stored_vectors_of(docs: List[Document], vectorstore: Milvus) -> np.ndarray:
+    """Stored embeddings of retrieved documents, one row per document, looked up by primary key.
+
+    Documents whose vector cannot be read back (e.g. no primary key in their
+    metadata) are embedded again.
+    """
+    if not docs:
+        return np.empty((0, 0), dtype=np.float32)
+    pk_field, vector_field = vectorstore._primary_field, vectorstore._vector_field
+    pks = [doc.metadata.get(pk_field) for doc in docs]
+    known = [pk for pk in pks if pk is not None]
+    rows = vectorstore.client.query(
+        vectorstore.collection_name,
+        filter=f"{pk_field} in {json.dumps(known, ensure_ascii=False)}",
+        output_fields=[pk_field, vector_field],
+    ) if known else []
+    lookup = {row[pk_field]: row[vector_field] for row in rows}
+    vectors = [lookup.get(pk) for pk in pks]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        embedded = vectorstore.embeddings.embed_documents([docs[i].page_content for i in missing])
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def build_prompt(query: str, ctx_docs: List[Document]) -> str:
     context = "\n".join([doc.page_content for doc in ctx_docs])
-    prompt = f"""Answer shortly to the user question according to the given context. Only answer if the context is given to you.
+    return f"""Answer shortly to the user question according to the given context. Only answer if the context is given to you.
     question: {query}
     context: {context}
 """
+
+
+def generate(
+    query: str,
+    ctx_docs: List[Document],
+    cache: Optional[GenerationCache] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> str:
+    """Generate answer using the language model based on the query and context documents.
+
+    With a `cache`, an answer already generated by the same model for the
+    same prompt is returned without calling the model. A `timings` dict
+    receives the ms spent in context (prompt building) and llm.
+    """
+    start = perf_counter()
+    prompt = build_prompt(query, ctx_docs)
+    _elapsed(timings, "context", start)
+    start = perf_counter()
+    if cache is not None:
+        answer = cache.get(model.model_name, prompt)
+        if answer is not None:
+            _elapsed(timings, "llm", start)
+            return answer
     output = model.invoke(prompt)
+    if cache is not None:
+        cache.put(model.model_name, prompt, output.content)
+    _elapsed(timings, "llm", start)
     return output.content
@@ -0,0 +1,223 @@
+"""
+Collection snapshots for moving an index between environments.
+
+A snapshot is a directory with:
+
+- `chunks.parquet`: primary key, text and every metadata field, one row per chunk.
+  Columns are typed from the collection schema; JSON/array fields are stored
+  as JSON text, and metadata outside the schema (dynamic fields, a slim
+  collection's stored metadata) as one JSON object per row in `$meta`
+- `vectors.npy`: float32 matrix aligned with the Parquet rows (loadable with mmap)
+- `manifest.json`: source collection, row count, dimension, field list and
+  metadata dictionary (for dictionary-encoded collections)
+
+Export streams the collection with a query iterator; import loads the
+vectors straight into Milvus, so no chunk is embedded again. Chunks of a slim
+collection are exported with their text from the chunk-text store, and are
+moved back into a text store on import.
+
+    python -m src.core.snapshot export hospital snapshots/hospital
+    python -m src.core.snapshot import snapshots/hospital hospital
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain_core.embeddings import Embeddings
+from pymilvus import DataType
+from dotenv import load_dotenv, find_dotenv
+
+from .index import get_vectorstore, rebuild_collection, index_hierarchy_path, HIERARCHY_PATH_FIELD
+from .codec import MetadataCodec, get_codec, register_codec
+from .textstore import get_text_store, create_text_store, stash
+
+find_dotenv()
+load_dotenv()
+
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "2000"))
+SNAPSHOT_FORMAT_VERSION = 1
+# Column holding the metadata that has no field in the collection schema
+EXTRA_COLUMN = "$meta"
+
+ARROW_TYPES = {
+    DataType.BOOL: pa.bool_(),
+    DataType.INT8: pa.int8(),
+    DataType.INT16: pa.int16(),
+    DataType.INT32: pa.int32(),
+    DataType.INT64: pa.int64(),
+    DataType.FLOAT: pa.float32(),
+    DataType.DOUBLE: pa.float64(),
+    DataType.STRING: pa.string(),
+    DataType.VARCHAR: pa.string(),
+}
+
+
+def _arrow_schema(fields: List[dict], vector_field: str) -> Tuple[pa.Schema, List[str]]:
+    """Parquet schema for the collection's scalar fields, and the fields stored as JSON text.
+
+    Declared up front rather than inferred from the first batch, where a
+    column that happens to be all null would be typed `null`.
+    """
+    columns, json_fields = [], []
+    for field in fields:
+        if field["name"] == vector_field or field.get("is_dynamic"):
+            continue
+        if field["type"] not in ARROW_TYPES:
+            json_fields.append(field["name"])
+        columns.append(pa.field(field["name"], ARROW_TYPES.get(field["type"], pa.string())))
+    columns.append(pa.field(EXTRA_COLUMN, pa.string()))
+    return pa.schema(columns), json_fields
+
+
+def export_collection(collection_name: str, out_dir: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> dict:
+    """Write a collection's chunks, metadata and vectors to a snapshot directory"""
+    t0 = time.perf_counter()
+    vectorstore = get_vectorstore(collection_name)
+    if vectorstore.col is None:
+        raise ValueError(f"Collection {collection_name} does not exist")
+    client, name = vectorstore.client, vectorstore.collection_name
+    pk_field, text_field, vector_field = vectorstore._primary_field, vectorstore._text_field, vectorstore._vector_field
+
+    fields = client.describe_collection(name)["fields"]
+    dim = next(f["params"]["dim"] for f in fields if f["name"] == vector_field)
+    count = client.query(name, filter="", output_fields=["count(*)"])[0]["count(*)"]
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    vectors = np.lib.format.open_memmap(out / "vectors.npy", mode="w+", dtype=np.float32, shape=(count, dim))
+    text_store = get_text_store(name)
+    schema, json_fields = _arrow_schema(fields, vector_field)
+    known = set(schema.names)
+    extra_fields: Dict[str, None] = {}
+    writer = pq.ParquetWriter(out / "chunks.parquet", schema, compression="zstd")
+    rows_written = 0
+    iterator = client.query_iterator(name, batch_size=batch_size, output_fields=["*"])
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            # rows inserted while exporting are left for the next snapshot
+            rows = rows[:count - rows_written]
+            vectors[rows_written:rows_written + len(rows)] = [row.pop(vector_field) for row in rows]
+            if text_store is not None:
+                records = text_store.get(row[pk_field] for row in rows)
+                for row in rows:
+                    record = records.get(row[pk_field], {"text": "", "metadata": {}})
+                    row.update(record["metadata"], **{text_field: record["text"]})
+            for row in rows:
+                extra = {key: row.pop(key) for key in list(row) if key not in known}
+                extra_fields.update(dict.fromkeys(extra))
+                row[EXTRA_COLUMN] = json.dumps(extra, ensure_ascii=False) if extra else None
+                for field in json_fields:
+                    if row.get(field) is not None:
+                        row[field] = json.dumps(row[field], ensure_ascii=False)
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            rows_written += len(rows)
+            if rows_written >= count:
+                break
+    finally:
+        iterator.close()
+        writer.close()
+    vectors.flush()
+    del vectors
+
+    codec = get_codec(name)
+    columns = [column for column in schema.names if column != EXTRA_COLUMN] + list(extra_fields)
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "count": rows_written,
+        "dim": dim,
+        "primary_field": pk_field,
+        "text_field": text_field,
+        "metadata_fields": [column for column in columns if column not in (pk_field, text_field, vector_field)],
+        "json_fields": json_fields,
+        # codes of a dictionary-encoded collection, exported as stored
+        "dictionary": codec.dictionary if codec else None,
+        "separate_text": text_store is not None,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"exported {rows_written} chunks from {collection_name} to {out} in {time.perf_counter() - t0:.2f}s")
+    return manifest
+
+
+def import_collection(
+    snapshot_dir: str,
+    collection_name: str,
+    embeddings: Optional[Embeddings] = None,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+) -> int:
+    """Load a snapshot into a new version of `collection_name` without re-embedding.
+
+    The import is built beside the live collection and swapped in with
+    `rebuild_collection`, so the index keeps serving while it loads.
+    """
+    t0 = time.perf_counter()
+    snapshot = Path(snapshot_dir)
+    manifest = json.loads((snapshot / "manifest.json").read_text(encoding="utf-8"))
+    if manifest["format_version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest['format_version']}")
+    vectors = np.load(snapshot / "vectors.npy", mmap_mode="r")
+    # rows deleted during export leave unused zero rows at the end of the file
+    if vectors.shape[1] != manifest["dim"] or vectors.shape[0] < manifest["count"]:
+        raise ValueError(f"vectors.npy shape {vectors.shape} does not match the manifest")
+    if not manifest["count"]:
+        # Milvus creates the collection on its first insert: nothing would be left to swap to
+        raise ValueError(f"Snapshot {snapshot} is empty; {collection_name} was left unchanged")
+
+    pk_field, text_field = manifest["primary_field"], manifest["text_field"]
+    start = 0
+    with rebuild_collection(collection_name, embeddings=embeddings) as vectorstore:
+        if manifest.get("dictionary"):
+            register_codec(vectorstore.collection_name, MetadataCodec(manifest["dictionary"]))
+        text_store = create_text_store(vectorstore.collection_name) if manifest.get("separate_text") else None
+        for batch in pq.ParquetFile(snapshot / "chunks.parquet").iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()
+            end = start + len(rows)
+            for row in rows:
+                extra = row.pop(EXTRA_COLUMN, None)
+                for field in manifest.get("json_fields", []):
+                    if row.get(field) is not None:
+                        row[field] = json.loads(row[field])
+                if extra:
+                    row.update(json.loads(extra))
+            ids = [str(row.pop(pk_field)) for row in rows]
+            texts = [row.pop(text_field) for row in rows]
+            # the remaining columns are the metadata fields
+            if text_store is not None:
+                texts, rows = stash(text_store, ids, texts, rows)
+            vectorstore.add_embeddings(texts, vectors[start:end].tolist(), rows, batch_size=batch_size, ids=ids)
+            start = end
+        if HIERARCHY_PATH_FIELD in manifest["metadata_fields"]:
+            index_hierarchy_path(vectorstore)
+    print(f"imported {start} chunks from {snapshot} into {collection_name} in {time.perf_counter() - t0:.2f}s")
+    return start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import collection snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write a collection to a snapshot directory")
+    export_parser.add_argument("collection")
+    export_parser.add_argument("out_dir")
+    import_parser = commands.add_parser("import", help="Load a snapshot into a collection")
+    import_parser.add_argument("snapshot_dir")
+    import_parser.add_argument("collection")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_collection(args.collection, args.out_dir)
+    else:
+        import_collection(args.snapshot_dir, args.collection)
+
+
+if __name__ == "__main__":
+    main()
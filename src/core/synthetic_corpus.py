@@ -0,0 +1,255 @@
+"""
+Synthetic corpora at benchmark scale.
+
+`SYNTHETIC_DOCUMENTS` holds a few dozen hand-written documents per
+collection. A `SyntheticCorpus` expands the hierarchy of one collection
+(hospital, bank, fluid_simulation) to any number of chunks (10k-10M):
+
+- the hand-written domain/section/topic leaves plus generated siblings
+  ("Diagnostics 2", ...) up to `sections` per domain and `topics` per section
+- chunks per leaf following a Zipf law of exponent `skew` (0 is uniform),
+  languages and doc types drawn from the `languages`/`doc_types` mixes
+- text cut from the hand-written documents of the leaf (or of the leaf it
+  was generated from), tagged with a unique reference like "HOS-00001234"
+- vectors clustered by the hierarchy (domain > section > topic > language >
+  document), so filtered and unfiltered search see realistic neighbours
+  without an embedding call
+
+Chunks are generated in seeded batches, so millions of rows stream in
+bounded memory and any batch can be regenerated on its own. Paired queries
+are noisy copies of random chunks, filtered by the chunk's metadata; the
+reference tag is their ground truth, so `EvalQuery` and the eval metrics
+work unchanged.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+from .index import HIERARCHY_LEVELS, hierarchy_path
+from .synthetic_data import SYNTHETIC_DOCUMENTS, EvalQuery
+
+# Documents per generated batch; a batch holds DOCS_PER_BATCH * chunks_per_doc chunks
+DOCS_PER_BATCH = 16384
+# Norm of each level's offset from its parent before normalising; smaller is tighter
+SPREAD = {"section": 0.8, "topic": 0.6, "language": 0.35, "document": 0.15, "chunk": 0.1}
+# Tuned so top-5 recall of the source chunk falls from ~0.96 at 10k chunks to ~0.6 at 1M (unfiltered)
+QUERY_NOISE = 0.35
+SENTENCE = re.compile(r"[^。.!?？！]+[。.!?？！]?")
+QUERY_TEMPLATES = {
+    "en": "What does {ref} say about {topic} in {section}?",
+    "ja": "{section}の{topic}について、{ref}には何と書かれていますか？",
+}
+
+
+def _unit(rng: np.random.Generator, rows: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@dataclass
+class ChunkBatch:
+    """Columns of consecutive chunks; `texts` is None when generated without text"""
+    start: int
+    ids: List[str]
+    texts: Optional[List[str]]
+    vectors: np.ndarray
+    leaf: np.ndarray  # index into SyntheticCorpus.leaves
+    language: np.ndarray
+    doc_type: np.ndarray
+    doc: np.ndarray  # document number
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def metadatas(self, corpus: "SyntheticCorpus") -> List[dict]:
+        """Chunk metadata as ingestion stores it (hierarchy levels, path, language, doc type)"""
+        rows = []
+        for i, chunk_id in enumerate(self.ids):
+            metadata = dict(corpus.leaves[self.leaf[i]])
+            metadata["hierarchy_path"] = corpus.paths[self.leaf[i]]
+            metadata["language"] = corpus.language_labels[self.language[i]]
+            metadata["doc_type"] = corpus.doc_type_labels[self.doc_type[i]]
+            metadata["doc_id"] = f"{corpus.prefix}-doc-{self.doc[i]:08d}"
+            metadata["chunk_id"] = chunk_id
+            rows.append(metadata)
+        return rows
+
+
+class SyntheticCorpus:
+    """`chunks` synthetic chunks of one collection's hierarchy, generated batch by batch"""
+
+    def __init__(
+        self,
+        collection: str,
+        chunks: int,
+        sections: int = 4,
+        topics: int = 4,
+        skew: float = 1.0,
+        languages: Optional[Dict[str, float]] = None,
+        doc_types: Optional[Dict[str, float]] = None,
+        chunks_per_doc: int = 4,
+        dim: int = 64,
+        seed: int = 0,
+    ):
+        if collection not in SYNTHETIC_DOCUMENTS:
+            raise ValueError(f"Unknown collection {collection}, expected one of {list(SYNTHETIC_DOCUMENTS)}")
+        self.collection = collection
+        self.chunks = chunks
+        self.chunks_per_doc = chunks_per_doc
+        self.dim = dim
+        self.seed = seed
+        self.prefix = collection[:3].upper()
+        languages = languages or {"en": 0.5, "ja": 0.5}
+        doc_types = doc_types or {"policy": 0.4, "manual": 0.4, "faq": 0.2}
+        self.language_labels, self.language_p = list(languages), self._normalise(languages.values())
+        self.doc_type_labels, self.doc_type_p = list(doc_types), self._normalise(doc_types.values())
+
+        self.leaves, sources = self._expand(sections, topics)
+        self.paths = [hierarchy_path(leaf) for leaf in self.leaves]
+        # hand-written leaves come first, so they are the most common under skew
+        ranks = np.arange(1, len(self.leaves) + 1, dtype=np.float64)
+        self.leaf_p = self._normalise(ranks ** -skew)
+        self.sentences = self._sentences(sources)
+        self.centers = self._centers()
+
+    @staticmethod
+    def _normalise(weights) -> np.ndarray:
+        weights = np.asarray(list(weights), dtype=np.float64)
+        return weights / weights.sum()
+
+    def _expand(self, sections: int, topics: int) -> Tuple[List[dict], List[tuple]]:
+        """Leaves of the expanded hierarchy, and the hand-written leaf each one copies its text from"""
+        tree: Dict[str, Dict[str, List[str]]] = {}
+        for doc in SYNTHETIC_DOCUMENTS[self.collection]:
+            domain, section, topic = (doc["metadata"][level] for level in HIERARCHY_LEVELS)
+            topics_of = tree.setdefault(domain, {}).setdefault(section, [])
+            if topic not in topics_of:
+                topics_of.append(topic)
+
+        leaves, sources = [], []
+        for domain, section_tree in tree.items():
+            seed_sections = list(section_tree)
+            for s in range(max(sections, len(seed_sections))):
+                seed_section = seed_sections[s % len(seed_sections)]
+                section = seed_section if s < len(seed_sections) else f"{seed_section} {s // len(seed_sections) + 1}"
+                seed_topics = section_tree[seed_section]
+                for t in range(max(topics, len(seed_topics))):
+                    seed_topic = seed_topics[t % len(seed_topics)]
+                    topic = seed_topic if t < len(seed_topics) else f"{seed_topic} {t // len(seed_topics) + 1}"
+                    leaves.append({"domain": domain, "section": section, "topic": topic})
+                    sources.append((domain, seed_section, seed_topic))
+        return leaves, sources
+
+    def _sentences(self, sources: List[tuple]) -> Dict[Tuple[int, int], List[str]]:
+        """(leaf, language) -> sentences of the hand-written documents of its source leaf"""
+        by_source: Dict[tuple, List[str]] = {}
+        for doc in SYNTHETIC_DOCUMENTS[self.collection]:
+            metadata = doc["metadata"]
+            key = tuple(metadata[level] for level in HIERARCHY_LEVELS) + (metadata["language"],)
+            sentences = [s.strip() for s in SENTENCE.findall(doc["content"]) if s.strip()]
+            by_source.setdefault(key, []).extend(sentences)
+        fallback = {}
+        for key, sentences in by_source.items():
+            fallback.setdefault(key[-1], []).extend(sentences)
+        any_language = [s for sentences in by_source.values() for s in sentences]
+
+        sentences = {}
+        for leaf, source in enumerate(sources):
+            for code, language in enumerate(self.language_labels):
+                sentences[leaf, code] = by_source.get(source + (language,)) or fallback.get(language) or any_language
+        return sentences
+
+    def _centers(self) -> np.ndarray:
+        """(leaf, language) centroids: each level is a normalised offset from its parent"""
+        rng = np.random.default_rng([self.seed, 0])
+        offsets: Dict[tuple, np.ndarray] = {}
+
+        def center(key: tuple, parent: Optional[np.ndarray], spread: float) -> np.ndarray:
+            if key not in offsets:
+                offset = _unit(rng, 1, self.dim)[0]
+                vector = offset if parent is None else parent + spread * offset
+                offsets[key] = vector / np.linalg.norm(vector)
+            return offsets[key]
+
+        centers = np.empty((len(self.leaves), len(self.language_labels), self.dim), dtype=np.float32)
+        for i, leaf in enumerate(self.leaves):
+            domain = center((leaf["domain"],), None, 0.0)
+            section = center((leaf["domain"], leaf["section"]), domain, SPREAD["section"])
+            topic = center((leaf["domain"], leaf["section"], leaf["topic"]), section, SPREAD["topic"])
+            for code, language in enumerate(self.language_labels):
+                centers[i, code] = center((i, language), topic, SPREAD["language"])
+        return centers
+
+    @property
+    def batches_count(self) -> int:
+        per_batch = DOCS_PER_BATCH * self.chunks_per_doc
+        return -(-self.chunks // per_batch)
+
+    def batch(self, number: int, with_text: bool = True) -> ChunkBatch:
+        """Batch `number` of the corpus; the same for a given seed however it is reached"""
+        per_batch = DOCS_PER_BATCH * self.chunks_per_doc
+        start = number * per_batch
+        rows = min(per_batch, self.chunks - start)
+        if rows <= 0:
+            raise IndexError(f"Batch {number} is past the end of the corpus")
+        rng = np.random.default_rng([self.seed, 1, number])
+        docs = -(-rows // self.chunks_per_doc)
+
+        doc_leaf = rng.choice(len(self.leaves), size=docs, p=self.leaf_p)
+        doc_language = rng.choice(len(self.language_labels), size=docs, p=self.language_p)
+        doc_type = rng.choice(len(self.doc_type_labels), size=docs, p=self.doc_type_p)
+        doc_vectors = self.centers[doc_leaf, doc_language] + SPREAD["document"] * _unit(rng, docs, self.dim)
+
+        owner = np.arange(rows) // self.chunks_per_doc
+        vectors = doc_vectors[owner] + SPREAD["chunk"] * _unit(rng, rows, self.dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"{self.prefix}-{i:08d}" for i in range(start, start + rows)]
+        batch = ChunkBatch(
+            start=start, ids=ids, texts=None, vectors=vectors,
+            leaf=doc_leaf[owner], language=doc_language[owner], doc_type=doc_type[owner],
+            doc=start // self.chunks_per_doc + owner,
+        )
+        if with_text:
+            offsets = rng.integers(0, 1 << 30, size=rows)
+            batch.texts = [self._text(batch, i, offsets[i]) for i in range(rows)]
+        return batch
+
+    def _text(self, batch: ChunkBatch, i: int, offset: int) -> str:
+        sentences = self.sentences[batch.leaf[i], batch.language[i]]
+        start = offset % len(sentences)
+        body = " ".join(sentences[(start + j) % len(sentences)] for j in range(3))
+        leaf = self.leaves[batch.leaf[i]]
+        return f"[{batch.ids[i]}] {leaf['domain']} / {leaf['section']} / {leaf['topic']}: {body}"
+
+    def __iter__(self) -> Iterator[ChunkBatch]:
+        for number in range(self.batches_count):
+            yield self.batch(number)
+
+    def queries(self, count: int, seed: int = 0) -> Tuple[List[EvalQuery], np.ndarray]:
+        """`count` queries, each a noisy copy of a random chunk with that chunk as its answer"""
+        rng = np.random.default_rng([self.seed, 2, seed])
+        picks = np.sort(rng.choice(self.chunks, size=min(count, self.chunks), replace=False))
+        per_batch = DOCS_PER_BATCH * self.chunks_per_doc
+        queries, vectors = [], []
+        for number in np.unique(picks // per_batch):
+            batch = self.batch(int(number), with_text=False)
+            for i in picks[picks // per_batch == number] - batch.start:
+                leaf = self.leaves[batch.leaf[i]]
+                language = self.language_labels[batch.language[i]]
+                queries.append(EvalQuery(
+                    query=QUERY_TEMPLATES.get(language, QUERY_TEMPLATES["en"]).format(ref=batch.ids[i], **leaf),
+                    collection=self.collection,
+                    language=language,
+                    doc_type=self.doc_type_labels[batch.doc_type[i]],
+                    ground_truth_chunks=[batch.ids[i]],
+                    description=f"Synthetic query for chunk {batch.ids[i]}",
+                    **leaf,
+                ))
+                vectors.append(batch.vectors[i])
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        vectors = vectors + QUERY_NOISE * _unit(rng, len(vectors), self.dim)
+        order = rng.permutation(len(queries))
+        vectors = vectors[order] / np.linalg.norm(vectors[order], axis=1, keepdims=True)
+        return [queries[i] for i in order], vectors
@@ -0,0 +1,156 @@
+"""
+Compressed chunk-text store for slim collections.
+
+A slim collection keeps only the primary key, the vector and the fields used
+in filters (INDEX_FIELDS) in Milvus; its text field is left empty. The chunk
+text and the remaining metadata live in a local SQLite file per collection
+(`<CHUNK_TEXT_DIR>/<collection>.sqlite`), one zstd-compressed JSON record per
+chunk_id. Search then moves only vectors and filter fields, and retrieval
+fetches the text of the final top-k by primary key.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import pyarrow as pa
+from dotenv import load_dotenv, find_dotenv
+
+find_dotenv()
+load_dotenv()
+
+CHUNK_TEXT_DIR = os.getenv("CHUNK_TEXT_DIR", "./data/chunk_text")
+# Create collections from now on with their text in the chunk-text store
+SEPARATE_CHUNK_TEXT = os.getenv("SEPARATE_CHUNK_TEXT", "false").lower() in ("1", "true", "yes")
+# Metadata kept in Milvus for filters and document deletes
+INDEX_FIELDS = tuple(
+    os.getenv(
+        "CHUNK_INDEX_FIELDS", "language,domain,section,topic,doc_type,hierarchy_path,doc_id,source_name"
+    ).split(",")
+)
+COMPRESSION_LEVEL = int(os.getenv("CHUNK_TEXT_COMPRESSION_LEVEL", "3"))
+# Max number of ids per `IN (...)` lookup
+LOOKUP_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_stores: Dict[str, "ChunkTextStore"] = {}
+_codec = pa.Codec("zstd", compression_level=COMPRESSION_LEVEL)
+
+
+def _compress(record: dict) -> Tuple[int, bytes]:
+    raw = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    return len(raw), _codec.compress(raw, asbytes=True)
+
+
+def _decompress(size: int, body: bytes) -> dict:
+    return json.loads(_codec.decompress(body, decompressed_size=size, asbytes=True))
+
+
+class ChunkTextStore:
+    """chunk_id -> (text, metadata) records in a zstd-compressed SQLite table"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # shared by ingestion workers and request threads; writes are serialised by the lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, size INTEGER NOT NULL, body BLOB NOT NULL)"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def put(self, chunk_ids: List[str], texts: List[str], metadatas: List[dict]):
+        rows = [
+            (chunk_id, *_compress({"text": text, "metadata": metadata}))
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas)
+        ]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+
+    def get(self, chunk_ids: Iterable[str]) -> Dict[str, dict]:
+        """{"text", "metadata"} record of every stored id among `chunk_ids`"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        records = {}
+        with self.lock:
+            for i in range(0, len(chunk_ids), LOOKUP_BATCH_SIZE):
+                batch = chunk_ids[i:i + LOOKUP_BATCH_SIZE]
+                rows = self.conn.execute(
+                    f"SELECT chunk_id, size, body FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                records.update((chunk_id, _decompress(size, body)) for chunk_id, size, body in rows)
+        return records
+
+    def delete(self, chunk_ids: Iterable[str]) -> int:
+        chunk_ids = list(chunk_ids)
+        deleted = 0
+        with self.lock:
+            for i in range(0, len(chunk_ids), LOOKUP_BATCH_SIZE):
+                batch = chunk_ids[i:i + LOOKUP_BATCH_SIZE]
+                cursor = self.conn.execute(
+                    f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch
+                )
+                deleted += cursor.rowcount
+            self.conn.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        """Row count, raw and compressed bytes"""
+        with self.lock:
+            count, raw, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM chunks"
+            ).fetchone()
+        return {"count": count, "raw_bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def split_metadata(metadata: dict) -> Tuple[dict, dict]:
+    """(fields kept in Milvus, fields moved to the text store)"""
+    indexed = {key: value for key, value in metadata.items() if key in INDEX_FIELDS}
+    stored = {key: value for key, value in metadata.items() if key not in INDEX_FIELDS}
+    return indexed, stored
+
+
+def stash(store: ChunkTextStore, chunk_ids: List[str], texts: List[str], metadatas: List[dict]) -> Tuple[List[str], List[dict]]:
+    """Put text and non-index metadata in `store`; return the slim texts and metadata for Milvus"""
+    parts = [split_metadata(metadata) for metadata in metadatas]
+    store.put(chunk_ids, texts, [stored for _, stored in parts])
+    return [""] * len(texts), [indexed for indexed, _ in parts]
+
+
+def _path(collection_name: str) -> Path:
+    return Path(CHUNK_TEXT_DIR) / f"{collection_name}.sqlite"
+
+
+def get_text_store(collection_name: str) -> Optional[ChunkTextStore]:
+    """The text store of a slim collection, or None for a collection storing its text"""
+    with _lock:
+        if collection_name not in _stores:
+            if not _path(collection_name).exists():
+                return None
+            _stores[collection_name] = ChunkTextStore(str(_path(collection_name)))
+        return _stores[collection_name]
+
+
+def create_text_store(collection_name: str) -> ChunkTextStore:
+    """Mark a collection as slim; call before its first write"""
+    with _lock:
+        if collection_name not in _stores:
+            _stores[collection_name] = ChunkTextStore(str(_path(collection_name)))
+        return _stores[collection_name]
+
+
+def drop_text_store(collection_name: str):
+    with _lock:
+        store = _stores.pop(collection_name, None)
+    if store is not None:
+        store.close()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{_path(collection_name)}{suffix}").unlink(missing_ok=True)
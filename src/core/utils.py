@@ -1,18 +1,86 @@
 import re
+import hashlib
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
 
 
-def mask_pii(text: str) -> str:
-    """Mask Personally Identifiable Information"""
-    # Email addresses
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
-    
-    # Phone numbers
-    text = re.sub(r'\b(?:\d{3}[-.]?\d{4}|\d{3}[-.]?\d{3}[-.]?\d{4})\b', '[PHONE]', text)
-    
+@dataclass(frozen=True)
+class PIIDetector:
+    """A PII pattern, matched from a word boundary and replaced with `[label]`"""
+    label: str
+    pattern: str
+    # Regex character-class body (no brackets) for the first character of a
+    # match; the union over all detectors lets the scanner skip other positions.
+    first_chars: str
+
+
+# Default detectors, tried in order at each position: more specific patterns
+# come first so e.g. a card number is not read as a phone number.
+PII_DETECTORS: List[PIIDetector] = [
+    # Email addresses (possessive local part: '@' is not in the class, so no backtracking)
+    PIIDetector("EMAIL", r'[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', r'A-Za-z0-9._%+\-'),
     # Credit card numbers
-    text = re.sub(r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b', '[CREDIT_CARD]', text)
-    
+    PIIDetector("CREDIT_CARD", r'\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b', r'\d'),
     # Social Security Numbers
-    text = re.sub(r'\b\d{3}-\d{2}-\d{4}\b', '[SSN]', text)
-    
-    return text
+    PIIDetector("SSN", r'\d{3}-\d{2}-\d{4}\b', r'\d'),
+    # Phone numbers
+    PIIDetector("PHONE", r'(?:\d{3}[-.]?\d{4}|\d{3}[-.]?\d{3}[-.]?\d{4})\b', r'\d'),
+]
+
+
+class PIIMasker:
+    """Single-pass PII masker: all detectors compiled into one alternation regex.
+
+    The shared word boundary and first-character guard are hoisted in front of
+    the alternation, so most positions are rejected before any detector runs.
+    """
+
+    def __init__(self, detectors: Optional[List[PIIDetector]] = None):
+        self.detectors = list(PII_DETECTORS if detectors is None else detectors)
+        self._compile()
+
+    def _compile(self):
+        if not self.detectors:
+            self.pattern = None
+            return
+        first_chars = "".join(dict.fromkeys(d.first_chars for d in self.detectors))
+        alternation = "|".join(f"(?P<{d.label}>{d.pattern})" for d in self.detectors)
+        self.pattern = re.compile(rf"\b(?=[{first_chars}])(?:{alternation})")
+
+    def register(self, detector: PIIDetector):
+        """Add a detector (replacing one with the same label); new ones are tried last"""
+        self.detectors = [d for d in self.detectors if d.label != detector.label] + [detector]
+        self._compile()
+
+    def mask(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda m: f"[{m.lastgroup}]", text)
+
+
+_default_masker = PIIMasker()
+
+
+def register_pii_detector(detector: PIIDetector):
+    """Register an extra detector used by `mask_pii`"""
+    _default_masker.register(detector)
+
+
+def mask_pii(text: str) -> str:
+    """Mask Personally Identifiable Information"""
+    return _default_masker.mask(text)
+
+
+def content_hash(*parts: str | bytes) -> str:
+    """Deterministic uuid-formatted id derived from the sha256 of the given parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+        digest.update(b"\x1f")  # separator so ("ab", "c") != ("a", "bc")
+    return str(uuid.UUID(bytes=digest.digest()[:16]))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 UTF-8 bytes per token, so ~1 token per Japanese char)"""
+    return max(1, len(text.encode("utf-8")) // 4)
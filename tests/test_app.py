@@ -24,15 +24,12 @@ class TestAPIBehaviors:
         
         assert "Please select an index" in result
     
-    @patch('src.app.load_documents')
-    @patch('src.app.get_chunks')
-    @patch('src.app.ingest_documents')
-    def test_process_files_success(self, mock_ingest, mock_get_chunks, mock_load_documents):
-        """Test successful file processing"""
+    @patch('src.app.job_manager')
+    def test_process_files_success(self, mock_manager):
+        """Test that file processing is queued as a background job"""
         from src.app import ingest_files
-        mock_load_documents.return_value = [Document(page_content="Test content", metadata={})]
-        mock_get_chunks.return_value = [Document(page_content="chunk", metadata={})]
-        mock_ingest.return_value = "Successfully ingested 5 documents"
+        from src.core.jobs import IngestJob
+        mock_manager.submit.return_value = IngestJob("job123", "hospital", ["file.pdf"], {})
         
         result = ingest_files(
             ["file.pdf"],
@@ -44,9 +41,30 @@ class TestAPIBehaviors:
             "policy"
         )
         
-        assert result['status'] == 'success'
-        assert 'Successfully ingested' in result['message']
+        assert result['status'] == 'queued'
+        assert result['job_id'] == 'job123'
+        submitted = mock_manager.submit.call_args[0]
+        assert submitted[1] == "hospital"
+        assert submitted[2].domain == "Healthcare"
+
+    @patch('src.app.job_manager')
+    def test_ingestion_status_unknown_job(self, mock_manager):
+        """Test status lookup for a job id that does not exist"""
+        from src.app import get_ingestion_status
+        mock_manager.status.return_value = None
+
+        result = get_ingestion_status("missing")
+
+        assert result['status'] == 'error'
     
+    def test_delete_documents_requires_selector(self):
+        """Test that deleting needs a doc_id or source name"""
+        from src.app import delete_documents_from_index
+
+        result = delete_documents_from_index("hospital", "", " , ")
+
+        assert result['status'] == 'error'
+
     @patch('src.app.retrieval')
     @patch('src.app.generate')
     def test_run_rag_comparison_success(self, mock_gen, mock_ret):
@@ -0,0 +1,102 @@
+import pytest
+
+from src.core.chunking import Chunker
+from src.core.synthetic_data import SYNTHETIC_DOCUMENTS
+from langchain_core.documents import Document
+
+
+@pytest.fixture
+def english_text():
+    return " ".join(doc["content"] for doc in SYNTHETIC_DOCUMENTS["bank"] if doc["metadata"]["language"] == "en")
+
+
+@pytest.fixture
+def japanese_text():
+    return "".join(doc["content"] for doc in SYNTHETIC_DOCUMENTS["hospital"] if doc["metadata"]["language"] == "ja")
+
+
+# ============================================================================
+# CHUNKER TESTS
+# ============================================================================
+
+class TestChunker:
+    """Tests for the linear-time offset-tracking chunker"""
+
+    def test_offsets_are_exact(self, english_text):
+        """Test that every chunk is exactly text[start:end]"""
+        chunker = Chunker(chunk_size=300, chunk_overlap=50)
+
+        spans = chunker.split_text_with_offsets(english_text)
+
+        assert len(spans) > 1
+        for (start, end), chunk in zip(spans, chunker.split_text(english_text)):
+            assert english_text[start:end] == chunk
+
+    def test_chunks_respect_size(self, japanese_text):
+        """Test that no chunk exceeds chunk_size"""
+        chunker = Chunker(chunk_size=200, chunk_overlap=40)
+
+        assert all(len(chunk) <= 200 for chunk in chunker.split_text(japanese_text))
+
+    def test_japanese_sentence_boundaries(self, japanese_text):
+        """Test that Japanese chunks end at sentence punctuation"""
+        chunker = Chunker(chunk_size=200, chunk_overlap=40)
+
+        chunks = chunker.split_text(japanese_text)
+
+        assert all(chunk[-1] in "。！？」" for chunk in chunks[:-1])
+
+    def test_chunks_overlap_and_cover_text(self, english_text):
+        """Test that consecutive chunks overlap and together cover the text"""
+        chunker = Chunker(chunk_size=300, chunk_overlap=100)
+
+        spans = chunker.split_text_with_offsets(english_text)
+
+        assert any(spans[i + 1][0] < spans[i][1] for i in range(len(spans) - 1))
+        assert all(spans[i + 1][0] <= spans[i][1] + 1 for i in range(len(spans) - 1))
+        assert spans[0][0] == 0 and spans[-1][1] == len(english_text.rstrip())
+
+    def test_long_sentence_without_punctuation(self):
+        """Test that unbreakable text is hard-cut to chunk_size"""
+        chunker = Chunker(chunk_size=100, chunk_overlap=10)
+
+        chunks = chunker.split_text("あ" * 1000)
+
+        assert len(chunks) >= 10
+        assert all(len(chunk) <= 100 for chunk in chunks)
+
+    def test_token_length_function(self, english_text):
+        """Test chunk sizing in tokens via a custom length function"""
+        chunker = Chunker(chunk_size=50, chunk_overlap=10, length_function=lambda s: len(s.split()))
+
+        assert all(len(chunk.split()) <= 50 for chunk in chunker.split_text(english_text))
+
+    def test_hard_cut_fits_multi_token_characters(self):
+        """Test that hard-cut pieces fit when one character is several tokens"""
+        def utf8_bytes(text):
+            return len(text.encode("utf-8"))
+
+        text = "🙂" * 200 + "a" * 50
+        chunker = Chunker(chunk_size=30, chunk_overlap=5, length_function=utf8_bytes)
+
+        chunks = chunker.split_text(text)
+
+        assert all(utf8_bytes(chunk) <= 30 for chunk in chunks)
+        assert "".join(chunks) == text
+
+    def test_split_documents_metadata(self):
+        """Test that chunks carry start/end offsets and source metadata"""
+        doc = Document(page_content="First sentence. Second sentence. " * 50, metadata={"source": "a.txt"})
+
+        chunks = Chunker(chunk_size=100, chunk_overlap=20).split_documents([doc])
+
+        for chunk in chunks:
+            assert chunk.metadata["source"] == "a.txt"
+            assert doc.page_content[chunk.metadata["start_index"]:chunk.metadata["end_index"]] == chunk.page_content
+
+    def test_empty_text(self):
+        assert Chunker().split_text("") == []
+
+    def test_invalid_overlap(self):
+        with pytest.raises(ValueError):
+            Chunker(chunk_size=100, chunk_overlap=100)
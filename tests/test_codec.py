@@ -0,0 +1,154 @@
+import json
+import multiprocessing
+import pytest
+from unittest.mock import Mock
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.core import codec, index
+from src.core.codec import MetadataCodec, UNKNOWN, get_codec, register_codec, add_labels
+from src.core.index import MetaData, get_vectorstore
+from src.core.ingest import get_chunks, ingest_documents
+from src.core.retrieval import retrieval
+
+HIERARCHY = {"domains": ["Healthcare", "Finance"], "sections": ["Patient Care"], "topics": ["Diagnostics"]}
+
+
+def add_domains(prefix):
+    for i in range(20):
+        add_labels("hospital", [{"domain": f"{prefix} {i}"}])
+
+
+@pytest.fixture
+def dictionaries(tmp_path, monkeypatch):
+    """Isolated dictionary file and codec cache"""
+    monkeypatch.setattr(codec, "METADATA_DICTIONARIES_PATH", str(tmp_path / "dictionaries.json"))
+    monkeypatch.setattr(codec, "_codecs", {})
+    return tmp_path
+
+
+# ============================================================================
+# METADATA CODEC TESTS
+# ============================================================================
+
+class TestMetadataCodec:
+    """Tests for dictionary-encoded hierarchy metadata"""
+
+    def test_seeded_from_hierarchy(self):
+        c = MetadataCodec.from_hierarchy(HIERARCHY)
+
+        assert c.code("domain", "Finance") == 1  # sorted
+        assert c.code("language", "en") == 2
+        assert c.code("doc_type", "faq") == 3
+        assert c.code("topic", None) == 0
+
+    def test_roundtrip_and_new_labels(self):
+        c = MetadataCodec.from_hierarchy(HIERARCHY)
+        metadata = {"domain": "Legal", "section": "Patient Care", "topic": None, "source_name": "a.pdf"}
+
+        encoded = c.encode(metadata)
+
+        assert encoded["domain"] == 3 and c.changed
+        assert encoded["source_name"] == "a.pdf"
+        assert c.decode(encoded) == metadata
+
+    def test_unknown_filter_label_matches_nothing(self):
+        c = MetadataCodec.from_hierarchy(HIERARCHY)
+
+        assert c.code("domain", "Unknown") == UNKNOWN
+        assert "Unknown" not in c.dictionary["domain"]
+
+    def test_registry_persists(self, dictionaries, monkeypatch):
+        register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+        monkeypatch.setattr(codec, "_codecs", {})
+
+        assert get_codec("hospital").code("domain", "Healthcare") == 2
+        assert get_codec("other") is None
+
+    def test_processes_agree_on_codes(self, dictionaries, monkeypatch):
+        """Test that labels added by another process keep their codes and are seen by this one"""
+        register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+        app = get_codec("hospital")
+
+        # a CLI import in another process, with its own cache
+        monkeypatch.setattr(codec, "_codecs", {})
+        assert add_labels("hospital", [{"domain": "Legal"}]).code("domain", "Legal") == 3
+        monkeypatch.setattr(codec, "_codecs", {"hospital": (app, None)})
+
+        assert get_codec("hospital").code("domain", "Legal") == 3
+        assert add_labels("hospital", [{"domain": "Tax"}]).code("domain", "Tax") == 4
+        stored = json.loads((dictionaries / "dictionaries.json").read_text())["hospital"]["domain"]
+        assert stored == ["Finance", "Healthcare", "Legal", "Tax"]
+
+    def test_register_keeps_first_dictionary(self, dictionaries):
+        first = register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+
+        second = register_codec("hospital", MetadataCodec({"domain": ["Legal"]}))
+
+        assert second is first
+        assert second.code("domain", "Legal") == UNKNOWN
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+    def test_concurrent_processes_never_reuse_a_code(self, dictionaries):
+        register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=add_domains, args=(prefix,)) for prefix in ("app", "cli")]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        stored = json.loads((dictionaries / "dictionaries.json").read_text())["hospital"]["domain"]
+        assert [worker.exitcode for worker in workers] == [0, 0]
+        assert len(stored) == len(set(stored)) == 42
+
+    def test_retrieval_filters_on_codes(self, dictionaries):
+        """Test that filters on an encoded collection compare integers and results are decoded"""
+        register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+        mock_store = Mock()
+        mock_store.collection_name = "hospital"
+        mock_store.similarity_search_with_relevance_scores.return_value = [
+            (Document(page_content="doc", metadata={"domain": 2, "language": 2}), 0.9)
+        ]
+
+        results = retrieval("query", MetaData(language="en", domain="Healthcare"), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert expr == "language == 2 and domain == 2"
+        assert results[0].metadata["domain"] == "Healthcare"
+        assert results[0].metadata["language"] == "en"
+
+    def test_path_filter_matches_codes(self, dictionaries):
+        """Test that the hierarchy prefix filter of an encoded collection is written in codes"""
+        register_codec("hospital", MetadataCodec.from_hierarchy(HIERARCHY))
+        mock_store = Mock()
+        mock_store.collection_name = "hospital"
+        mock_store.fields = ["domain", "section", "hierarchy_path"]
+        mock_store.similarity_search_with_relevance_scores.return_value = []
+
+        retrieval("query", MetaData(language="en", domain="Healthcare", section="Patient Care"), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert expr == 'language == 2 and hierarchy_path like "2/1/%"'
+
+    def test_encoded_collection_end_to_end(self, dictionaries, tmp_path, monkeypatch):
+        """Test that an encoded Milvus Lite collection stores codes and filters transparently"""
+        monkeypatch.setattr(index, "MILVUS_URI", str(tmp_path / "milvus.db"))
+        monkeypatch.setattr("src.core.ingest.ENCODE_METADATA", True)
+        vectorstore = get_vectorstore("hospital", embeddings=DeterministicFakeEmbedding(size=8))
+        for domain in ["Healthcare", "Finance"]:
+            chunks = get_chunks(
+                [Document(page_content=f"{domain} policy document.", metadata={})],
+                MetaData(language="en", domain=domain, section="Patient Care", doc_type="policy"),
+            )
+            ingest_documents(chunks, vectorstore)
+
+        stored = vectorstore.client.query("hospital", filter="", output_fields=["domain", "hierarchy_path"], limit=10)
+        results = retrieval("policy", MetaData(language="en", domain="Finance", section="Patient Care"), vectorstore)
+
+        assert {row["domain"] for row in stored} <= {1, 2}
+        # the path joins level codes, not labels
+        assert sorted(row["hierarchy_path"] for row in stored) == ["1/1/", "2/1/"]
+        assert [doc.page_content for doc in results] == ["Finance policy document."]
+        assert results[0].metadata["domain"] == "Finance"
+        assert results[0].metadata["hierarchy_path"] == "Finance/Patient Care/"
@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import Mock
+from langchain_core.documents import Document
+
+from src.core.dedup import NearDuplicateDetector, shingles
+from src.core.index import MetaData
+from src.core.ingest import get_chunks, upsert_chunks
+
+BOILERPLATE = (
+    "This document is confidential and intended solely for internal use by hospital staff. "
+    "Unauthorized distribution, copying or disclosure is strictly prohibited. "
+    "Contact the compliance office at extension 4410 with questions about this policy. "
+)
+BOILERPLATE_JA = (
+    "本文書は機密情報を含み、病院職員の内部利用のみを目的としています。"
+    "無断での配布、複製、開示は固く禁じられています。"
+    "本方針に関するご質問はコンプライアンス室までお問い合わせください。"
+)
+
+
+@pytest.fixture
+def sample_metadata():
+    return MetaData(language="en", domain="Healthcare", section="Patient Care", topic="Diagnostics", doc_type="policy")
+
+
+# ============================================================================
+# NEAR-DUPLICATE DETECTION TESTS
+# ============================================================================
+
+class TestNearDuplicateDetector:
+    """Tests for MinHash LSH near-duplicate detection"""
+
+    def test_japanese_uses_character_shingles(self):
+        assert "患者の" in shingles("患者のケア")
+        assert "hello world again" in shingles("Hello, world again!")
+
+    def test_detects_lightly_edited_copy(self):
+        detector = NearDuplicateDetector(threshold=0.7)
+
+        assert detector.check("a", BOILERPLATE) is None
+        assert detector.check("b", BOILERPLATE.replace("4410", "4420")) == "a"
+        assert detector.stats == {"checked": 2, "near_duplicates": 1}
+
+    def test_detects_japanese_copy(self):
+        detector = NearDuplicateDetector(threshold=0.7)
+
+        assert detector.check("a", BOILERPLATE_JA) is None
+        assert detector.check("b", BOILERPLATE_JA.replace("コンプライアンス室", "法務部")) == "a"
+
+    def test_distinct_text_is_kept(self):
+        detector = NearDuplicateDetector()
+
+        assert detector.check("a", BOILERPLATE) is None
+        assert detector.check("b", "Blood glucose monitoring is required every four hours for insulin patients.") is None
+
+    def test_saved_detector_keeps_matching(self, tmp_path):
+        detector = NearDuplicateDetector(threshold=0.7, seed=3)
+        detector.check("a", BOILERPLATE)
+        detector.check("ja", BOILERPLATE_JA)
+        detector.save(str(tmp_path / "dedup.npz"))
+
+        restored = NearDuplicateDetector.load(str(tmp_path / "dedup.npz"), mode="link")
+
+        assert (restored.threshold, restored.seed, restored.mode) == (0.7, 3, "link")
+        assert restored.check("b", BOILERPLATE.replace("4410", "4420")) == "a"
+        assert restored.check("c", BOILERPLATE_JA) == "ja"
+
+    def test_get_chunks_drops_near_duplicates(self, sample_metadata):
+        """Test that boilerplate repeated across documents is embedded once"""
+        docs = [
+            Document(page_content=BOILERPLATE, metadata={"source": "a.txt"}),
+            Document(page_content=BOILERPLATE.replace("4410", "4411"), metadata={"source": "b.txt"}),
+            Document(page_content="Discharge summaries are due within 24 hours.", metadata={"source": "c.txt"}),
+        ]
+        detector = NearDuplicateDetector(threshold=0.7, mode="drop")
+
+        chunks = get_chunks(docs, sample_metadata, dedup=detector)
+
+        assert [c.metadata["source_name"] for c in chunks] == ["a.txt", "c.txt"]
+        assert all(c.metadata["canonical_id"] == c.metadata["chunk_id"] for c in chunks)
+
+    def test_linked_duplicates_reuse_canonical_embedding(self, sample_metadata):
+        """Test that linked chunks point at their canonical chunk and are not embedded"""
+        docs = [
+            Document(page_content=BOILERPLATE, metadata={"source": "a.txt"}),
+            Document(page_content=BOILERPLATE.replace("4410", "4411"), metadata={"source": "b.txt"}),
+        ]
+        chunks = get_chunks(docs, sample_metadata, dedup=NearDuplicateDetector(threshold=0.7, mode="link"))
+        mock_store = Mock()
+        mock_store.col = None
+        mock_store.embeddings.embed_documents.side_effect = lambda texts: [[float(len(t)), 1.0] for t in texts]
+
+        upsert_chunks(chunks, mock_store)
+
+        assert chunks[1].metadata["canonical_id"] == chunks[0].metadata["chunk_id"]
+        mock_store.embeddings.embed_documents.assert_called_once_with([chunks[0].page_content])
+        vectors = mock_store.add_embeddings.call_args[0][1]
+        assert vectors[0] == vectors[1]
+
+    def test_linked_duplicate_reuses_vector_stored_earlier(self, sample_metadata):
+        """Test that a chunk linked to a canonical chunk from an earlier batch reads its vector back"""
+        detector = NearDuplicateDetector(threshold=0.7, mode="link")
+        first = get_chunks([Document(page_content=BOILERPLATE, metadata={"source": "a.txt"})], sample_metadata, dedup=detector)
+        second = get_chunks(
+            [Document(page_content=BOILERPLATE.replace("4410", "4411"), metadata={"source": "b.txt"})],
+            sample_metadata, dedup=detector,
+        )
+        canonical_id = first[0].metadata["chunk_id"]
+        mock_store = Mock()
+        mock_store._primary_field, mock_store._vector_field = "pk", "vector"
+        mock_store.get_pks.return_value = []
+        mock_store.client.query.return_value = [{"pk": canonical_id, "vector": [7.0, 1.0]}]
+        mock_store._prepare_insert_list.side_effect = lambda texts, vectors, metadatas, ids, force_ids: vectors
+
+        upsert_chunks(second, mock_store)
+
+        assert second[0].metadata["canonical_id"] == canonical_id
+        assert canonical_id in mock_store.client.query.call_args[1]["filter"]
+        assert not mock_store.embeddings.embed_documents.called
+        assert mock_store._prepare_insert_list.call_args[0][1] == [[[7.0, 1.0]]]
+
+    def test_default_mode_keeps_every_chunk(self, sample_metadata):
+        """Test that a detector built without a mode follows NEAR_DUPLICATE_MODE ("off")"""
+        docs = [
+            Document(page_content=BOILERPLATE, metadata={"source": "a.txt"}),
+            Document(page_content=BOILERPLATE.replace("4410", "4411"), metadata={"source": "b.txt"}),
+        ]
+
+        chunks = get_chunks(docs, sample_metadata, dedup=NearDuplicateDetector(threshold=0.7))
+
+        assert len(chunks) == 2
+        assert all(c.metadata["canonical_id"] == c.metadata["chunk_id"] for c in chunks)
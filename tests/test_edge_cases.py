@@ -168,7 +168,7 @@ class TestEdgeCases:
         ]
         
         # Should handle batch without issues
-        with patch('src.core.eval.retrieval') as mock_ret:
+        with patch('src.core.eval.retrieval') as mock_ret, patch('src.core.eval.get_vectorstore'):
             with patch('src.core.eval.generate') as mock_gen:
                 mock_ret.return_value = []
                 mock_gen.return_value = "Test"
@@ -0,0 +1,109 @@
+import time
+import pytest
+
+from src.core.embedder import EmbeddingScheduler, TokenBucket, estimate_tokens
+
+
+class FakeEmbeddings:
+    """Embeddings stub that records batch sizes and can fail with 429s"""
+
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.batch_sizes = []
+
+    def embed_documents(self, texts):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            error = Exception("Too Many Requests")
+            error.status_code = 429
+            raise error
+        self.batch_sizes.append(len(texts))
+        return [[float(text.split()[-1])] for text in texts]
+
+
+# ============================================================================
+# EMBEDDING SCHEDULER TESTS
+# ============================================================================
+
+class TestEmbeddingScheduler:
+    """Tests for concurrent, rate-limit-aware embedding"""
+
+    def test_results_preserve_input_order(self):
+        """Test that concurrent batches are reassembled in order"""
+        texts = [f"text {i}" for i in range(100)]
+        scheduler = EmbeddingScheduler(FakeEmbeddings(), batch_size=7, max_in_flight=4)
+
+        vectors = scheduler.embed(texts)
+
+        assert vectors == [[float(i)] for i in range(100)]
+
+    def test_respects_batch_size(self):
+        """Test that no batch exceeds the configured batch size"""
+        fake = FakeEmbeddings()
+        scheduler = EmbeddingScheduler(fake, batch_size=10, max_batch_size=10)
+
+        scheduler.embed([f"text {i}" for i in range(35)])
+
+        assert max(fake.batch_sizes) <= 10
+        assert sum(fake.batch_sizes) == 35
+
+    def test_log_counts_batches_of_each_call(self, capsys):
+        """Test that a reused scheduler reports only the current call's batches"""
+        scheduler = EmbeddingScheduler(FakeEmbeddings(), batch_size=10, max_batch_size=10)
+
+        scheduler.embed([f"text {i}" for i in range(30)])
+        scheduler.embed([f"text {i}" for i in range(20)])
+
+        lines = capsys.readouterr().out.splitlines()
+        assert "in 3 batches" in lines[0] and "in 2 batches" in lines[1]
+        assert scheduler.stats["batches"] == 5
+
+    def test_rate_limit_halves_batch_size_and_retries(self, monkeypatch):
+        """Test that 429s shrink the batch size and the batch is retried"""
+        monkeypatch.setattr("src.core.embedder.time.sleep", lambda s: None)
+        fake = FakeEmbeddings(fail_times=2)
+        scheduler = EmbeddingScheduler(fake, batch_size=64, max_in_flight=1, min_batch_size=8)
+
+        vectors = scheduler.embed([f"text {i}" for i in range(10)])
+
+        assert len(vectors) == 10
+        assert scheduler.stats["rate_limited"] == 2
+        assert scheduler.batch_size < 64
+
+    def test_non_rate_limit_errors_propagate(self):
+        """Test that other embedding errors are not retried"""
+        class Broken:
+            def embed_documents(self, texts):
+                raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            EmbeddingScheduler(Broken()).embed(["text 1"])
+
+    def test_empty_input(self):
+        """Test that embedding nothing makes no calls"""
+        fake = FakeEmbeddings()
+
+        assert EmbeddingScheduler(fake).embed([]) == []
+        assert fake.batch_sizes == []
+
+
+class TestTokenBucket:
+    """Tests for token-per-minute budgeting"""
+
+    def test_acquire_within_budget_does_not_wait(self):
+        bucket = TokenBucket(tokens_per_minute=6000)
+
+        assert bucket.acquire(100) == 0.0
+
+    def test_acquire_over_budget_waits(self):
+        bucket = TokenBucket(tokens_per_minute=6000)  # 100 tokens/s
+        bucket.acquire(6000)
+
+        start = time.monotonic()
+        bucket.acquire(10)
+
+        assert time.monotonic() - start >= 0.05
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("abcdefgh") == 2
+        assert estimate_tokens("患者") >= 1
@@ -1,4 +1,8 @@
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+import json
+import threading
+import time
+import numpy as np
 import pytest
 import tempfile
 import shutil
@@ -9,7 +13,18 @@ from src.core.eval import (
     calculate_hit_at_k,
     calculate_semantic_similarity,
     evaluate_single_query,
+    run_full_evaluation,
+    relevance_matrix,
+    retrieval_metrics,
+    save_results,
+    generate_summary_report,
     EvalQuery,
+    EvalResult,
+    EvalTable,
+    LATENCY_STAGES,
+    _evaluate_query,
+    query_id,
+    latency_summary,
 )
 
 @pytest.fixture(scope="session")
@@ -129,6 +144,17 @@ class TestEvaluationMetrics:
         assert isinstance(similarity, float)
         assert 0 <= similarity <= 1
     
+    def test_semantic_similarity_uses_given_vectors(self, sample_documents):
+        """Test that stored vectors and the search's query vector need no embedding calls"""
+        with patch('src.core.eval.emb_model') as mock_emb:
+            similarity = calculate_semantic_similarity(
+                "test query", sample_documents[:2], [1.0, 0.0], np.array([[2.0, 0.0], [1.0, 1.0]])
+            )
+
+        assert similarity == pytest.approx((1.0 + 1 / np.sqrt(2)) / 2)
+        assert not mock_emb.embed_query.called
+        assert not mock_emb.embed_documents.called
+
     def test_semantic_similarity_empty_docs(self):
         """Test semantic similarity with empty document list"""
         similarity = calculate_semantic_similarity("test query", [])
@@ -143,10 +169,12 @@ class TestEvaluationMetrics:
 class TestEvaluationWorkflow:
     """Tests for end-to-end evaluation workflows"""
     
+    @patch('src.core.eval.get_vectorstore')
+    @patch('src.core.eval.stored_vectors_of')
     @patch('src.core.eval.retrieval')
     @patch('src.core.eval.generate')
     @patch('src.core.eval.calculate_semantic_similarity')
-    def test_evaluate_single_query_base_rag(self, mock_sem_sim, mock_gen, mock_ret):
+    def test_evaluate_single_query_base_rag(self, mock_sem_sim, mock_gen, mock_ret, mock_vectors, mock_store):
         """Test single query evaluation for base RAG"""
         # Setup mocks
         mock_docs = [
@@ -179,9 +207,10 @@ class TestEvaluationWorkflow:
         assert result.retrieval_latency_ms > 0
         assert result.total_latency_ms > 0
     
+    @patch('src.core.eval.get_vectorstore')
     @patch('src.core.eval.retrieval')
     @patch('src.core.eval.generate')
-    def test_evaluate_single_query_hierarchical_rag(self, mock_gen, mock_ret):
+    def test_evaluate_single_query_hierarchical_rag(self, mock_gen, mock_ret, mock_store):
         """Test single query evaluation for hierarchical RAG"""
         mock_ret.return_value = []
         mock_gen.return_value = "No relevant documents found."
@@ -205,4 +234,375 @@ class TestEvaluationWorkflow:
         assert result.hit_at_5 is False
         assert result.mrr == 0.0
     
- 
\ No newline at end of file
+ 
+
+
+# ============================================================================
+# PARALLEL EVALUATION TESTS
+# ============================================================================
+
+def fake_result(eval_query, rag_type):
+    """(record, relevance matrix) as returned by a query evaluation"""
+    record = dict(
+        query_id=eval_query.query, collection=eval_query.collection, query=eval_query.query,
+        rag_type=rag_type, retrieved_docs=0, avg_similarity_score=0.0, retrieval_latency_ms=0.0,
+        generation_latency_ms=0.0, total_latency_ms=0.0, avg_semantic_similarity=0.0,
+        generated_answer="", filters_used={}, timestamp="",
+        **{f"{stage}_ms": 0.0 for stage in LATENCY_STAGES},
+    )
+    return record, np.zeros((len(eval_query.ground_truth_chunks), 0), dtype=bool)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.fixture(autouse=True)
+def result_store_path(tmp_path, monkeypatch):
+    """Keep the per-query result store out of ./data"""
+    monkeypatch.setattr("src.core.resultstore.EVAL_RESULT_STORE", str(tmp_path / "eval_results.jsonl"))
+    return tmp_path / "eval_results.jsonl"
+
+
+@pytest.fixture(autouse=True)
+def generation_cache_path(tmp_path, monkeypatch):
+    """Keep the generation cache out of ./data"""
+    monkeypatch.setattr("src.core.gencache.GENERATION_CACHE_PATH", str(tmp_path / "generations.sqlite"))
+    return tmp_path / "generations.sqlite"
+
+
+@patch('src.core.eval.get_vectorstore')
+class TestParallelEvaluation:
+    """Tests for the concurrent evaluation runner"""
+
+    def test_order_is_deterministic(self, mock_store, tmp_path):
+        """Test that results keep the seeded query order whatever the completion order"""
+        def slow_for_early_queries(eval_query, rag_type, vectorstore=None, *args, **kwargs):
+            time.sleep(0.02 if eval_query.query[0] < "m" else 0.0)
+            return fake_result(eval_query, rag_type)
+
+        with patch('src.core.eval._evaluate_query', side_effect=slow_for_early_queries):
+            first = run_full_evaluation(["hospital", "bank"], str(tmp_path), max_in_flight=8)
+            second = run_full_evaluation(["hospital", "bank"], str(tmp_path), max_in_flight=1)
+
+        assert [r.query for r in first["base"]] == [r.query for r in second["base"]]
+        assert [r.query for r in first["base"]] == [r.query for r in first["hierarchical"]]
+        assert {r.collection for r in first["base"]} == {"hospital", "bank"}
+
+    def test_max_in_flight_is_respected(self, mock_store, tmp_path):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def tracked(eval_query, rag_type, vectorstore=None, *args, **kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return fake_result(eval_query, rag_type)
+
+        with patch('src.core.eval._evaluate_query', side_effect=tracked):
+            run_full_evaluation(["hospital", "bank", "fluid_simulation"], str(tmp_path), max_in_flight=3)
+
+        assert 1 < peak[0] <= 3
+
+    def test_rate_limited_queries_are_retried(self, mock_store, tmp_path):
+        calls = []
+
+        def flaky(eval_query, rag_type, vectorstore=None, *args, **kwargs):
+            calls.append(eval_query.query)
+            if calls.count(eval_query.query) == 1 and rag_type == "base":
+                raise RateLimitError("429")
+            return fake_result(eval_query, rag_type)
+
+        with patch('src.core.eval._evaluate_query', side_effect=flaky), patch('src.core.eval.time.sleep'):
+            results = run_full_evaluation(["bank"], str(tmp_path))
+
+        assert len(results["base"]) == len(results["hierarchical"]) > 0
+
+    def test_errors_are_raised(self, mock_store, tmp_path):
+        with patch('src.core.eval._evaluate_query', side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                run_full_evaluation(["bank"], str(tmp_path))
+
+
+# ============================================================================
+# EVALUATION MODE TESTS
+# ============================================================================
+
+@patch('src.core.eval.stored_vectors_of', new=Mock())
+@patch('src.core.eval.calculate_semantic_similarity', return_value=0.5)
+@patch('src.core.eval.retrieval', return_value=[Document(page_content="Patient policy", metadata={'similarity_score': 0.9})])
+@patch('src.core.eval.get_vectorstore')
+class TestEvaluationModes:
+    """Tests for retrieval-only and cached-generation evaluation"""
+
+    def test_retrieval_mode_skips_generation(self, mock_store, mock_ret, mock_sem_sim, tmp_path):
+        with patch('src.core.eval.generate') as mock_gen:
+            results = run_full_evaluation(["bank"], str(tmp_path), mode="retrieval")
+
+        assert not mock_gen.called
+        assert all(r.generated_answer == "" and r.generation_latency_ms == 0.0 for r in results["base"])
+        assert all(r.retrieved_docs == 1 for r in results["hierarchical"])
+
+    @patch('src.core.retrieval.model')
+    def test_rerun_uses_cached_generations(self, mock_model, mock_store, mock_ret, mock_sem_sim, tmp_path, generation_cache_path):
+        mock_model.model_name = "gpt-5-nano"
+        mock_model.invoke.return_value.content = "Cached answer"
+
+        run_full_evaluation(["bank"], str(tmp_path))
+        calls = mock_model.invoke.call_count
+        results = run_full_evaluation(["bank"], str(tmp_path))
+
+        assert calls > 0
+        assert mock_model.invoke.call_count == calls
+        assert generation_cache_path.exists()
+        assert all(r.generated_answer == "Cached answer" for r in results["base"])
+
+    def test_unknown_mode(self, mock_store, mock_ret, mock_sem_sim, tmp_path):
+        with pytest.raises(ValueError):
+            run_full_evaluation(["bank"], str(tmp_path), mode="generation")
+
+
+# ============================================================================
+# VECTORIZED METRICS TESTS
+# ============================================================================
+
+def docs_of(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+class TestRetrievalMetrics:
+    """Tests for metrics derived from the snippet x rank relevance matrix"""
+
+    def test_relevance_matrix(self):
+        matrix = relevance_matrix(["Policy", "review"], docs_of("other", "The POLICY text", "policy review"))
+
+        assert matrix.tolist() == [[False, True, True], [False, False, True]]
+        assert relevance_matrix(["policy"], []).shape == (1, 0)
+
+    def test_metrics_match_per_query_functions(self, sample_documents):
+        cases = [
+            (["patient admission"], sample_documents),
+            (["discharge"], sample_documents),
+            (["nonexistent"], sample_documents),
+            (["admission", "discharge", "emergency"], sample_documents),
+            (["admission"], []),
+        ]
+
+        metrics = retrieval_metrics([relevance_matrix(truth, docs) for truth, docs in cases])
+
+        for i, (truth, docs) in enumerate(cases):
+            assert metrics["mrr"][i] == calculate_mrr(truth, docs)
+            for k in (1, 3, 5):
+                assert metrics[f"hit_at_{k}"][i] == calculate_hit_at_k(truth, docs, k)
+
+    def test_precision_recall_ndcg(self):
+        matrix = relevance_matrix(["alpha", "beta"], docs_of("x", "alpha", "y", "beta", "z"))
+
+        metrics = retrieval_metrics([matrix])
+
+        assert metrics["precision_at_1"][0] == 0.0
+        assert metrics["precision_at_3"][0] == pytest.approx(1 / 3)
+        assert metrics["recall_at_3"][0] == 0.5
+        assert metrics["recall_at_5"][0] == 1.0
+        ideal = 1 + 1 / np.log2(3)
+        assert metrics["ndcg_at_5"][0] == pytest.approx((1 / np.log2(3) + 1 / np.log2(5)) / ideal)
+
+    def test_perfect_ranking_has_ndcg_one(self):
+        metrics = retrieval_metrics([relevance_matrix(["a"], docs_of("a", "b"))])
+
+        assert metrics["ndcg_at_1"][0] == metrics["ndcg_at_5"][0] == 1.0
+
+    def test_empty_run(self):
+        metrics = retrieval_metrics([])
+
+        assert len(metrics["mrr"]) == 0 and len(metrics["ndcg_at_5"]) == 0
+
+
+class TestEvalTable:
+    """Tests for the columnar result store"""
+
+    def test_rows_columns_and_reports(self, tmp_path):
+        queries = [EvalQuery("q1", "bank", "en", None, None, None, None, ["loan"], ""),
+                   EvalQuery("q2", "hospital", "en", None, None, None, None, ["ward"], "")]
+        records = [fake_result(q, "base") for q in queries]
+        for record, _ in records:
+            record["total_latency_ms"] = 10.0
+        relevance = [np.array([[False, True]]), np.array([[False, False]])]
+
+        table = EvalTable.from_records([r for r, _ in records], relevance)
+
+        assert len(table) == 2
+        assert table["mrr"].tolist() == [0.5, 0.0]
+        assert table.mean("hit_at_3") == 0.5
+        assert len(table[table["collection"] == "bank"]) == 1
+        rows = list(table[:1])
+        assert isinstance(rows[0], EvalResult) and rows[0].hit_at_3 is True
+        combined = table + table
+        assert len(combined) == 4
+        csv_path, json_path = save_results({"base": table, "hierarchical": table}, str(tmp_path))
+        assert "ndcg_at_5" in csv_path.read_text().splitlines()[0]
+        assert generate_summary_report({"base": table, "hierarchical": table}, str(tmp_path)).exists()
+
+
+# ============================================================================
+# LATENCY BREAKDOWN TESTS
+# ============================================================================
+
+def timed_table(latencies, collections):
+    """Table whose rows spend `latency` ms in vector_search and llm"""
+    records = []
+    for i, (latency, collection) in enumerate(zip(latencies, collections)):
+        record, _ = fake_result(EvalQuery(f"q{i}", collection, "en", None, None, None, None, ["x"], ""), "base")
+        record.update(vector_search_ms=latency, llm_ms=2 * latency, total_latency_ms=3 * latency)
+        records.append(record)
+    return EvalTable.from_records(records, [np.zeros((1, 0), dtype=bool)] * len(records))
+
+
+class TestLatencyBreakdown:
+    """Tests for per-stage latency percentiles and histograms"""
+
+    @patch('src.core.eval.get_vectorstore')
+    @patch('src.core.eval.stored_vectors_of')
+    @patch('src.core.eval.calculate_semantic_similarity', return_value=0.5)
+    @patch('src.core.retrieval.model')
+    def test_stages_are_timed(self, mock_model, mock_sem_sim, mock_vectors, mock_store):
+        mock_store.return_value.fields = []
+        mock_store.return_value.similarity_search_with_score_by_vector.return_value = [
+            (Document(page_content="policy", metadata={}), 0.5)
+        ]
+        mock_store.return_value._select_relevance_score_fn.return_value = lambda d: 1 - d / 4
+        mock_model.invoke.side_effect = lambda prompt: (time.sleep(0.01), Mock(content="answer"))[1]
+        eval_query = EvalQuery("q", "bank", "en", None, None, None, None, ["policy"], "")
+
+        result, _ = _evaluate_query(eval_query, "base")
+
+        assert result["llm_ms"] >= 10
+        assert result["vector_search_ms"] > 0 and result["context_ms"] > 0
+        assert result["rerank_ms"] == 0.0
+        assert result["generation_latency_ms"] >= result["llm_ms"]
+
+    def test_percentiles_and_histogram(self):
+        table = timed_table(list(range(1, 101)), ["bank"] * 50 + ["hospital"] * 50)
+
+        summary = latency_summary(table)
+
+        search = summary["overall"]["vector_search"]
+        assert search["p50"] == pytest.approx(50.5)
+        assert search["p99"] == pytest.approx(99.01)
+        assert sum(search["histogram"]) == 100
+        # buckets <=1, <=2, <=5, <=10 ms
+        assert search["histogram"][:4] == [1, 1, 3, 5]
+        assert summary["overall"]["llm"]["p90"] == pytest.approx(2 * search["p90"])
+        assert summary["collections"]["hospital"]["vector_search"]["p50"] == pytest.approx(75.5)
+        assert summary["overall"]["rerank"]["p99"] == 0.0
+
+    def test_reports_include_breakdown(self, tmp_path):
+        table = timed_table([5.0, 50.0, 500.0], ["bank", "bank", "hospital"])
+        results = {"base": table, "hierarchical": table}
+
+        csv_path, json_path = save_results(results, str(tmp_path))
+        md_path = generate_summary_report(results, str(tmp_path))
+
+        assert "vector_search_ms" in csv_path.read_text().splitlines()[0]
+        latency = json.loads(json_path.read_text())["latency"]
+        assert latency["base"]["collections"]["hospital"]["vector_search"]["p50"] == 500.0
+        latency_csv = next(tmp_path.glob("eval_latency_*.csv")).read_text().splitlines()
+        assert latency_csv[0].startswith("rag_type,collection,stage,p50_ms,p90_ms,p95_ms,p99_ms,mean_ms,<=1ms")
+        assert any(line.startswith("hierarchical,hospital,llm,1000.000") for line in latency_csv)
+        report = md_path.read_text()
+        assert "## Latency Breakdown" in report
+        assert "| vector_search | 50.0ms |" in report
+
+    def test_reused_results_are_left_out(self, tmp_path):
+        """Test that latencies measured by an earlier run do not enter the percentiles"""
+        table = timed_table([5.0, 50.0, 500.0], ["bank", "bank", "hospital"])
+        table.columns["reused"] = np.array([False, False, True])
+
+        summary = latency_summary(table)
+        report = generate_summary_report({"base": table, "hierarchical": table}, str(tmp_path)).read_text()
+
+        assert summary["overall"]["vector_search"]["p99"] == pytest.approx(49.55)
+        assert "hospital" not in summary["collections"]
+        assert "1 results reused from an earlier run are left out of these latencies." in report
+
+
+# ============================================================================
+# RESUMABLE EVALUATION TESTS
+# ============================================================================
+
+@patch('src.core.eval.get_vectorstore')
+class TestResumableEvaluation:
+    """Tests for stable query ids and the per-query result store"""
+
+    def test_query_id_is_content_based(self, mock_store):
+        eval_query = EvalQuery("What is KYC?", "bank", "en", "Finance", None, None, None, ["KYC"], "first")
+        same = EvalQuery("What is KYC?", "bank", "en", "Finance", None, None, None, ["KYC"], "other description")
+        changed = EvalQuery("What is KYC?", "bank", "en", "Finance", None, None, None, ["AML"], "first")
+
+        assert query_id(eval_query, "base") == query_id(same, "base")
+        assert query_id(eval_query, "base") != query_id(changed, "base")
+        assert query_id(eval_query, "base") != query_id(eval_query, "hierarchical")
+        assert query_id(eval_query, "base").startswith("bank_base_")
+
+    def test_interrupted_run_resumes(self, mock_store, tmp_path, result_store_path):
+        calls = []
+
+        def crash_after_five(eval_query, rag_type, vectorstore=None, *args, **kwargs):
+            if len(calls) == 5:
+                raise RuntimeError("crash")
+            calls.append((eval_query.query, rag_type))
+            return fake_result(eval_query, rag_type)
+
+        with patch('src.core.eval._evaluate_query', side_effect=crash_after_five):
+            with pytest.raises(RuntimeError):
+                run_full_evaluation(["bank"], str(tmp_path), max_in_flight=1, resume=True)
+        assert len(result_store_path.read_text().splitlines()) == 5
+
+        # a fresh process reloads the store from disk
+        with patch('src.core.resultstore._stores', {}), \
+                patch('src.core.eval._evaluate_query', side_effect=lambda q, r, *a, **k: fake_result(q, r)) as resumed:
+            results = run_full_evaluation(["bank"], str(tmp_path), max_in_flight=1, resume=True)
+
+        tasks = [(r.query, r.rag_type) for rag_type in ("base", "hierarchical") for r in results[rag_type]]
+        assert resumed.call_count == len(tasks) - 5
+        assert set(calls) < set(tasks)
+        reused = results["base"]["reused"].tolist() + results["hierarchical"]["reused"].tolist()
+        assert sum(reused) == 5
+
+    def test_unchanged_pairs_are_reused_across_runs(self, mock_store, tmp_path):
+        with patch('src.core.eval._evaluate_query', side_effect=lambda q, r, *a, **k: fake_result(q, r)) as evaluate:
+            first = run_full_evaluation(["bank"], str(tmp_path), mode="retrieval", resume=True)
+            calls = evaluate.call_count
+            second = run_full_evaluation(["bank"], str(tmp_path), mode="retrieval", resume=True)
+            assert evaluate.call_count == calls
+            # another config is evaluated again
+            run_full_evaluation(["bank"], str(tmp_path), mode="full", resume=True)
+            assert evaluate.call_count == 2 * calls
+            # resuming is opt-in
+            run_full_evaluation(["bank"], str(tmp_path), mode="retrieval")
+            assert evaluate.call_count == 3 * calls
+
+        assert not any(first["base"]["reused"]) and all(second["base"]["reused"])
+        unmarked = [{k: v for k, v in row.items() if k != "reused"} for row in second["base"].rows()]
+        assert unmarked == [{k: v for k, v in row.items() if k != "reused"} for row in first["base"].rows()]
+
+    def test_torn_line_is_skipped(self, mock_store, tmp_path):
+        from src.core.resultstore import ResultStore
+        path = tmp_path / "results.jsonl"
+        store = ResultStore(str(path))
+        store.put("a", {"mrr": np.float32(0.5)}, np.array([[True, False]]))
+        with open(path, "a") as f:
+            f.write('{"key": "b", "rec')
+
+        reopened = ResultStore(str(path))
+        reopened.put("c", {"mrr": 1.0}, np.zeros((0, 3), dtype=bool))
+        final = ResultStore(str(path))
+
+        assert len(final) == 2 and "b" not in final
+        record, relevance = final.get("a")
+        assert record == {"mrr": 0.5}
+        assert relevance.tolist() == [[True, False]]
+        assert final.get("c")[1].shape == (0, 3)
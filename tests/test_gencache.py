@@ -0,0 +1,43 @@
+from src.core import gencache
+from src.core.gencache import GenerationCache, get_generation_cache, prompt_key
+
+
+# ============================================================================
+# GENERATION CACHE TESTS
+# ============================================================================
+
+class TestGenerationCache:
+    """Tests for the on-disk LLM answer cache"""
+
+    def test_put_get(self, tmp_path):
+        cache = GenerationCache(str(tmp_path / "generations.sqlite"))
+        cache.put("gpt-5-nano", "prompt", "答え")
+
+        assert cache.get("gpt-5-nano", "prompt") == "答え"
+        assert cache.get("gpt-5-nano", "other prompt") is None
+        assert cache.get("gpt-5", "prompt") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_key_separates_model_and_prompt(self):
+        assert prompt_key("a", "bc") != prompt_key("ab", "c")
+        assert prompt_key("a", "bc") == prompt_key("a", "bc")
+
+    def test_survives_reopen(self, tmp_path):
+        path = str(tmp_path / "generations.sqlite")
+        cache = GenerationCache(path)
+        cache.put("gpt-5-nano", "prompt", "answer")
+        cache.close()
+
+        reopened = GenerationCache(path)
+
+        assert len(reopened) == 1
+        assert reopened.get("gpt-5-nano", "prompt") == "answer"
+        assert reopened.clear() == 1
+        assert len(reopened) == 0
+
+    def test_shared_per_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gencache, "GENERATION_CACHE_PATH", str(tmp_path / "default.sqlite"))
+        monkeypatch.setattr(gencache, "_caches", {})
+
+        assert get_generation_cache() is get_generation_cache(str(tmp_path / "default.sqlite"))
+        assert get_generation_cache(str(tmp_path / "other.sqlite")) is not get_generation_cache()
@@ -0,0 +1,127 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.core import index
+from src.core.index import get_vectorstore, rebuild_collection, rollback_alias, resolve_collection
+from src.core.index import swap_alias, gc_versions
+
+
+@pytest.fixture
+def milvus(tmp_path, monkeypatch):
+    """Isolated Milvus Lite database and alias file"""
+    monkeypatch.setattr(index, "MILVUS_URI", str(tmp_path / "milvus.db"))
+    monkeypatch.setattr(index, "COLLECTION_ALIASES_PATH", str(tmp_path / "aliases.json"))
+    return DeterministicFakeEmbedding(size=8)
+
+
+class AliasServer:
+    """Client stub with Milvus server alias semantics: has_collection also sees aliases"""
+
+    def __init__(self, *collections):
+        self.collections = set(collections)
+        self.aliases = {}
+
+    def has_collection(self, name):
+        return name in self.collections or name in self.aliases
+
+    def list_aliases(self, collection_name=""):
+        return {"aliases": [a for a, c in self.aliases.items() if collection_name in ("", c)]}
+
+    def describe_alias(self, alias):
+        return {"alias": alias, "collection_name": self.aliases[alias]}
+
+    def create_alias(self, collection_name, alias):
+        assert alias not in self.aliases and alias not in self.collections
+        self.aliases[alias] = collection_name
+
+    def alter_alias(self, collection_name, alias):
+        self.aliases[alias] = collection_name
+
+    def drop_collection(self, name):
+        if name in self.aliases.values():
+            raise RuntimeError(f"collection {name} still has an alias")
+        self.collections.discard(name)
+
+
+def texts_in(vectorstore):
+    return sorted(doc.page_content for doc in vectorstore.similarity_search("query", k=10))
+
+
+# ============================================================================
+# BLUE/GREEN REBUILD TESTS
+# ============================================================================
+
+class TestCollectionRebuild:
+    """Tests for versioned rebuilds behind an alias"""
+
+    def test_live_version_serves_until_swap(self, milvus):
+        """Test that queries hit the old version while the new one is built"""
+        with rebuild_collection("docs", embeddings=milvus) as vectorstore:
+            vectorstore.add_texts(["old"], metadatas=[{"source_name": "a"}])
+
+        with rebuild_collection("docs", embeddings=milvus) as vectorstore:
+            vectorstore.add_texts(["new"], metadatas=[{"source_name": "a"}])
+            assert texts_in(get_vectorstore("docs", embeddings=milvus)) == ["old"]
+
+        assert texts_in(get_vectorstore("docs", embeddings=milvus)) == ["new"]
+
+    def test_failed_rebuild_keeps_alias(self, milvus):
+        """Test that an exception during the build leaves the live version in place"""
+        with rebuild_collection("docs", embeddings=milvus) as vectorstore:
+            vectorstore.add_texts(["old"], metadatas=[{"source_name": "a"}])
+        live = resolve_collection("docs")
+
+        with pytest.raises(RuntimeError):
+            with rebuild_collection("docs", embeddings=milvus) as vectorstore:
+                vectorstore.add_texts(["broken"], metadatas=[{"source_name": "a"}])
+                raise RuntimeError("embedding failed")
+
+        assert resolve_collection("docs") == live
+        assert vectorstore.collection_name not in vectorstore.client.list_collections()
+
+    def test_rollback_and_garbage_collection(self, milvus):
+        """Test that one previous version is kept for rollback and older ones are dropped"""
+        versions = []
+        for text in ["v1", "v2", "v3"]:
+            with rebuild_collection("docs", embeddings=milvus, keep=1) as vectorstore:
+                vectorstore.add_texts([text], metadatas=[{"source_name": "a"}])
+            versions.append(vectorstore.collection_name)
+
+        assert versions[0] not in vectorstore.client.list_collections()
+        assert rollback_alias("docs") == versions[1]
+        assert texts_in(get_vectorstore("docs", embeddings=milvus)) == ["v2"]
+
+    def test_legacy_collection_becomes_rollback_target(self, milvus):
+        """Test that a plain collection with the alias name is kept as the previous version"""
+        get_vectorstore("docs", embeddings=milvus).add_texts(["legacy"], metadatas=[{"source_name": "a"}])
+
+        with rebuild_collection("docs", embeddings=milvus) as vectorstore:
+            vectorstore.add_texts(["new"], metadatas=[{"source_name": "a"}])
+
+        assert rollback_alias("docs") == "docs"
+        assert texts_in(get_vectorstore("docs", embeddings=milvus)) == ["legacy"]
+
+    def test_rollback_without_history(self, milvus):
+        with pytest.raises(ValueError):
+            rollback_alias("missing")
+
+    def test_native_alias_follows_every_swap(self, milvus):
+        """Test that the server-side alias moves on later swaps and old versions can be dropped"""
+        server = AliasServer("docs__v1", "docs__v2", "docs__v3")
+
+        for version in ("docs__v1", "docs__v2", "docs__v3"):
+            swap_alias("docs", version, server)
+            assert server.aliases == {"docs": version}
+
+        assert gc_versions("docs", keep=0, client=server) == ["docs__v2", "docs__v1"]
+        assert server.collections == {"docs__v3"}
+
+    def test_native_alias_waits_for_legacy_collection(self, milvus):
+        """Test that a plain collection with the alias name keeps it until it is collected"""
+        server = AliasServer("docs", "docs__v1")
+
+        swap_alias("docs", "docs__v1", server)
+        assert server.aliases == {}
+
+        gc_versions("docs", keep=0, client=server)
+        assert server.aliases == {"docs": "docs__v1"}
@@ -4,8 +4,11 @@ import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+from langchain_core.documents import Document
+
 from src.core.index import MetaData
-from src.core.ingest import load_documents, get_chunks, ingest_documents
+from src.core.ingest import load_documents, get_chunks, ingest_documents, HierarchyClassifier
+from src.core.ingest import delete_documents, replace_documents
 from src.core.retrieval import retrieval
 
 @pytest.fixture
@@ -35,6 +38,11 @@ def sample_text():
     """
 
 
+def fake_embed(texts):
+    """Deterministic stand-in for an embedding call"""
+    return [[float(len(text)), 1.0] for text in texts]
+
+
 @pytest.fixture
 def sample_metadata():
     """Sample metadata for testing"""
@@ -187,7 +195,9 @@ class TestMetadataAndHierarchy:
         try:
             # Mock the vectorstore to avoid actual DB operations
             with patch('src.core.index.get_vectorstore') as mock_vs:
-                mock_vs.return_value.add_documents = Mock()
+                mock_vs.return_value.add_embeddings = Mock()
+                mock_vs.return_value.col = None  # fresh collection
+                mock_vs.return_value.embeddings.embed_documents.side_effect = fake_embed
                 
                 # Run ingestion
                 docs = load_documents([temp_path])
@@ -195,20 +205,20 @@ class TestMetadataAndHierarchy:
                 vectorstore = mock_vs.return_value
                 ingest_documents(chunks, vectorstore)
                 
-                # Verify add_documents was called
-                assert mock_vs.return_value.add_documents.called, "add_documents should be called during ingestion"
+                # Verify add_embeddings was called
+                assert mock_vs.return_value.add_embeddings.called, "add_embeddings should be called during ingestion"
                 
-                # Get the documents that were added
-                call_args = mock_vs.return_value.add_documents.call_args
-                added_docs = call_args[0][0]  # First positional argument
+                # Get the metadata that was added
+                call_args = mock_vs.return_value.add_embeddings.call_args
+                added_metadatas = call_args[0][2]  # Third positional argument
                 
                 # Check that metadata was applied
-                for doc in added_docs:
-                    assert doc.metadata['language'] == "en"
-                    assert doc.metadata['domain'] == "Healthcare"
-                    assert doc.metadata['section'] == "Patient Care"
-                    assert doc.metadata['topic'] == "Diagnostics"
-                    assert doc.metadata['doc_type'] == "policy"
+                for metadata in added_metadatas:
+                    assert metadata['language'] == "en"
+                    assert metadata['domain'] == "Healthcare"
+                    assert metadata['section'] == "Patient Care"
+                    assert metadata['topic'] == "Diagnostics"
+                    assert metadata['doc_type'] == "policy"
         finally:
             Path(temp_path).unlink(missing_ok=True)
     
@@ -329,4 +339,224 @@ class TestMetadataFiltering:
         vectorstore = mock_vs.return_value
         results = retrieval("test query", filter_data, vectorstore)
         
-        assert results == []
\ No newline at end of file
+        assert results == []
+
+# ============================================================================
+# DEDUPLICATION & UPSERT TESTS
+# ============================================================================
+
+class TestDeduplication:
+    """Tests for content-hash ids and idempotent ingestion"""
+
+    def test_chunk_ids_are_deterministic(self, sample_text, sample_metadata):
+        """Test that chunking the same content twice yields the same ids"""
+        doc = Document(page_content=sample_text, metadata={"source": "a.txt"})
+
+        first = get_chunks([doc], sample_metadata)
+        second = get_chunks([doc], sample_metadata)
+
+        assert [c.metadata["chunk_id"] for c in first] == [c.metadata["chunk_id"] for c in second]
+        assert len({c.metadata["doc_id"] for c in first}) == 1
+
+    def test_identical_files_loaded_once(self):
+        """Test that byte-identical files are only loaded once"""
+        paths = []
+        for _ in range(2):
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+                f.write("Same content in both files.")
+                paths.append(f.name)
+        try:
+            docs = load_documents(paths)
+
+            assert len(docs) == 1
+            assert docs[0].metadata["doc_id"]
+        finally:
+            for path in paths:
+                Path(path).unlink(missing_ok=True)
+
+    def test_ingest_skips_existing_and_upserts_new(self, sample_metadata):
+        """Test that already-indexed chunks are not re-embedded"""
+        chunks = get_chunks(
+            [Document(page_content="First document.", metadata={}),
+             Document(page_content="Second document.", metadata={})],
+            sample_metadata,
+        )
+        mock_store = Mock()
+        mock_store._primary_field = "pk"
+        mock_store.get_pks.return_value = [chunks[0].metadata["chunk_id"]]
+        mock_store.embeddings.embed_documents.side_effect = fake_embed
+        mock_store._prepare_insert_list.return_value = [{"pk": chunks[1].metadata["chunk_id"]}]
+
+        message = ingest_documents(chunks, mock_store)
+
+        mock_store.embeddings.embed_documents.assert_called_once_with([chunks[1].page_content])
+        prepared = mock_store._prepare_insert_list.call_args
+        assert prepared[1]["ids"] == [chunks[1].metadata["chunk_id"]]
+        assert prepared[1]["force_ids"] is True
+        mock_store.client.upsert.assert_called_once()
+        assert "1 unchanged" in message
+
+    def test_ingest_no_changes_skips_write(self, sample_metadata):
+        """Test that re-ingesting identical chunks performs no writes"""
+        chunks = get_chunks([Document(page_content="Only document.", metadata={})], sample_metadata)
+        mock_store = Mock()
+        mock_store._primary_field = "pk"
+        mock_store.get_pks.return_value = [c.metadata["chunk_id"] for c in chunks]
+
+        ingest_documents(chunks, mock_store)
+
+        assert not mock_store.embeddings.embed_documents.called
+        assert not mock_store.client.upsert.called
+        assert not mock_store.add_embeddings.called
+
+
+# ============================================================================
+# AUTO-CLASSIFICATION TESTS
+# ============================================================================
+
+class KeywordEmbeddings:
+    """Embeddings stub placing texts on one axis per keyword"""
+
+    KEYWORDS = ["cardio", "billing", "radiology", "pharmacy"]
+
+    def embed_documents(self, texts):
+        return [[1.0 if k in text.lower() else 0.01 for k in self.KEYWORDS] for text in texts]
+
+
+class TestHierarchyClassifier:
+    """Tests for nearest-centroid hierarchy classification"""
+
+    hierarchy = {"domains": ["Cardio", "Billing"], "sections": ["Radiology", "Pharmacy"], "topics": []}
+
+    def test_assigns_nearest_labels(self):
+        """Test that each level picks the closest label centroid"""
+        classifier = HierarchyClassifier(self.hierarchy, KeywordEmbeddings())
+        vectors = KeywordEmbeddings().embed_documents(["cardio radiology scan", "billing pharmacy invoice"])
+
+        labels = classifier.classify(vectors)
+
+        assert labels[0]["domain"] == "Cardio" and labels[0]["section"] == "Radiology"
+        assert labels[1]["domain"] == "Billing" and labels[1]["section"] == "Pharmacy"
+        assert "topic" not in labels[0]
+        assert 0.5 < labels[0]["label_confidence"] <= 1.0
+
+    def test_tree_keeps_labels_under_their_parent(self):
+        """Test that a section is only picked among the children of the chosen domain"""
+        hierarchy = {"tree": {"Cardio": {"Radiology": ["Billing"]}, "Billing": ["Pharmacy"]}}
+        classifier = HierarchyClassifier(hierarchy, KeywordEmbeddings())
+        vectors = KeywordEmbeddings().embed_documents(["cardio pharmacy", "billing radiology", "billing pharmacy"])
+
+        labels = classifier.classify(vectors)
+
+        assert [(label["domain"], label["section"]) for label in labels] == [
+            ("Cardio", "Radiology"), ("Billing", "Pharmacy"), ("Billing", "Pharmacy"),
+        ]
+        assert labels[0]["topic"] == "Billing"
+        assert labels[1]["topic"] is None and labels[2]["topic"] is None
+        assert classifier.labels["section"] == ["Pharmacy", "Radiology"]
+
+    def test_ambiguous_text_has_low_confidence(self):
+        """Test that a chunk equally close to all labels gets low confidence"""
+        classifier = HierarchyClassifier(self.hierarchy, KeywordEmbeddings())
+
+        labels = classifier.classify([[1.0, 1.0, 1.0, 1.0]])
+
+        assert labels[0]["label_confidence"] == pytest.approx(0.5, abs=0.01)
+
+    def test_ingest_reuses_chunk_embeddings(self, sample_metadata):
+        """Test that ingestion labels chunks without extra embedding calls per chunk"""
+        chunks = get_chunks([Document(page_content="Billing and pharmacy invoices.", metadata={})], sample_metadata)
+        assert chunks[0].metadata["label_confidence"] == 1.0
+        embeddings = Mock(wraps=KeywordEmbeddings())
+        classifier = HierarchyClassifier(self.hierarchy, embeddings, temperature=1.0)
+        mock_store = Mock()
+        mock_store.col = None
+        mock_store.embeddings = embeddings
+
+        ingest_documents(chunks, mock_store, classifier=classifier)
+
+        # Two centroid calls at construction plus one batch for the chunks
+        assert embeddings.embed_documents.call_count == 3
+        metadatas = mock_store.add_embeddings.call_args[0][2]
+        assert metadatas[0]["domain"] == "Billing"
+        assert metadatas[0]["section"] == "Pharmacy"
+        assert metadatas[0]["topic"] == "Diagnostics"
+        assert metadatas[0]["label_confidence"] < 1.0
+
+
+# ============================================================================
+# DELETE / REPLACE TESTS
+# ============================================================================
+
+class TestDocumentLifecycle:
+    """Tests for deleting, replacing and compacting documents"""
+
+    def make_store(self):
+        mock_store = Mock()
+        mock_store.collection_name = "hospital"
+        mock_store._primary_field = "pk"
+        mock_store._text_field = "text"
+        mock_store._vector_field = "vector"
+        mock_store.get_pks.return_value = []
+        mock_store.client.delete.return_value = {"delete_count": 3}
+        mock_store.embeddings.embed_documents.side_effect = fake_embed
+        mock_store._prepare_insert_list.return_value = []
+        return mock_store
+
+    def test_delete_by_doc_id_and_source_name(self):
+        """Test that deletes filter on either doc_id or source_name"""
+        mock_store = self.make_store()
+
+        deleted = delete_documents(mock_store, doc_ids=["d1"], source_names=['a "b".pdf'])
+
+        assert deleted == 3
+        expr = mock_store.client.delete.call_args[1]["filter"]
+        assert expr == '(doc_id in ["d1"]) or (source_name in ["a \\"b\\".pdf"])'
+
+    def test_delete_without_selector_is_noop(self):
+        mock_store = self.make_store()
+
+        assert delete_documents(mock_store) == 0
+        assert not mock_store.client.delete.called
+
+    def test_compaction_triggered_after_threshold(self, monkeypatch):
+        """Test that enough deletes trigger a collection compaction"""
+        monkeypatch.setattr("src.core.ingest.COMPACT_AFTER_DELETES", 5)
+        mock_store = self.make_store()
+        mock_store.collection_name = "compact_test"
+
+        delete_documents(mock_store, doc_ids=["d1"])
+        assert not mock_store.client.compact.called
+        delete_documents(mock_store, doc_ids=["d2"])
+        mock_store.client.compact.assert_called_once_with("compact_test")
+
+    def test_replace_reuses_unchanged_embeddings(self, sample_metadata):
+        """Test that replacing a document only embeds changed chunks and drops the old version"""
+        chunks = get_chunks(
+            [Document(page_content="Unchanged intro.\n\n" + "Updated body. " * 120, metadata={"source": "/tmp/a.txt"})],
+            sample_metadata,
+        )
+        mock_store = self.make_store()
+        mock_store.client.query.return_value = [{"text": chunks[0].page_content, "vector": [9.0, 9.0]}]
+
+        message = replace_documents(chunks, mock_store)
+
+        embedded = [t for call in mock_store.embeddings.embed_documents.call_args_list for t in call[0][0]]
+        assert chunks[0].page_content not in embedded
+        assert len(embedded) == len(chunks) - 1
+        stale = mock_store.client.delete.call_args[1]["filter"]
+        assert 'source_name in ["a.txt"]' in stale
+        assert f'doc_id not in ["{chunks[0].metadata["doc_id"]}"]' in stale
+        assert "1 reused" in message
+
+    def test_replace_counts_only_written_reuses(self, sample_metadata):
+        """Test that chunks skipped as already stored are not reported as reused"""
+        chunks = get_chunks([Document(page_content="Unchanged policy text.", metadata={"source": "/tmp/a.txt"})], sample_metadata)
+        mock_store = self.make_store()
+        mock_store.get_pks.return_value = [chunks[0].metadata["chunk_id"]]
+        mock_store.client.query.return_value = [{"text": chunks[0].page_content, "vector": [9.0, 9.0]}]
+
+        message = replace_documents(chunks, mock_store)
+
+        assert "0 chunks written (0 reused" in message
+        assert mock_store.get_pks.call_args[0][0] == f'pk in ["{chunks[0].metadata["chunk_id"]}"]'
@@ -17,7 +17,9 @@ class TestIntegration:
         """Test complete ingestion and retrieval workflow"""
         # Setup mock vectorstore
         mock_vs = Mock()
-        mock_vs.add_documents = Mock()
+        mock_vs.add_embeddings = Mock()
+        mock_vs.col = None  # fresh collection
+        mock_vs.embeddings.embed_documents.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
         mock_vs.similarity_search_with_relevance_scores.return_value = [
             (Document(page_content="Test result", metadata={}), 0.9)
         ]
@@ -46,7 +48,7 @@ class TestIntegration:
 
             
             assert "Ingested" in result
-            assert mock_vs.add_documents.called
+            assert mock_vs.add_embeddings.called
             
             # Step 2: Retrieve
             filter_data = MetaData(language="en", domain="Healthcare")
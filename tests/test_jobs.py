@@ -0,0 +1,172 @@
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.core.index import MetaData
+from src.core.jobs import JobManager, IngestJob
+
+
+def fake_embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Mock vectorstore returned by get_vectorstore inside the job worker"""
+    mock_store = Mock()
+    mock_store.col = None
+    mock_store.collection_name = "hospital"
+    mock_store.embeddings.embed_documents.side_effect = fake_embed
+    monkeypatch.setattr("src.core.jobs.get_vectorstore", lambda name: mock_store)
+    return mock_store
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """A text file long enough for several chunks"""
+    path = tmp_path / "policy.txt"
+    path.write_text("\n\n".join(f"Paragraph {i}. " + "Patient care policy text. " * 40 for i in range(4)))
+    return path
+
+
+@pytest.fixture
+def metadata():
+    return MetaData(language="en", domain="Healthcare", section="Patient Care", topic="Diagnostics", doc_type="policy")
+
+
+def written_ids(store):
+    return [pk for call in store.add_embeddings.call_args_list for pk in call[1]["ids"]]
+
+
+# ============================================================================
+# INGESTION JOB TESTS
+# ============================================================================
+
+class TestJobManager:
+    """Tests for background ingestion jobs"""
+
+    def test_job_runs_to_completion(self, tmp_path, store, sample_file, metadata):
+        """Test that a job ingests every chunk and reports progress"""
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+
+        job = manager.submit([str(sample_file)], "hospital", metadata)
+        status = manager.wait(job.job_id, timeout=30)
+
+        assert status["status"] == "completed"
+        assert status["progress"] == 1.0
+        assert status["chunks_written"] == len(written_ids(store)) > 1
+        assert (tmp_path / "jobs" / job.job_id / "job.json").exists()
+
+    def test_uploaded_files_are_copied(self, tmp_path, store, sample_file, metadata):
+        """Test that jobs keep their own copy of the uploaded files"""
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+
+        job = manager.submit([str(sample_file)], "hospital", metadata)
+        manager.wait(job.job_id, timeout=30)
+
+        assert Path(job.files[0]).name == "policy.txt"
+        assert Path(job.files[0]).read_text() == sample_file.read_text()
+
+    def test_resume_skips_committed_chunks(self, tmp_path, store, sample_file, metadata):
+        """Test that an interrupted job re-chunks its file and embeds only uncommitted chunks"""
+        first = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+        job = first.submit([str(sample_file)], "hospital", metadata)
+        first.wait(job.job_id, timeout=30)
+        all_ids = written_ids(store)
+
+        # Simulate a crash after the first batch of the file was committed
+        store.col = Mock()
+        store._primary_field = "pk"
+        store.get_pks.side_effect = lambda expr: [pk for pk in all_ids[:1] if pk in expr]
+        store._prepare_insert_list.side_effect = lambda texts, vectors, metadatas, ids, force_ids: [{"pk": pk} for pk in ids]
+        store.embeddings.embed_documents.reset_mock()
+        crashed = IngestJob(
+            "crashed", "hospital", job.files, metadata.model_dump(),
+            status="running", file_started=True, batches_done=1, file_written=1, chunks_written=1,
+        )
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+        manager._save(crashed)
+
+        assert manager.resume() == ["crashed"]
+        status = manager.wait("crashed", timeout=30)
+
+        assert status["status"] == "completed"
+        assert [call[1]["ids"][0] for call in store._prepare_insert_list.call_args_list] == all_ids[1:]
+        assert store.embeddings.embed_documents.call_count == len(all_ids) - 1
+        assert (status["chunks_written"], status["chunks_skipped"]) == (len(all_ids), 0)
+
+    def test_resume_keeps_cross_file_duplicates_dropped(self, tmp_path, store, sample_file, metadata):
+        """Test that a job resumed in its second file still drops copies of the first"""
+        copy = tmp_path / "copy.txt"
+        copy.write_text(sample_file.read_text().replace("Paragraph 0.", "Section 0."))
+        reference = JobManager(jobs_dir=str(tmp_path / "reference"), batch_size=1)
+        job = reference.submit([str(sample_file)], "hospital", metadata, dedup_mode="drop")
+        reference.wait(job.job_id, timeout=30)
+        first_file = len(written_ids(store))
+        store.add_embeddings.reset_mock()
+        job = reference.submit([str(sample_file), str(copy)], "hospital", metadata, dedup_mode="drop")
+        reference.wait(job.job_id, timeout=30)
+        expected = written_ids(store)[first_file:]
+
+        # the process dies while writing the second file
+        def crash_in_second_file(*args, **kwargs):
+            if store.add_embeddings.call_count > first_file:
+                raise RuntimeError("crash")
+
+        store.add_embeddings.reset_mock()
+        store.add_embeddings.side_effect = crash_in_second_file
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+        job = manager.submit([str(sample_file), str(copy)], "hospital", metadata, dedup_mode="drop")
+        assert manager.wait(job.job_id, timeout=30)["status"] == "failed"
+        crashed = manager._load(job.job_id)
+        crashed.status = "running"
+        manager._save(crashed)
+        store.add_embeddings.reset_mock()
+        store.add_embeddings.side_effect = None
+
+        resumed = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+        assert resumed.resume() == [job.job_id]
+        status = resumed.wait(job.job_id, timeout=30)
+
+        assert status["status"] == "completed"
+        assert written_ids(store) == expected
+
+    def test_cancel_stops_between_batches(self, tmp_path, store, sample_file, metadata):
+        """Test that cancellation keeps committed batches and stops the rest"""
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"), batch_size=1)
+        # Cancel as soon as the first batch is written
+        store.add_embeddings.side_effect = lambda *args, **kwargs: [e.set() for e in manager.cancel_events.values()]
+
+        job = manager.submit([str(sample_file)], "hospital", metadata)
+        status = manager.wait(job.job_id, timeout=30)
+
+        assert status["status"] == "cancelled"
+        assert status["chunks_written"] == 1
+        assert status["progress"] < 1.0
+
+    def test_near_duplicates_counted_across_files(self, tmp_path, store, sample_file, metadata):
+        """Test that boilerplate repeated in another file is reported in the job status"""
+        copy = tmp_path / "copy.txt"
+        copy.write_text(sample_file.read_text().replace("Paragraph 0.", "Section 0."))
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+
+        job = manager.submit([str(sample_file), str(copy)], "hospital", metadata, dedup_mode="drop")
+        status = manager.wait(job.job_id, timeout=30)
+
+        assert status["chunks_near_duplicate"] >= 1
+        assert status["chunks_written"] == len(written_ids(store))
+
+    def test_cancel_persisted_job_prevents_resume(self, tmp_path, metadata):
+        """Test that cancelling a job from a previous process marks it cancelled on disk"""
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+        manager._save(IngestJob("old", "hospital", [], metadata.model_dump(), status="queued"))
+
+        assert manager.cancel("old")
+        assert manager.resume() == []
+        assert manager.status("old")["status"] == "cancelled"
+
+    def test_unknown_job(self, tmp_path):
+        manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+
+        assert manager.status("missing") is None
+        assert not manager.cancel("missing")
@@ -0,0 +1,231 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.core import index
+from src.core.index import MetaData, get_vectorstore, rebuild_collection
+from src.core.ingest import get_chunks, ingest_documents, delete_documents, compact_collection
+from src.core.numpy_store import NumpyClient, NumpyVectorStore, parse_filter, open_collection
+from src.core.retrieval import retrieval
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "numpy_store")
+
+
+@pytest.fixture
+def store(root):
+    """Store with three rows on two domains"""
+    vectorstore = NumpyVectorStore(DeterministicFakeEmbedding(size=8), "hospital", root=root)
+    vectors = np.eye(8, dtype=np.float32)[:3]
+    vectorstore.add_embeddings(
+        ["cardiology", "radiology", "loans"],
+        vectors.tolist(),
+        [
+            {"domain": "Healthcare", "hierarchy_path": "Healthcare/Cardiology/", "start_index": 0},
+            {"domain": "Healthcare", "hierarchy_path": "Healthcare/Radiology/", "start_index": 10},
+            {"domain": "Finance", "hierarchy_path": "Finance/Loans/", "start_index": 20},
+        ],
+        ids=["a", "b", "c"],
+    )
+    return vectorstore
+
+
+@pytest.fixture
+def numpy_backend(tmp_path, monkeypatch):
+    """get_vectorstore backed by the numpy store in a temp directory"""
+    monkeypatch.setattr(index, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(index, "COLLECTION_ALIASES_PATH", str(tmp_path / "aliases.json"))
+    monkeypatch.setattr("src.core.numpy_store.NUMPY_STORE_DIR", str(tmp_path / "numpy_store"))
+    return tmp_path
+
+
+def pks(store, expr):
+    return sorted(store.get_pks(expr))
+
+
+# ============================================================================
+# FILTER EXPRESSION TESTS
+# ============================================================================
+
+class TestFilterExpressions:
+    """Tests for the Milvus filter syntax evaluated as NumPy masks"""
+
+    def test_parse_precedence(self):
+        tree = parse_filter('a == "x" or b == 1 and not (c in [1, 2])')
+
+        assert tree[0] == "or"
+        assert tree[2][0] == "and"
+        assert tree[2][2] == ("not", ("pred", "in", "c", [1, 2]))
+
+    def test_invalid_filter(self):
+        with pytest.raises(ValueError):
+            parse_filter('domain === "x"')
+
+    @pytest.mark.parametrize("expr, expected", [
+        ('domain == "Healthcare"', ["a", "b"]),
+        ('domain != "Healthcare"', ["c"]),
+        ('domain == "Unknown"', []),
+        ('hierarchy_path like "Healthcare/%"', ["a", "b"]),
+        ('hierarchy_path like "%Loans/"', ["c"]),
+        ("pk in ['a', 'c']", ["a", "c"]),
+        ('domain in ["Finance"] or start_index >= 10', ["b", "c"]),
+        ('domain not in ["Finance"]', ["a", "b"]),
+        ('(domain == "Healthcare") and not (start_index < 5)', ["b"]),
+    ])
+    def test_masks(self, store, expr, expected):
+        assert pks(store, expr) == expected
+
+    def test_unknown_field(self, store):
+        with pytest.raises(ValueError):
+            store.get_pks('language == "en"')
+
+
+# ============================================================================
+# NUMPY STORE TESTS
+# ============================================================================
+
+class TestNumpyVectorStore:
+    """Tests for the in-process vector store"""
+
+    def test_search_with_filter(self, store):
+        query = np.eye(8, dtype=np.float32)[1] + 0.1 * np.eye(8, dtype=np.float32)[0]
+
+        results = store.similarity_search_with_score_by_vector(query.tolist(), k=2, expr='domain == "Healthcare"')
+
+        assert [doc.page_content for doc, _ in results] == ["radiology", "cardiology"]
+        assert results[0][0].metadata["pk"] == "b"
+        assert results[0][0].metadata["start_index"] == 10
+        assert results[0][1] == pytest.approx(0.01, abs=1e-5)
+
+    def test_relevance_scores(self, store):
+        """Test that squared L2 distances map to relevance like langchain_milvus"""
+        relevance = store._select_relevance_score_fn()
+        query = np.eye(8, dtype=np.float32)[2]
+        store.embedding_func = type("Fixed", (), {"embed_query": lambda self, text: query.tolist()})()
+
+        results = store.similarity_search_with_relevance_scores("loans", k=3)
+
+        assert relevance(0.0) == 1.0 and relevance(4.0) == 0.0
+        assert [doc.page_content for doc, _ in results][0] == "loans"
+        assert [score for _, score in results] == [1.0, 0.5, 0.5]
+
+    def test_upsert_replaces_row(self, store):
+        store.client.upsert("hospital", store._prepare_insert_list(
+            ["cardiology v2"], [[[0.0] * 7 + [1.0]]], [{"domain": "Healthcare"}], ids=["a"], force_ids=True
+        ))
+
+        rows = store.client.query("hospital", filter="pk == 'a'", output_fields=["text"])
+
+        assert rows == [{"pk": "a", "text": "cardiology v2"}]
+        assert store.client.query("hospital", output_fields=["count(*)"]) == [{"count(*)": 3}]
+
+    def test_delete_and_compact(self, store, root):
+        assert store.client.delete("hospital", filter='domain == "Finance"') == {"delete_count": 1}
+        assert store.similarity_search("loans", k=5, expr='domain == "Finance"') == []
+
+        store.client.compact("hospital")
+
+        collection = open_collection(store.client.root / "hospital")
+        assert collection.count == 2
+        assert pks(store, "") == ["a", "b"]
+
+    def test_reload_from_disk(self, store, root):
+        store.client.delete("hospital", ids=["b"])
+        # a fresh process replays the log into new arrays
+        from src.core import numpy_store
+        numpy_store._collections.clear()
+
+        reopened = NumpyVectorStore(DeterministicFakeEmbedding(size=8), "hospital", root=root)
+
+        assert pks(reopened, 'domain == "Healthcare"') == ["a"]
+        assert reopened.fields[:3] == ["pk", "text", "vector"]
+        assert "hierarchy_path" in reopened.fields
+
+    def test_grows_past_initial_capacity(self, root, monkeypatch):
+        monkeypatch.setattr("src.core.numpy_store.INITIAL_CAPACITY", 4)
+        vectorstore = NumpyVectorStore(DeterministicFakeEmbedding(size=8), "big", root=root)
+        vectors = np.random.default_rng(0).standard_normal((10, 8)).tolist()
+
+        vectorstore.add_embeddings([str(i) for i in range(10)], vectors, [{"n": i} for i in range(10)], batch_size=3, ids=[str(i) for i in range(10)])
+
+        results = vectorstore.similarity_search_by_vector(vectors[7], k=1)
+        assert results[0].page_content == "7"
+        assert pks(vectorstore, "n > 7") == ["8", "9"]
+
+    @pytest.mark.parametrize("precision", ["float16", "int8", "binary"])
+    def test_reduced_precision_rescores_exactly(self, root, monkeypatch, precision):
+        """Test that a compact scan returns the exact float128 neighbours and distances"""
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((300, 128)).astype(np.float128)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = vectors[:5] + 0.05 * rng.standard_normal((5, 128)).astype(np.float128)
+        ids = [str(i) for i in range(300)]
+        exact = NumpyVectorStore(DeterministicFakeEmbedding(size=128), "exact", root=root)
+        exact.add_embeddings(ids, vectors.tolist(), [{"n": i} for i in range(300)], ids=ids)
+        monkeypatch.setattr("src.core.numpy_store.NUMPY_VECTOR_PRECISION", precision)
+        compact = NumpyVectorStore(DeterministicFakeEmbedding(size=128), "compact", root=root)
+        compact.add_embeddings(ids[:200], vectors[:200].tolist(), [{"n": i} for i in range(200)], ids=ids[:200])
+        compact.similarity_search_by_vector(queries[0].tolist(), k=1)
+        compact.add_embeddings(ids[200:], vectors[200:].tolist(), [{"n": i} for i in range(200, 300)], ids=ids[200:])
+
+        for query in queries:
+            expected = exact.similarity_search_with_score_by_vector(query.tolist(), k=3, expr="n >= 1")
+            results = compact.similarity_search_with_score_by_vector(query.tolist(), k=3, expr="n >= 1")
+            assert results[0][0].page_content == expected[0][0].page_content
+            for doc, score in results:
+                assert doc.metadata["n"] >= 1
+                assert score == pytest.approx(float(np.sum((vectors[doc.metadata["n"]] - query) ** 2)), abs=1e-5)
+        assert compact.collection.precision == precision
+        assert len(compact.collection.quantized) == 300
+
+    def test_unknown_precision(self, root, monkeypatch):
+        monkeypatch.setattr("src.core.numpy_store.NUMPY_VECTOR_PRECISION", "int4")
+
+        with pytest.raises(ValueError):
+            open_collection(Path(root) / "bad")
+
+    def test_new_collection_has_no_col(self, root):
+        vectorstore = NumpyVectorStore(DeterministicFakeEmbedding(size=8), "empty", root=root)
+
+        assert vectorstore.col is None
+        assert vectorstore.get_pks("pk in ['a']") is None
+        assert not NumpyClient(root).has_collection("empty")
+
+
+class TestNumpyBackend:
+    """Tests for the numpy backend behind get_vectorstore"""
+
+    def test_ingest_retrieve_delete(self, numpy_backend):
+        vectorstore = get_vectorstore("hospital", embeddings=DeterministicFakeEmbedding(size=8))
+        assert isinstance(vectorstore, NumpyVectorStore)
+        for domain in ["Healthcare", "Finance"]:
+            chunks = get_chunks(
+                [Document(page_content=f"{domain} policy document.", metadata={"source": f"{domain}.txt"})],
+                MetaData(language="en", domain=domain, section="Policies", doc_type="policy"),
+            )
+            ingest_documents(chunks, vectorstore)
+        # a second ingest of the same chunks writes nothing
+        assert "Ingested 0 documents" in ingest_documents(chunks, vectorstore)
+
+        results = retrieval("policy", MetaData(language="en", domain="Finance", section="Policies"), vectorstore)
+
+        assert [doc.page_content for doc in results] == ["Finance policy document."]
+        assert results[0].metadata["hierarchy_path"] == "Finance/Policies/"
+        assert delete_documents(vectorstore, source_names=["Finance.txt"]) == 1
+        assert compact_collection(vectorstore) == 0
+        assert retrieval("policy", MetaData(language="en", domain="Finance"), vectorstore) == []
+
+    def test_rebuild_swaps_alias(self, numpy_backend):
+        embeddings = DeterministicFakeEmbedding(size=8)
+        for text in ["first", "second"]:
+            with rebuild_collection("faq", embeddings=embeddings) as vectorstore:
+                vectorstore.add_texts([text], [{"domain": "FAQ"}], ids=[text])
+
+        results = get_vectorstore("faq", embeddings=embeddings).similarity_search("anything", k=5)
+
+        assert [doc.page_content for doc in results] == ["second"]
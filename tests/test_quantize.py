@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src.core.quantize import QuantizedVectors, normalize, truncate
+
+
+@pytest.fixture
+def vectors():
+    """Clustered unit vectors, like embeddings of related chunks"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, 64), dtype=np.float32)
+    return normalize(centers[rng.integers(0, 20, 2000)] + 0.3 * rng.standard_normal((2000, 64), dtype=np.float32))
+
+
+def recall(index, exact, queries, k=5):
+    found = [set(index.search(q, k)[0]) for q in queries]
+    expected = [set(exact.search(q, k)[0]) for q in queries]
+    return np.mean([len(f & e) / k for f, e in zip(found, expected)])
+
+
+# ============================================================================
+# QUANTIZATION TESTS
+# ============================================================================
+
+class TestTruncate:
+    """Tests for Matryoshka-style dimension truncation"""
+
+    def test_truncated_vectors_are_unit_length(self, vectors):
+        short = truncate(vectors * 3, 16)
+
+        assert short.shape == (2000, 16)
+        np.testing.assert_allclose(np.linalg.norm(short, axis=1), 1.0, rtol=1e-5)
+
+    def test_cannot_grow(self, vectors):
+        with pytest.raises(ValueError):
+            truncate(vectors, 128)
+
+
+class TestQuantizedVectors:
+    """Tests for reduced-precision candidate search with rescoring"""
+
+    def test_float32_is_exact(self, vectors):
+        indices, scores = QuantizedVectors(vectors).search(vectors[7], 3)
+
+        assert indices[0] == 7
+        assert scores[0] == pytest.approx(1.0, abs=1e-5)
+        assert list(scores) == sorted(scores, reverse=True)
+
+    @pytest.mark.parametrize("precision, bytes_per_vector", [("float16", 128), ("int8", 64), ("binary", 8)])
+    def test_memory(self, vectors, precision, bytes_per_vector):
+        index = QuantizedVectors(vectors, precision)
+
+        assert index.codes.nbytes == 2000 * bytes_per_vector
+        assert len(index) == 2000
+
+    # one bit per component needs a much deeper candidate list
+    @pytest.mark.parametrize("precision, rescore", [("float16", 4), ("int8", 4), ("binary", 40)])
+    def test_rescoring_recovers_recall(self, vectors, precision, rescore):
+        queries = vectors[:50]
+        exact = QuantizedVectors(vectors)
+
+        assert recall(QuantizedVectors(vectors, precision, rescore), exact, queries) >= 0.95
+
+    def test_rescoring_beats_binary_ranking(self, vectors):
+        queries = vectors[:50]
+        exact = QuantizedVectors(vectors)
+
+        plain = recall(QuantizedVectors(vectors, "binary", rescore=0), exact, queries)
+        rescored = recall(QuantizedVectors(vectors, "binary", rescore=10), exact, queries)
+
+        assert rescored > plain
+
+    def test_full_precision_rows_may_stay_on_disk(self, vectors, tmp_path):
+        np.save(tmp_path / "vectors.npy", vectors)
+        on_disk = np.load(tmp_path / "vectors.npy", mmap_mode="r")
+
+        indices, scores = QuantizedVectors(on_disk, "int8").search(vectors[3], 1)
+
+        assert indices[0] == 3
+        assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+    @pytest.mark.parametrize("precision", ["float32", "int8", "binary"])
+    def test_mask_restricts_results(self, vectors, precision):
+        mask = np.zeros(len(vectors), dtype=bool)
+        mask[1::2] = True
+
+        indices, scores = QuantizedVectors(vectors, precision, rescore=10).search(vectors[8], 5, mask=mask)
+        exact = np.flatnonzero(mask)[np.argsort(-(vectors[mask] @ vectors[8]))[:5]]
+
+        assert all(mask[indices]) and 8 not in indices
+        assert len(set(indices) & set(exact)) >= 4
+        assert list(scores) == sorted(scores, reverse=True)
+
+    def test_unknown_precision(self, vectors):
+        with pytest.raises(ValueError):
+            QuantizedVectors(vectors, "int4")
@@ -2,8 +2,13 @@ from unittest.mock import Mock, patch
 import pytest
 
 from langchain_core.documents import Document
-from src.core.index import MetaData
-from src.core.retrieval import retrieval, generate, reranker
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.core import index
+from src.core.index import MetaData, hierarchy_path, get_vectorstore
+from src.core.ingest import get_chunks, ingest_documents
+from src.core.retrieval import retrieval, generate, reranker, stored_vectors_of
+from src.core.gencache import GenerationCache
 
 @pytest.fixture
 def sample_metadata():
@@ -155,3 +160,129 @@ class TestRetrieval:
         
         assert mock_model.invoke.called
 
+    @patch('src.core.retrieval.model')
+    def test_generate_with_cache(self, mock_model, tmp_path):
+        """Test that an identical prompt for the same model is answered from the cache"""
+        mock_model.model_name = "gpt-5-nano"
+        mock_model.invoke.return_value.content = "Generated answer"
+        cache = GenerationCache(str(tmp_path / "generations.sqlite"))
+        docs = [Document(page_content="Context document 1")]
+
+        first = generate("What is the policy?", docs, cache=cache)
+        second = generate("What is the policy?", docs, cache=cache)
+        generate("What is the policy?", [Document(page_content="Context document 2")], cache=cache)
+
+        assert first == second == "Generated answer"
+        assert mock_model.invoke.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+
+
+# ============================================================================
+# HIERARCHY PATH FILTER TESTS
+# ============================================================================
+
+class TestHierarchyPathFilter:
+    """Tests for prefix filtering on the materialized hierarchy path"""
+
+    def make_store(self, fields):
+        mock_store = Mock()
+        mock_store.fields = fields
+        mock_store.similarity_search_with_relevance_scores.return_value = []
+        return mock_store
+
+    def test_hierarchy_path_stops_at_first_unset_level(self):
+        assert hierarchy_path({"domain": "Healthcare", "section": "Patient Care", "topic": "Diagnostics"}) == "Healthcare/Patient Care/Diagnostics/"
+        assert hierarchy_path({"domain": "Healthcare", "section": None, "topic": "Diagnostics"}) == "Healthcare/"
+        assert hierarchy_path({}) == ""
+
+    @pytest.mark.parametrize("section, topic, expected", [
+        (None, None, 'hierarchy_path like "Healthcare/%"'),
+        ("Patient Care", None, 'hierarchy_path like "Healthcare/Patient Care/%"'),
+        ("Patient Care", "Diagnostics", 'hierarchy_path like "Healthcare/Patient Care/Diagnostics/%"'),
+    ])
+    def test_single_prefix_predicate_at_any_depth(self, section, topic, expected):
+        mock_store = self.make_store(["text", "pk", "vector", "domain", "hierarchy_path"])
+
+        retrieval("query", MetaData(language="en", domain="Healthcare", section=section, topic=topic), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert expr == f'language == "en" and {expected}'
+
+    def test_gap_in_hierarchy_uses_conjunction(self):
+        mock_store = self.make_store(["hierarchy_path"])
+
+        retrieval("query", MetaData(language="en", domain="Healthcare", topic="Diagnostics"), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert "hierarchy_path" not in expr
+        assert 'topic == "Diagnostics"' in expr
+
+    def test_wildcard_label_uses_conjunction(self):
+        mock_store = self.make_store(["hierarchy_path"])
+
+        retrieval("query", MetaData(language="en", domain="Lab_Results"), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert expr == 'language == "en" and domain == "Lab_Results"'
+
+    def test_collection_without_path_field_uses_conjunction(self):
+        mock_store = self.make_store(["text", "pk", "vector", "domain"])
+
+        retrieval("query", MetaData(language="en", domain="Healthcare"), mock_store)
+
+        expr = mock_store.similarity_search_with_relevance_scores.call_args[1]["expr"]
+        assert expr == 'language == "en" and domain == "Healthcare"'
+
+
+# ============================================================================
+# STORED VECTOR TESTS
+# ============================================================================
+
+@pytest.fixture
+def milvus_store(tmp_path, monkeypatch):
+    """Milvus Lite vectorstore with two policy chunks"""
+    monkeypatch.setattr(index, "MILVUS_URI", str(tmp_path / "milvus.db"))
+    monkeypatch.setattr(index, "COLLECTION_ALIASES_PATH", str(tmp_path / "aliases.json"))
+    vectorstore = get_vectorstore("hospital", embeddings=DeterministicFakeEmbedding(size=8))
+    for domain in ["Healthcare", "Finance"]:
+        chunks = get_chunks(
+            [Document(page_content=f"{domain} policy document.", metadata={"source": f"{domain}.txt"})],
+            MetaData(language="en", domain=domain, section="Policies", topic="General", doc_type="policy"),
+        )
+        ingest_documents(chunks, vectorstore)
+    return vectorstore
+
+
+class TestStoredVectors:
+    """Tests for searching by a precomputed query vector and reading back stored vectors"""
+
+    def test_search_by_query_vector_matches_text_search(self, milvus_store):
+        filters = MetaData(language="en")
+        query_vector = milvus_store.embeddings.embed_query("policy")
+
+        by_text = retrieval("policy", filters, milvus_store)
+        by_vector = retrieval("policy", filters, milvus_store, query_vector=query_vector)
+
+        assert [d.page_content for d in by_vector] == [d.page_content for d in by_text]
+        assert [d.metadata["similarity_score"] for d in by_vector] == pytest.approx(
+            [d.metadata["similarity_score"] for d in by_text], abs=1e-5
+        )
+
+    def test_stored_vectors_are_not_re_embedded(self, milvus_store):
+        docs = retrieval("policy", MetaData(language="en"), milvus_store)
+        expected = milvus_store.embeddings.embed_documents([doc.page_content for doc in docs])
+        milvus_store.embedding_func = Mock(wraps=milvus_store.embeddings)
+
+        vectors = stored_vectors_of(docs, milvus_store)
+
+        assert vectors.shape == (2, 8)
+        np.testing.assert_allclose(vectors, expected, rtol=1e-5)
+        assert not milvus_store.embedding_func.embed_documents.called
+
+    def test_documents_without_primary_key_are_embedded(self, milvus_store):
+        docs = [Document(page_content="Finance policy document.")]
+
+        vectors = stored_vectors_of(docs, milvus_store)
+
+        np.testing.assert_allclose(vectors[0], milvus_store.embeddings.embed_documents([docs[0].page_content])[0], rtol=1e-5)
+        assert stored_vectors_of([], milvus_store).shape == (0, 0)
@@ -0,0 +1,98 @@
+import json
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.core import index, textstore
+from src.core.index import get_vectorstore
+from src.core.textstore import create_text_store, stash
+from src.core.snapshot import export_collection, import_collection
+
+
+@pytest.fixture
+def embeddings(tmp_path, monkeypatch):
+    """Isolated Milvus Lite database and alias file"""
+    monkeypatch.setattr(index, "MILVUS_URI", str(tmp_path / "milvus.db"))
+    monkeypatch.setattr(index, "COLLECTION_ALIASES_PATH", str(tmp_path / "aliases.json"))
+    return DeterministicFakeEmbedding(size=8)
+
+
+@pytest.fixture
+def source(embeddings):
+    vectorstore = get_vectorstore("source", embeddings=embeddings)
+    texts = [f"chunk {i} 患者ケア" for i in range(25)]
+    metadatas = [{"doc_id": f"d{i % 3}", "source_name": "policy.pdf", "domain": "Healthcare", "start_index": i} for i in range(25)]
+    vectorstore.add_texts(texts, metadatas=metadatas, ids=[f"id{i}" for i in range(25)])
+    return vectorstore
+
+
+# ============================================================================
+# SNAPSHOT TESTS
+# ============================================================================
+
+class TestSnapshots:
+    """Tests for Parquet/NPY collection export and import"""
+
+    def test_export_writes_aligned_files(self, source, tmp_path):
+        """Test that the snapshot has one vector per Parquet row"""
+        manifest = export_collection("source", str(tmp_path / "snap"), batch_size=10)
+
+        vectors = np.load(tmp_path / "snap" / "vectors.npy", mmap_mode="r")
+        saved = json.loads((tmp_path / "snap" / "manifest.json").read_text())
+        assert manifest["count"] == saved["count"] == 25
+        assert vectors.shape == (25, 8)
+        assert {"doc_id", "source_name", "domain", "start_index"} <= set(manifest["metadata_fields"])
+
+    def test_roundtrip_without_reembedding(self, source, embeddings, tmp_path, monkeypatch):
+        """Test that importing restores texts, metadata and vectors without embedding calls"""
+        export_collection("source", str(tmp_path / "snap"), batch_size=10)
+        monkeypatch.setattr(DeterministicFakeEmbedding, "embed_documents", lambda self, texts: pytest.fail("re-embedded"))
+
+        count = import_collection(str(tmp_path / "snap"), "copy", embeddings=embeddings, batch_size=7)
+
+        copy = get_vectorstore("copy", embeddings=embeddings)
+        original = source.client.get("source", ids=["id7"])[0]
+        restored = copy.client.get(copy.collection_name, ids=["id7"])[0]
+        assert count == 25
+        assert restored["text"] == original["text"]
+        assert restored["start_index"] == 7
+        assert restored["vector"] == pytest.approx(original["vector"])
+
+    def test_column_null_in_first_batch(self, embeddings, tmp_path, monkeypatch):
+        """Test that a metadata column with no value in the first batch does not fix its type"""
+        monkeypatch.setattr(textstore, "CHUNK_TEXT_DIR", str(tmp_path / "chunk_text"))
+        monkeypatch.setattr(textstore, "_stores", {})
+        # zero-padded, so the export iterator's first batch is the null rows
+        ids = [f"id{i:02d}" for i in range(25)]
+        metadatas = [
+            {"doc_id": "d1", "domain": "Healthcare", "note": None if i < 10 else f"note {i}", "page": None if i < 10 else i}
+            for i in range(25)
+        ]
+        texts, metadatas = stash(create_text_store("slim"), ids, [f"chunk {i}" for i in range(25)], metadatas)
+        get_vectorstore("slim", embeddings=embeddings).add_texts(texts, metadatas=metadatas, ids=ids)
+
+        manifest = export_collection("slim", str(tmp_path / "snap"), batch_size=10)
+        import_collection(str(tmp_path / "snap"), "slim_copy", embeddings=embeddings, batch_size=7)
+
+        copy = get_vectorstore("slim_copy", embeddings=embeddings)
+        records = textstore.get_text_store(copy.collection_name).get(["id03", "id17"])
+        assert {"note", "page"} <= set(manifest["metadata_fields"])
+        assert records["id17"] == {"text": "chunk 17", "metadata": {"note": "note 17", "page": 17}}
+        assert records["id03"]["metadata"] == {"note": None, "page": None}
+
+    def test_export_missing_collection(self, embeddings, tmp_path):
+        with pytest.raises(ValueError):
+            export_collection("missing", str(tmp_path / "snap"))
+
+    def test_empty_snapshot_leaves_alias_alone(self, source, embeddings, tmp_path):
+        """Test that an empty snapshot is rejected before a new version is swapped in"""
+        snap = tmp_path / "snap"
+        export_collection("source", str(snap))
+        manifest = json.loads((snap / "manifest.json").read_text())
+        (snap / "manifest.json").write_text(json.dumps({**manifest, "count": 0}))
+
+        with pytest.raises(ValueError, match="empty"):
+            import_collection(str(snap), "source", embeddings=embeddings)
+
+        assert index.resolve_collection("source") == "source"
+        assert source.client.list_collections() == ["source"]
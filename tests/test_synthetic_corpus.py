@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.core import synthetic_corpus
+from src.core.eval import relevance_matrix
+from src.core.index import hierarchy_path
+from src.core.synthetic_corpus import SyntheticCorpus
+from src.core.synthetic_data import SYNTHETIC_DOCUMENTS
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    """Several batches for a few thousand chunks"""
+    monkeypatch.setattr(synthetic_corpus, "DOCS_PER_BATCH", 256)
+
+
+def concat(corpus):
+    batches = list(corpus)
+    return batches, np.concatenate([batch.vectors for batch in batches])
+
+
+# ============================================================================
+# HIERARCHY EXPANSION TESTS
+# ============================================================================
+
+class TestHierarchy:
+    """Tests for the expanded domain/section/topic tree"""
+
+    def test_keeps_hand_written_leaves(self):
+        corpus = SyntheticCorpus("bank", 1000, sections=3, topics=2)
+        seeds = {
+            (doc["metadata"]["domain"], doc["metadata"]["section"], doc["metadata"]["topic"])
+            for doc in SYNTHETIC_DOCUMENTS["bank"]
+        }
+        leaves = [(leaf["domain"], leaf["section"], leaf["topic"]) for leaf in corpus.leaves]
+
+        assert seeds <= set(leaves)
+        assert len(leaves) == len(set(leaves)) == len({leaf[0] for leaf in seeds}) * 3 * 2
+
+    def test_labels_fit_path_prefix_filters(self):
+        corpus = SyntheticCorpus("fluid_simulation", 1000, sections=5, topics=5)
+
+        assert all(not any(ch in label for ch in '/%_"\\') for leaf in corpus.leaves for label in leaf.values())
+        assert corpus.paths == [hierarchy_path(leaf) for leaf in corpus.leaves]
+
+    def test_unknown_collection(self):
+        with pytest.raises(ValueError):
+            SyntheticCorpus("library", 1000)
+
+    @pytest.mark.parametrize("skew", [0.0, 1.5])
+    def test_skew(self, skew):
+        corpus = SyntheticCorpus("hospital", 20000, skew=skew)
+        counts = np.bincount(corpus.batch(0, with_text=False).leaf, minlength=len(corpus.leaves))
+
+        head_share = counts[0] / counts.sum()
+        if skew == 0:
+            assert head_share == pytest.approx(1 / len(corpus.leaves), rel=0.3)
+        else:
+            assert head_share > 0.3
+
+
+# ============================================================================
+# CHUNK GENERATION TESTS
+# ============================================================================
+
+class TestChunks:
+    """Tests for batched, seeded chunk generation"""
+
+    def test_exact_size_and_ids(self, small_batches):
+        corpus = SyntheticCorpus("hospital", 2500, chunks_per_doc=3)
+        batches, vectors = concat(corpus)
+
+        assert sum(len(batch) for batch in batches) == len(vectors) == 2500
+        assert batches[-1].ids[-1] == "HOS-00002499"
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+
+    def test_batches_regenerate_alone(self, small_batches):
+        corpus = SyntheticCorpus("bank", 3000, seed=7)
+        _, vectors = concat(corpus)
+
+        third = corpus.batch(2)
+        again = SyntheticCorpus("bank", 3000, seed=7).batch(2)
+
+        np.testing.assert_array_equal(third.vectors, vectors[third.start:third.start + len(third)])
+        assert third.texts == again.texts
+        assert not np.array_equal(SyntheticCorpus("bank", 3000, seed=8).batch(2).vectors, third.vectors)
+
+    def test_text_and_metadata(self):
+        corpus = SyntheticCorpus("hospital", 200, languages={"ja": 1.0})
+        batch = corpus.batch(0)
+        metadata = batch.metadatas(corpus)[5]
+
+        assert batch.texts[5].startswith(f"[{batch.ids[5]}] {metadata['domain']} / ")
+        assert metadata["language"] == "ja" and metadata["chunk_id"] == batch.ids[5]
+        assert metadata["hierarchy_path"] == hierarchy_path(metadata)
+        # chunks of one document share its leaf and labels
+        assert metadata["doc_id"] == batch.metadatas(corpus)[4]["doc_id"]
+        assert batch.leaf[4] == batch.leaf[5]
+
+
+# ============================================================================
+# PAIRED QUERY TESTS
+# ============================================================================
+
+class TestQueries:
+    """Tests for queries with known answer chunks"""
+
+    def test_answer_matches_its_chunk(self, small_batches):
+        corpus = SyntheticCorpus("fluid_simulation", 3000)
+        batches, _ = concat(corpus)
+        chunks = {chunk_id: (batch, i) for batch in batches for i, chunk_id in enumerate(batch.ids)}
+
+        queries, vectors = corpus.queries(30)
+
+        assert len(queries) == len(vectors) == 30
+        for query in queries:
+            batch, i = chunks[query.ground_truth_chunks[0]]
+            metadata = batch.metadatas(corpus)[i]
+            assert (query.language, query.domain, query.section, query.topic, query.doc_type) == tuple(
+                metadata[key] for key in ("language", "domain", "section", "topic", "doc_type")
+            )
+            # the eval metrics match the reference tag in the chunk text
+            assert relevance_matrix(query.ground_truth_chunks, [Document(page_content=batch.texts[i])]).all()
+
+    def test_query_vectors_find_their_chunk(self):
+        corpus = SyntheticCorpus("hospital", 5000)
+        _, vectors = concat(corpus)
+        queries, query_vectors = corpus.queries(50)
+
+        top5 = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :5]
+        found = [int(query.ground_truth_chunks[0].split("-")[1]) in row for query, row in zip(queries, top5)]
+
+        assert np.mean(found) > 0.8
@@ -0,0 +1,101 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.core import index, textstore
+from src.core.index import MetaData, get_vectorstore
+from src.core.ingest import get_chunks, ingest_documents, delete_documents, stored_vectors
+from src.core.retrieval import retrieval
+from src.core.snapshot import export_collection, import_collection
+from src.core.textstore import ChunkTextStore, get_text_store, split_metadata
+
+
+@pytest.fixture
+def text_dir(tmp_path, monkeypatch):
+    """Isolated chunk-text directory and store cache"""
+    monkeypatch.setattr(textstore, "CHUNK_TEXT_DIR", str(tmp_path / "chunk_text"))
+    monkeypatch.setattr(textstore, "_stores", {})
+    return tmp_path
+
+
+@pytest.fixture
+def slim_store(text_dir, monkeypatch):
+    """Milvus Lite vectorstore created as a slim collection"""
+    monkeypatch.setattr(index, "MILVUS_URI", str(text_dir / "milvus.db"))
+    monkeypatch.setattr(index, "COLLECTION_ALIASES_PATH", str(text_dir / "aliases.json"))
+    monkeypatch.setattr("src.core.ingest.SEPARATE_CHUNK_TEXT", True)
+    vectorstore = get_vectorstore("hospital", embeddings=DeterministicFakeEmbedding(size=8))
+    for domain in ["Healthcare", "Finance"]:
+        chunks = get_chunks(
+            [Document(page_content=f"{domain} policy document.", metadata={"source": f"{domain}.txt"})],
+            MetaData(language="en", domain=domain, section="Policies", topic="General", doc_type="policy"),
+        )
+        ingest_documents(chunks, vectorstore)
+    return vectorstore
+
+
+# ============================================================================
+# CHUNK TEXT STORE TESTS
+# ============================================================================
+
+class TestChunkTextStore:
+    """Tests for the compressed chunk-text store"""
+
+    def test_put_get_delete(self, tmp_path):
+        store = ChunkTextStore(str(tmp_path / "chunks.sqlite"))
+        store.put(["a", "b"], ["患者ケア policy " * 50, "other"], [{"start_index": 0}, {}])
+
+        records = store.get(["a", "missing", "a"])
+
+        assert list(records) == ["a"]
+        assert records["a"] == {"text": "患者ケア policy " * 50, "metadata": {"start_index": 0}}
+        stats = store.stats()
+        assert stats["count"] == 2
+        assert stats["stored_bytes"] < stats["raw_bytes"]
+        assert store.delete(["a", "missing"]) == 1
+        assert store.get(["a", "b"]).keys() == {"b"}
+
+    def test_split_metadata_keeps_filter_fields(self):
+        indexed, stored = split_metadata({"domain": "Healthcare", "doc_id": "d", "start_index": 3})
+
+        assert indexed == {"domain": "Healthcare", "doc_id": "d"}
+        assert stored == {"start_index": 3}
+
+    def test_collection_without_store(self, text_dir):
+        assert get_text_store("hospital") is None
+
+
+class TestSlimCollection:
+    """Tests for collections whose chunk text lives outside Milvus"""
+
+    def test_milvus_rows_hold_no_text(self, slim_store):
+        rows = slim_store.client.query("hospital", filter="", output_fields=["*"], limit=10)
+
+        assert len(rows) == 2
+        assert all(row["text"] == "" for row in rows)
+        assert "start_index" not in rows[0]
+        assert get_text_store("hospital").stats()["count"] == 2
+
+    def test_retrieval_fetches_text_of_top_k(self, slim_store):
+        results = retrieval("policy", MetaData(language="en", domain="Finance"), slim_store)
+
+        assert [doc.page_content for doc in results] == ["Finance policy document."]
+        assert results[0].metadata["domain"] == "Finance"
+        assert results[0].metadata["start_index"] == 0
+        assert "similarity_score" in results[0].metadata
+
+    def test_delete_removes_text(self, slim_store):
+        assert delete_documents(slim_store, source_names=["Finance.txt"]) == 1
+
+        assert get_text_store("hospital").stats()["count"] == 1
+        assert list(stored_vectors(slim_store, ["Healthcare.txt"])) == ["Healthcare policy document."]
+
+    def test_snapshot_roundtrip(self, slim_store, text_dir):
+        manifest = export_collection("hospital", str(text_dir / "snapshot"))
+        import_collection(str(text_dir / "snapshot"), "restored", embeddings=DeterministicFakeEmbedding(size=8))
+        restored = get_vectorstore("restored", embeddings=DeterministicFakeEmbedding(size=8))
+
+        results = retrieval("policy", MetaData(language="en", domain="Healthcare"), restored)
+
+        assert manifest["separate_text"] and "start_index" in manifest["metadata_fields"]
+        assert [doc.page_content for doc in results] == ["Healthcare policy document."]
@@ -1,4 +1,4 @@
-from src.core.utils import mask_pii
+from src.core.utils import mask_pii, content_hash, PIIMasker, PIIDetector
 
 
 # ============================================================================
@@ -59,3 +59,48 @@ class TestPIIMasking:
         
         assert masked == text, "Non-PII text should be unchanged"
 
+
+
+class TestContentHash:
+    """Tests for deterministic content ids"""
+
+    def test_content_hash_is_stable(self):
+        """Test that equal inputs produce equal ids"""
+        assert content_hash("doc", "chunk") == content_hash("doc", "chunk")
+
+    def test_content_hash_separates_parts(self):
+        """Test that part boundaries affect the id"""
+        assert content_hash("ab", "c") != content_hash("a", "bc")
+
+
+class TestPIIMasker:
+    """Tests for the single-pass masker and pluggable detectors"""
+
+    def test_card_number_not_masked_as_phone(self):
+        """Test that more specific detectors win at the same position"""
+        assert mask_pii("Card 1234 5678 9012 3456 on file") == "Card [CREDIT_CARD] on file"
+
+    def test_custom_detector(self):
+        """Test that extra detectors can be plugged in"""
+        masker = PIIMasker()
+        masker.register(PIIDetector("MRN", r'MRN-\d{6}\b', r'M'))
+
+        masked = masker.mask("Patient MRN-123456, email a@b.com")
+
+        assert masked == "Patient [MRN], email [EMAIL]"
+
+    def test_empty_detector_list(self):
+        """Test that a masker without detectors leaves text unchanged"""
+        assert PIIMasker(detectors=[]).mask("call 555-1234") == "call 555-1234"
+
+    def test_chunks_are_masked(self):
+        """Test that chunks produced at ingest carry masked text"""
+        from langchain_core.documents import Document
+        from src.core.index import MetaData
+        from src.core.ingest import get_chunks
+
+        doc = Document(page_content="Email admin@bank.com for help. " * 100, metadata={})
+        chunks = get_chunks([doc], MetaData(language="en"))
+
+        assert all("admin@bank.com" not in c.page_content for c in chunks)
+        assert any("[EMAIL]" in c.page_content for c in chunks)